@@ -0,0 +1,848 @@
+"""
+Benchmarks du pipeline d'ingestion de main.py.
+Chaque scénario s'exécute sur des données synthétiques. Les insertions passent par
+un faux pool aiomysql à latence configurable, ou par la vraie base (.env) avec --db.
+Les mesures de mémoire sont faites dans un processus neuf par variante (pic RSS).
+
+Usage : python benchmark.py [scénario ...] [--json resultats.json] [--db]
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import main
+
+# Taille des jeux de données synthétiques
+BENCH_PATIENTS = 50
+BENCH_PARAMETERS = 30
+BENCH_CYCLES = 2000
+BENCH_RECORDS = 300_000
+
+# Balayage patients x paramètres x taille de pool (scénarios pipeline et insert)
+SWEEP_PATIENTS = (10, 100, 500)
+SWEEP_PARAMETERS = (10, 30)
+SWEEP_POOL_SIZES = (5, 20)
+SWEEP_CYCLES = 20  # Cycles mesurés par point du balayage
+
+# Faux pool : latence d'une requête = aller-retour + coût par ligne
+FAKE_ROUND_TRIP_MS = 1.0
+FAKE_ROW_COST_US = 5.0
+
+# Scénario commit : coût d'un commit du faux pool (fsync du redo log, sans group commit),
+# cycles insérés par variante et regroupement testé pour la politique 'cycle'
+FAKE_COMMIT_MS = 0.5
+COMMIT_BENCH_PATIENTS = 100
+COMMIT_BENCH_PARAMETERS = 30
+COMMIT_BENCH_CYCLES = 60
+COMMIT_BENCH_GROUP_CYCLES = 5
+
+# Scénario dashboard (--db) : lecture des alertes d'un patient à mesure que l'historique grossit,
+# sur des copies temporaires des tables (préfixe BENCH_TABLE_PREFIX)
+HISTORY_STEPS = (10_000, 100_000, 1_000_000)
+HISTORY_ROWS_PER_STATEMENT = 5000
+DASHBOARD_READS = 200
+BENCH_TABLE_PREFIX = 'bench_'
+
+# Scénario waveform : secondes d'ECG générées par patient
+WAVEFORM_BENCH_SECONDS = 20
+WAVEFORM_BENCH_PATIENTS = 20
+
+# Requête actuelle de AlertRepository::getAlertsSql (sous-requête corrélée sur l'historique)
+ALERTS_FROM_HISTORY_QUERY = """
+    SELECT m.parameter_id, m.value, m.timestamp,
+           r.display_name, r.unit, r.normal_min, r.normal_max, r.critical_min, r.critical_max
+    FROM (
+        SELECT pd.parameter_id, pd.value, pd.timestamp
+        FROM {history} pd
+        WHERE pd.id_patient = %s AND pd.archived = 0 AND pd.value IS NOT NULL
+          AND pd.timestamp = (
+              SELECT MAX(p2.timestamp) FROM {history} p2
+              WHERE p2.parameter_id = pd.parameter_id AND p2.id_patient = pd.id_patient AND p2.archived = 0
+          )
+    ) m
+    JOIN parameter_reference r ON r.parameter_id = m.parameter_id
+    WHERE (r.normal_min IS NOT NULL AND m.value <= r.normal_min)
+       OR (r.normal_max IS NOT NULL AND m.value >= r.normal_max)
+    ORDER BY
+        CASE WHEN (r.critical_min IS NOT NULL AND m.value <= r.critical_min)
+               OR (r.critical_max IS NOT NULL AND m.value >= r.critical_max) THEN 0 ELSE 1 END,
+        m.timestamp DESC
+"""
+
+# Même lecture sur la table des dernières valeurs maintenue par main.py
+ALERTS_FROM_LATEST_QUERY = """
+    SELECT l.parameter_id, l.value, l.timestamp,
+           r.display_name, r.unit, r.normal_min, r.normal_max, r.critical_min, r.critical_max
+    FROM {latest} l
+    JOIN parameter_reference r ON r.parameter_id = l.parameter_id
+    WHERE l.id_patient = %s AND l.alert_level >= 1 AND l.value IS NOT NULL
+    ORDER BY l.alert_level DESC, l.timestamp DESC
+"""
+
+
+def setup_reference_data(patients: int, parameters: int):
+    """Remplit les listes de validation de main avec des patients / paramètres fictifs."""
+    main.VALID_PATIENT_IDS = list(range(1, patients + 1))
+    main.VALID_PARAMETERS = [f"P{i:02d}" for i in range(parameters)]
+    main.VALID_USER_IDS = [1]
+    main.PARAMETER_RANGES = {
+        param_id: {'dm': 0.0, 'dmx': 200.0, 'nm': 60.0, 'nmx': 100.0, 'cm': 40.0, 'cmx': 140.0}
+        for param_id in main.VALID_PARAMETERS
+    }
+    main.build_validation_indexes()
+
+
+def write_synthetic_csv(path: str, patients: int, parameters: int, cycles: int):
+    """Écrit un CSV trié par horodatage au format attendu par main.py."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(main.DB_COLUMNS)
+        for cycle in range(cycles):
+            timestamp = time.strftime(main.DATETIME_FORMAT, time.gmtime(1_700_000_000 + cycle))
+            for patient_id in range(1, patients + 1):
+                for i in range(parameters):
+                    writer.writerow([patient_id, f"P{i:02d}", 80.0 + (cycle % 7), timestamp, 0, 1, 0])
+
+
+def peak_rss_mb() -> float:
+    """Pic de mémoire résidente du processus courant (ru_maxrss est en Ko sous Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _isolated_entry(conn, func, args):
+    setup_reference_data(BENCH_PATIENTS, BENCH_PARAMETERS)
+    start = time.perf_counter()
+    result = func(*args)
+    duration = time.perf_counter() - start
+    conn.send((result, duration, peak_rss_mb()))
+    conn.close()
+
+
+def run_isolated(func, *args):
+    """Exécute func(*args) dans un processus neuf et retourne (résultat, durée, pic RSS en Mo)."""
+    ctx = multiprocessing.get_context('spawn')
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_isolated_entry, args=(child_conn, func, args))
+    process.start()
+    outcome = parent_conn.recv()
+    process.join()
+    return outcome
+
+
+def _noop():
+    return 0
+
+
+def _csv_materialised(path: str) -> int:
+    """Ancien chemin : CSV entier en liste de dicts puis group_data_by_cycle."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = list(csv.DictReader(f))
+    return len(main.group_data_by_cycle(data))
+
+
+def _csv_streaming(path: str) -> int:
+    """Nouveau chemin : cycles produits en flux par iter_csv_cycles."""
+    return sum(1 for _ in main.iter_csv_cycles(path))
+
+
+def bench_csv() -> list:
+    """Compare le pic RSS et la durée de lecture du CSV : chargement complet vs flux."""
+    results = []
+    fd, path = tempfile.mkstemp(prefix='dashmed_bench_', suffix='.csv')
+    os.close(fd)
+    try:
+        write_synthetic_csv(path, BENCH_PATIENTS, BENCH_PARAMETERS, BENCH_CYCLES)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"[BENCH] CSV synthétique: {size_mb:.1f} Mo "
+              f"({BENCH_PATIENTS} patients x {BENCH_PARAMETERS} paramètres x {BENCH_CYCLES} cycles)")
+
+        _, _, baseline_rss = run_isolated(_noop)
+        for name, func in (('materialised', _csv_materialised), ('streaming', _csv_streaming)):
+            cycles, duration, rss = run_isolated(func, path)
+            rows = BENCH_PATIENTS * BENCH_PARAMETERS * BENCH_CYCLES
+            results.append({
+                'scenario': 'csv',
+                'variant': name,
+                'csv_mb': round(size_mb, 1),
+                'cycles': cycles,
+                'duration_s': round(duration, 3),
+                'rows_per_s': round(rows / duration) if duration > 0 else None,
+                'peak_rss_mb': round(rss, 1),
+                'peak_rss_over_baseline_mb': round(rss - baseline_rss, 1),
+            })
+            print(f"[BENCH] csv/{name:<12} | {cycles} cycles | {duration:.2f}s | "
+                  f"pic RSS {rss:.1f} Mo (+{rss - baseline_rss:.1f} Mo)")
+    finally:
+        os.remove(path)
+    return results
+
+
+def _legacy_record(patient_id, param_id, value):
+    """Ancienne représentation : dict de 7 chaînes."""
+    return {
+        'id_patient': str(patient_id),
+        'parameter_id': param_id,
+        'value': str(value),
+        'timestamp': '',
+        'alert_flag': '0',
+        'created_by': '1',
+        'archived': '0'
+    }
+
+
+def _legacy_row(record, timestamp):
+    """Ancienne conversion chaîne -> types SQL faite à l'insertion."""
+    return (
+        int(record['id_patient']),
+        record['parameter_id'],
+        float(record['value']),
+        timestamp,
+        int(record.get('alert_flag', 0)),
+        int(record['created_by']),
+        int(record.get('archived', 0))
+    )
+
+
+def bench_records() -> list:
+    """Compare mémoire par mesure et débit construction + conversion : dicts de chaînes vs Measurement."""
+    results = []
+    params = [f"P{i:02d}" for i in range(BENCH_PARAMETERS)]
+    samples = [(1 + i % BENCH_PATIENTS, params[i % BENCH_PARAMETERS], round(50 + (i % 1000) / 7, 2))
+               for i in range(BENCH_RECORDS)]
+    timestamp = time.strftime(main.DATETIME_FORMAT)
+
+    variants = (
+        ('dict', lambda p, k, v: _legacy_record(p, k, v), _legacy_row),
+        ('measurement', lambda p, k, v: main.Measurement(p, k, v, None, 0, 1, 0), lambda m, ts: m.as_row(ts)),
+    )
+    for name, build, to_row in variants:
+        tracemalloc.start()
+        records = [build(p, k, v) for p, k, v in samples]
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del records
+
+        start = time.perf_counter()
+        records = [build(p, k, v) for p, k, v in samples]
+        rows = [to_row(r, timestamp) for r in records]
+        duration = time.perf_counter() - start
+        del records, rows
+
+        results.append({
+            'scenario': 'records',
+            'variant': name,
+            'records': BENCH_RECORDS,
+            'bytes_per_record': round(memory / BENCH_RECORDS),
+            'duration_s': round(duration, 3),
+            'records_per_s': round(BENCH_RECORDS / duration) if duration > 0 else None,
+        })
+        print(f"[BENCH] records/{name:<12} | {memory / BENCH_RECORDS:.0f} octets/mesure | "
+              f"{BENCH_RECORDS / duration:.0f} mesures/s (construction + conversion)")
+    return results
+
+
+class FakeCursor:
+    """Curseur simulé : chaque requête attend la latence du faux pool (et un commit hors transaction)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.pool = conn.pool
+        self.rowcount = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, args=None):
+        await self.pool.wait(1)
+        await self.conn.autocommit()
+        self.rowcount = 1
+        return self.rowcount
+
+    async def executemany(self, query, rows):
+        await self.pool.wait(len(rows))
+        await self.conn.autocommit()
+        self.rowcount = len(rows)
+
+    async def fetchall(self):
+        return []
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+        self.in_transaction = False
+
+    def cursor(self, *args):
+        return FakeCursor(self)
+
+    async def autocommit(self):
+        if not self.in_transaction:
+            await self.pool.commit()
+
+    async def begin(self):
+        await self.pool.wait(0)
+        self.in_transaction = True
+
+    async def commit(self):
+        await self.pool.wait(0)
+        await self.pool.commit()
+        self.in_transaction = False
+
+    async def rollback(self):
+        await self.pool.wait(0)
+        self.in_transaction = False
+
+
+class FakePool:
+    """
+    Remplaçant d'aiomysql.Pool pour les benchmarks : `maxsize` connexions au plus,
+    chaque requête coûte FAKE_ROUND_TRIP_MS + FAKE_ROW_COST_US par ligne, chaque commit
+    (explicite, ou requête hors transaction) `commit_ms` de plus.
+    """
+
+    def __init__(self, maxsize: int, round_trip_ms: float = FAKE_ROUND_TRIP_MS, row_cost_us: float = FAKE_ROW_COST_US,
+                 commit_ms: float = 0.0):
+        self.maxsize = maxsize
+        self.round_trip = round_trip_ms / 1000
+        self.row_cost = row_cost_us / 1e6
+        self.commit_cost = commit_ms / 1000
+        self.statements = 0
+        self.commits = 0
+        self._slots = asyncio.Semaphore(maxsize)
+
+    async def wait(self, rows: int):
+        self.statements += 1
+        await asyncio.sleep(self.round_trip + rows * self.row_cost)
+
+    async def commit(self):
+        self.commits += 1
+        if self.commit_cost:
+            await asyncio.sleep(self.commit_cost)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        async with self._slots:
+            yield FakeConnection(self)
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def quiet(func, *args):
+    """Appelle func en masquant ses print (journal des épisodes du générateur)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+async def quiet_async(coro):
+    """Attend coro en masquant ses print."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return await coro
+
+
+def sweep_points():
+    for patients in SWEEP_PATIENTS:
+        for parameters in SWEEP_PARAMETERS:
+            yield patients, parameters
+
+
+def bench_pipeline() -> list:
+    """Débit de chaque étape hors base : génération (moteurs python / numpy), regroupement, validation."""
+    results = []
+    engines = [('python', main.init_generation_states, main.generate_batch)]
+    if main.np is not None:
+        engines.append(('numpy', main.init_vector_states, main.generate_batch_vectorized))
+
+    for patients, parameters in sweep_points():
+        setup_reference_data(patients, parameters)
+        values = patients * parameters * SWEEP_CYCLES
+
+        for engine, init, generate in engines:
+            init()
+            cpu_start, start = time.process_time(), time.perf_counter()
+            data = quiet(generate, SWEEP_CYCLES)
+            duration, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+
+            start = time.perf_counter()
+            cycles = quiet(main.group_data_by_cycle, data)
+            group_duration = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for cycle in cycles:
+                main.validate_cycle(cycle)
+            validate_duration = time.perf_counter() - start
+
+            stages = (('generate', duration, cpu), ('group', group_duration, None), ('validate', validate_duration, None))
+            for stage, stage_duration, stage_cpu in stages:
+                if stage != 'generate' and engine != 'python':
+                    continue
+                results.append({
+                    'scenario': 'pipeline',
+                    'stage': stage,
+                    'engine': engine if stage == 'generate' else None,
+                    'patients': patients,
+                    'parameters': parameters,
+                    'values_per_s': round(values / stage_duration) if stage_duration > 0 else None,
+                    'cycle_ms': round(stage_duration / SWEEP_CYCLES * 1000, 2),
+                    'cpu_s': round(stage_cpu, 3) if stage_cpu is not None else None,
+                    'peak_rss_mb': round(peak_rss_mb(), 1),
+                })
+            print(f"[BENCH] pipeline {patients:>4}p x {parameters:>2}k | génération {engine:<6} "
+                  f"{values / duration:>10.0f} val/s | regroupement {values / group_duration:>10.0f} val/s | "
+                  f"validation {values / validate_duration:>10.0f} val/s")
+    return results
+
+
+async def _measure_inserts(pool, cycles) -> dict:
+    latencies = []
+    totals = [0, 0, 0]
+    cpu_start, start = time.process_time(), time.perf_counter()
+    for i, cycle in enumerate(cycles, start=1):
+        cycle_start = time.perf_counter()
+        counts = await main.insert_cycle(pool, cycle, i)
+        latencies.append(time.perf_counter() - cycle_start)
+        totals = [a + b for a, b in zip(totals, counts)]
+    duration, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+    return {
+        'rows_per_s': round(totals[0] / duration) if duration > 0 else None,
+        'cycle_p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'cycle_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'cpu_s': round(cpu, 3),
+        'success': totals[0],
+        'skip': totals[1],
+        'error': totals[2],
+    }
+
+
+async def _bench_insert(use_db: bool) -> list:
+    results = []
+    db_pool = None
+    if use_db:
+        db_pool = await main.create_pool()
+        await main.discover_valid_data(db_pool)
+        reference = (list(main.VALID_PATIENT_IDS), list(main.VALID_PARAMETERS), list(main.VALID_USER_IDS), dict(main.PARAMETER_RANGES))
+
+    try:
+        for patients, parameters in sweep_points():
+            if use_db:
+                all_patients, all_params, users, ranges = reference
+                main.VALID_PATIENT_IDS, main.VALID_PARAMETERS = all_patients[:patients], all_params[:parameters]
+                main.VALID_USER_IDS, main.PARAMETER_RANGES = users, ranges
+                main.build_validation_indexes()
+            else:
+                setup_reference_data(patients, parameters)
+            main.init_generation_states()
+            cycles = quiet(main.group_data_by_cycle, quiet(main.generate_batch, SWEEP_CYCLES))
+
+            for pool_size in SWEEP_POOL_SIZES:
+                for mode in ('single', 'batch'):
+                    main.INSERT_MODE = mode
+                    pool = db_pool if use_db else FakePool(pool_size)
+                    measures = await _measure_inserts(pool, cycles)
+                    results.append({
+                        'scenario': 'insert',
+                        'backend': 'db' if use_db else 'fake',
+                        'mode': mode,
+                        'patients': len(main.VALID_PATIENT_IDS),
+                        'parameters': len(main.VALID_PARAMETERS),
+                        'pool_size': db_pool.maxsize if use_db else pool_size,
+                        **measures,
+                        'peak_rss_mb': round(peak_rss_mb(), 1),
+                    })
+                    print(f"[BENCH] insert {patients:>4}p x {parameters:>2}k | pool {pool_size:>2} | {mode:<6} | "
+                          f"{measures['rows_per_s']:>8} lignes/s | cycle p50 {measures['cycle_p50_ms']:>8.1f}ms "
+                          f"p99 {measures['cycle_p99_ms']:>8.1f}ms | CPU {measures['cpu_s']:.2f}s")
+                if use_db:
+                    break  # La taille du vrai pool est fixée par DB_POOL_MAX_SIZE
+    finally:
+        if db_pool is not None:
+            db_pool.close()
+            await db_pool.wait_closed()
+    return results
+
+
+def bench_insert(use_db: bool = False) -> list:
+    """Débit et latence p50/p99 par cycle des modes d'insertion 'single' et 'batch'."""
+    return asyncio.run(_bench_insert(use_db))
+
+
+# (variante, INSERT_MODE, COMMIT_POLICY, cycles par envoi)
+COMMIT_VARIANTS = (
+    ('autocommit', 'single', 'chunk', 1),
+    ('chunk', 'batch', 'chunk', 1),
+    ('cycle', 'batch', 'cycle', 1),
+    (f'cycle x{COMMIT_BENCH_GROUP_CYCLES}', 'batch', 'cycle', COMMIT_BENCH_GROUP_CYCLES),
+)
+
+COMMIT_STATUS_QUERY = (
+    "SHOW GLOBAL STATUS WHERE Variable_name IN ('Handler_commit', 'Innodb_os_log_fsyncs')"
+)
+
+
+async def _server_commit_status(db_pool) -> dict:
+    async with db_pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(COMMIT_STATUS_QUERY)
+            return {name: int(value) for name, value in await cur.fetchall()}
+
+
+async def _bench_commit(use_db: bool) -> list:
+    results = []
+    db_pool = None
+    if use_db:
+        db_pool = await main.create_pool()
+        await quiet_async(main.discover_valid_data(db_pool))
+        main.VALID_PATIENT_IDS = main.VALID_PATIENT_IDS[:COMMIT_BENCH_PATIENTS]
+        main.VALID_PARAMETERS = main.VALID_PARAMETERS[:COMMIT_BENCH_PARAMETERS]
+        main.build_validation_indexes()
+    else:
+        setup_reference_data(COMMIT_BENCH_PATIENTS, COMMIT_BENCH_PARAMETERS)
+    main.init_generation_states()
+    cycles = quiet(main.group_data_by_cycle, quiet(main.generate_batch, COMMIT_BENCH_CYCLES))
+
+    saved = main.INSERT_MODE, main.COMMIT_POLICY
+    # Horodatages distincts d'une variante à l'autre : aucune ligne n'est un doublon
+    origin_ms = int(time.time() * 1000) - len(COMMIT_VARIANTS) * COMMIT_BENCH_CYCLES * 1000
+    try:
+        for variant_idx, (variant, mode, policy, group) in enumerate(COMMIT_VARIANTS):
+            main.INSERT_MODE, main.COMMIT_POLICY = mode, policy
+            pool = db_pool or FakePool(main.DB_POOL_MAX_SIZE, commit_ms=FAKE_COMMIT_MS)
+            before = await _server_commit_status(db_pool) if use_db else None
+
+            latencies = []
+            totals = [0, 0, 0]
+            start = time.perf_counter()
+            for first in range(0, len(cycles), group):
+                timed_cycles = [
+                    (main.format_timestamp_ms(origin_ms + ((variant_idx * COMMIT_BENCH_CYCLES) + i) * 1000), cycles[i])
+                    for i in range(first, min(first + group, len(cycles)))
+                ]
+                send_start = time.perf_counter()
+                counts = await main.insert_cycles(pool, timed_cycles)
+                latencies.append(time.perf_counter() - send_start)
+                totals = [a + b for a, b in zip(totals, counts)]
+            duration = time.perf_counter() - start
+
+            if use_db:
+                after = await _server_commit_status(db_pool)
+                commits = after['Handler_commit'] - before['Handler_commit']
+                fsyncs = after['Innodb_os_log_fsyncs'] - before['Innodb_os_log_fsyncs']
+            else:
+                commits = fsyncs = pool.commits
+            result = {
+                'scenario': 'commit',
+                'backend': 'db' if use_db else 'fake',
+                'variant': variant,
+                'cycles_per_send': group,
+                'rows': totals[0],
+                'rows_per_s': round(totals[0] / duration) if duration > 0 else None,
+                'commits': commits,
+                'commits_per_s': round(commits / duration, 1) if duration > 0 else None,
+                'rows_per_commit': round(totals[0] / commits, 1) if commits else None,
+                'fsyncs': fsyncs,
+                'send_p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+                'send_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                'error': totals[2],
+            }
+            results.append(result)
+            print(f"[BENCH] commit {variant:<10} | {result['rows_per_s']:>8} lignes/s | "
+                  f"{commits:>6} commits ({result['commits_per_s']:>8} /s, {result['rows_per_commit'] or '-':>7} lignes/commit) | "
+                  f"{fsyncs:>6} fsyncs | envoi p50 {result['send_p50_ms']:>7.1f}ms p99 {result['send_p99_ms']:>7.1f}ms")
+    finally:
+        main.INSERT_MODE, main.COMMIT_POLICY = saved
+        if db_pool is not None:
+            db_pool.close()
+            await db_pool.wait_closed()
+    return results
+
+
+def bench_commit(use_db: bool = False) -> list:
+    """
+    Commits et fsyncs par seconde selon la politique de commit : autocommit ligne à ligne (mode
+    'single'), une transaction par paquet, transactions par cycle, cycles regroupés. Avec --db,
+    Handler_commit et Innodb_os_log_fsyncs du serveur (à lancer sur une base sans autre charge).
+    """
+    return asyncio.run(_bench_commit(use_db))
+
+
+async def _timed_reads(cur, query: str, patient_ids) -> list:
+    latencies = []
+    for i in range(DASHBOARD_READS):
+        start = time.perf_counter()
+        await cur.execute(query, (patient_ids[i % len(patient_ids)],))
+        await cur.fetchall()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def _bench_dashboard() -> list:
+    results = []
+    pool = await main.create_pool()
+    history = BENCH_TABLE_PREFIX + main.DB_TABLE_NAME
+    latest = BENCH_TABLE_PREFIX + main.LATEST_TABLE_NAME
+    insert_query = main.INSERT_QUERY.replace(main.DB_TABLE_NAME, history, 1)
+    upsert_query = main.LATEST_UPSERT_QUERY.replace(main.LATEST_TABLE_NAME, latest, 1)
+
+    try:
+        await quiet_async(main.discover_valid_data(pool))
+        series = [(patient_id, param_id) for patient_id in main.VALID_PATIENT_IDS for param_id in main.VALID_PARAMETERS]
+        user_id = main.VALID_USER_IDS[0] if main.VALID_USER_IDS else None
+
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                for table, source in ((history, main.DB_TABLE_NAME), (latest, main.LATEST_TABLE_NAME)):
+                    await cur.execute(f"DROP TABLE IF EXISTS {table}")
+                    await cur.execute(f"CREATE TABLE {table} LIKE {source}")
+
+                written = 0
+                origin = time.time() - max(HISTORY_STEPS) // len(series)
+                for step in HISTORY_STEPS:
+                    # Ajout de l'historique par paquets, dernières valeurs maintenues comme dans main.py
+                    while written < step:
+                        rows = []
+                        for _ in range(min(HISTORY_ROWS_PER_STATEMENT, step - written)):
+                            patient_id, param_id = series[written % len(series)]
+                            timestamp = time.strftime(main.DATETIME_FORMAT, time.localtime(origin + written // len(series)))
+                            value = main.generate_fill_value(param_id)
+                            rows.append((patient_id, param_id, value, timestamp, 0, user_id, 0))
+                            written += 1
+                        await conn.begin()
+                        await cur.executemany(insert_query, rows)
+                        await cur.executemany(upsert_query, main.latest_rows(rows))
+                        await conn.commit()
+
+                    for variant, query in (('history', ALERTS_FROM_HISTORY_QUERY), ('latest', ALERTS_FROM_LATEST_QUERY)):
+                        latencies = await _timed_reads(cur, query.format(history=history, latest=latest), main.VALID_PATIENT_IDS)
+                        results.append({
+                            'scenario': 'dashboard',
+                            'variant': variant,
+                            'history_rows': written,
+                            'read_p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+                            'read_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                        })
+                        print(f"[BENCH] dashboard {written:>9} lignes | {variant:<7} | "
+                              f"lecture p50 {percentile(latencies, 0.5) * 1000:>8.2f}ms "
+                              f"p99 {percentile(latencies, 0.99) * 1000:>8.2f}ms")
+    finally:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(f"DROP TABLE IF EXISTS {history}, {latest}")
+        pool.close()
+        await pool.wait_closed()
+    return results
+
+
+def bench_dashboard(use_db: bool = False) -> list:
+    """Latence de lecture des alertes d'un patient : sous-requête sur l'historique vs table des dernières valeurs."""
+    if not use_db:
+        print("[BENCH] dashboard ignoré : nécessite --db")
+        return []
+    return asyncio.run(_bench_dashboard())
+
+
+def _waveform_per_row(signal_id: str, rate: int, chunk_start: float, samples) -> list:
+    """
+    Les mêmes échantillons en une ligne patient_data par valeur (horodatage à la milliseconde),
+    sous le premier paramètre de référence pour respecter les clés étrangères.
+    """
+    parameter_id, user_id = main.VALID_PARAMETERS[0], main.VALID_USER_IDS[0]
+    rows = []
+    for patient_id, values in zip(main.VALID_PATIENT_IDS, samples.tolist()):
+        for i, value in enumerate(values):
+            timestamp = main.format_timestamp_ms(int(chunk_start * 1000 + i * 1000 / rate))
+            rows.append((patient_id, parameter_id, round(value, 2), timestamp, 0, user_id, 0))
+    return rows
+
+
+async def _table_bytes(cur, table: str) -> int:
+    await cur.execute(f"ANALYZE TABLE {table}")
+    await cur.fetchall()
+    await cur.execute(
+        "SELECT data_length + index_length FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = %s", (table,))
+    (size,), = await cur.fetchall()
+    return int(size)
+
+
+async def _bench_waveform(use_db: bool) -> list:
+    results = []
+    signal_id, rate = 'ECG_II', main.WAVEFORM_SIGNALS.get('ECG_II', 250)
+    scale = main.waveform.SIGNAL_SCALES[signal_id]
+    seconds = WAVEFORM_BENCH_SECONDS
+    samples_total = WAVEFORM_BENCH_PATIENTS * rate * seconds
+
+    db_pool = None
+    if use_db:
+        db_pool = await main.create_pool()
+        await quiet_async(main.discover_valid_data(db_pool))
+        main.VALID_PATIENT_IDS = main.VALID_PATIENT_IDS[:WAVEFORM_BENCH_PATIENTS]
+        samples_total = len(main.VALID_PATIENT_IDS) * rate * seconds
+    else:
+        setup_reference_data(WAVEFORM_BENCH_PATIENTS, 1)
+
+    history = BENCH_TABLE_PREFIX + main.DB_TABLE_NAME
+    chunks_table = BENCH_TABLE_PREFIX + main.WAVEFORM_TABLE_NAME
+    saved_mode = main.INSERT_MODE
+    main.INSERT_MODE = 'batch'
+    history_query = None
+
+    try:
+        if use_db:
+            async with db_pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    for table, source in ((history, main.DB_TABLE_NAME), (chunks_table, main.WAVEFORM_TABLE_NAME)):
+                        await cur.execute(f"DROP TABLE IF EXISTS {table}")
+                        await cur.execute(f"CREATE TABLE {table} LIKE {source}")
+            history_query = main.INSERT_QUERY.replace(main.DB_TABLE_NAME, history, 1)
+        chunk_query = main.WAVEFORM_INSERT_QUERY.replace(main.WAVEFORM_TABLE_NAME, chunks_table, 1)
+
+        generator = main.waveform.WaveformGenerator(signal_id, rate, len(main.VALID_PATIENT_IDS), seed=0)
+        blocks = [generator.next_chunk(1.0) for _ in range(seconds)]
+        origin = float(int(time.time()) - seconds)
+
+        # Stockage en une ligne par valeur
+        pool = db_pool or FakePool(main.DB_POOL_MAX_SIZE)
+        start = time.perf_counter()
+        for second, block in enumerate(blocks):
+            await main.insert_rows(pool, _waveform_per_row(signal_id, rate, origin + second, block),
+                                   history_query, derived=False)
+        per_row_duration = time.perf_counter() - start
+        per_row = {
+            'scenario': 'waveform',
+            'storage': 'per_row',
+            'encoding': None,
+            'samples': samples_total,
+            'insert_samples_per_s': round(samples_total / per_row_duration),
+        }
+        results.append(per_row)
+
+        for encoding in main.waveform.ENCODINGS:
+            start = time.perf_counter()
+            payloads = [
+                [main.waveform.encode_chunk(samples, encoding, scale) for samples in block]
+                for block in blocks
+            ]
+            encode_duration = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for block_payloads in payloads:
+                for payload in block_payloads:
+                    main.waveform.decode_chunk(payload, encoding, scale)
+            decode_duration = time.perf_counter() - start
+
+            pool = db_pool or FakePool(main.DB_POOL_MAX_SIZE)
+            start = time.perf_counter()
+            for second, block_payloads in enumerate(payloads):
+                chunk_start = main.format_timestamp_ms(int((origin + second) * 1000))
+                rows = [
+                    (patient_id, signal_id, chunk_start, rate, rate, encoding, scale, payload)
+                    for patient_id, payload in zip(main.VALID_PATIENT_IDS, block_payloads)
+                ]
+                async with pool.acquire() as conn:
+                    async with conn.cursor() as cur:
+                        await cur.executemany(chunk_query, rows)
+            insert_duration = time.perf_counter() - start
+
+            payload_bytes = sum(len(payload) for block_payloads in payloads for payload in block_payloads)
+            result = {
+                'scenario': 'waveform',
+                'storage': 'chunks',
+                'encoding': encoding,
+                'samples': samples_total,
+                'payload_bytes_per_sample': round(payload_bytes / samples_total, 3),
+                'encode_samples_per_s': round(samples_total / encode_duration),
+                'decode_samples_per_s': round(samples_total / decode_duration),
+                'insert_samples_per_s': round(samples_total / insert_duration),
+            }
+            if use_db:
+                async with db_pool.acquire() as conn:
+                    async with conn.cursor() as cur:
+                        result['table_bytes_per_sample'] = round(await _table_bytes(cur, chunks_table) / samples_total, 3)
+                        await cur.execute(f"TRUNCATE TABLE {chunks_table}")
+            results.append(result)
+            print(f"[BENCH] waveform chunks/{encoding:<11} | {result['payload_bytes_per_sample']:.2f} octets/échantillon | "
+                  f"encodage {result['encode_samples_per_s']:>11} éch/s | décodage {result['decode_samples_per_s']:>11} éch/s | "
+                  f"insertion {result['insert_samples_per_s']:>11} éch/s")
+
+        if use_db:
+            async with db_pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    per_row['table_bytes_per_sample'] = round(await _table_bytes(cur, history) / samples_total, 3)
+        print(f"[BENCH] waveform per_row            | "
+              f"{per_row.get('table_bytes_per_sample', '-')} octets/échantillon en table | "
+              f"insertion {per_row['insert_samples_per_s']:>11} éch/s")
+    finally:
+        main.INSERT_MODE = saved_mode
+        if db_pool is not None:
+            async with db_pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(f"DROP TABLE IF EXISTS {history}, {chunks_table}")
+            db_pool.close()
+            await db_pool.wait_closed()
+    return results
+
+
+def bench_waveform(use_db: bool = False) -> list:
+    """Courbe ECG 250 Hz : une ligne par valeur vs blocs binaires d'une seconde (débit, octets par échantillon)."""
+    if main.waveform is None:
+        print("[BENCH] waveform ignoré : nécessite NumPy")
+        return []
+    return asyncio.run(_bench_waveform(use_db))
+
+
+SCENARIOS = {
+    'csv': bench_csv,
+    'records': bench_records,
+    'pipeline': bench_pipeline,
+    'insert': bench_insert,
+    'dashboard': bench_dashboard,
+    'waveform': bench_waveform,
+    'commit': bench_commit,
+}
+
+# Scénarios acceptant l'option --db
+DB_SCENARIOS = {'insert', 'dashboard', 'waveform', 'commit'}
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Benchmarks du pipeline d'ingestion DashMed")
+    parser.add_argument('scenarios', nargs='*', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--json', dest='json_path', help="Fichier de sortie des résultats (JSON)")
+    parser.add_argument('--db', action='store_true', help="Insère dans la base configurée (.env) au lieu du faux pool")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.scenarios:
+        if name in DB_SCENARIOS:
+            results.extend(SCENARIOS[name](use_db=args.db))
+        else:
+            results.extend(SCENARIOS[name]())
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"[BENCH] Résultats écrits dans {args.json_path}")
+
+
+if __name__ == '__main__':
+    run()
@@ -10,6 +10,7 @@ DROP TRIGGER IF EXISTS `trg_check_room_occupation_update`;
 
 -- Drops (views d'abord)
 DROP VIEW IF EXISTS `view_consultations`;
+DROP VIEW IF EXISTS `view_patient_alert_state`;
 DROP VIEW IF EXISTS `view_patient_indicator_status`;
 DROP VIEW IF EXISTS `view_latest_patient_data`;
 
@@ -22,6 +23,11 @@ DROP TABLE IF EXISTS `user_parameter_order`;
 DROP TABLE IF EXISTS `user_parameter_chart_pref`;
 DROP TABLE IF EXISTS `parameter_chart_allowed`;
 DROP TABLE IF EXISTS `chart_types`;
+DROP TABLE IF EXISTS `patient_waveform_chunks`;
+DROP TABLE IF EXISTS `patient_alert_events`;
+DROP TABLE IF EXISTS `patient_data_rollup`;
+DROP TABLE IF EXISTS `patient_latest_data`;
+DROP TABLE IF EXISTS `patient_data_archive`;
 DROP TABLE IF EXISTS `patient_data`;
 DROP TABLE IF EXISTS `parameter_reference`;
 DROP TABLE IF EXISTS `patients`;
@@ -246,7 +252,7 @@ CREATE TABLE `patient_data` (
                                 `id_patient` INT UNSIGNED NOT NULL,
                                 `parameter_id` VARCHAR(50) NOT NULL,
                                 `value` DECIMAL(15,2) DEFAULT NULL,
-                                `timestamp` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                                `timestamp` DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) COMMENT 'précision milliseconde (échantillonnage multi-fréquence)',
                                 `alert_flag` TINYINT(1) DEFAULT 0 COMMENT '1 si valeur critique',
                                 `created_by` INT UNSIGNED DEFAULT NULL,
                                 `archived` TINYINT(1) DEFAULT 0, -- à voir pour la partie historique des données
@@ -268,6 +274,119 @@ CREATE TABLE `patient_data` (
                                         ON DELETE SET NULL ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
+-- Table patient_data_archive : mesures de patient_data déplacées par la maintenance (python main.py maintain).
+-- Sans clés étrangères pour pouvoir être partitionnée par tranches de temps ; les partitions
+-- p<AAAAMMJJ> (borne supérieure) sont créées à l'avance et expirées par le script à partir de p_future
+CREATE TABLE `patient_data_archive` (
+                                `id_patient` INT UNSIGNED NOT NULL,
+                                `parameter_id` VARCHAR(50) NOT NULL,
+                                `value` DECIMAL(15,2) DEFAULT NULL,
+                                `timestamp` DATETIME(3) NOT NULL,
+                                `alert_flag` TINYINT(1) DEFAULT 0,
+                                `created_by` INT UNSIGNED DEFAULT NULL,
+                                `archived` TINYINT(1) DEFAULT 0,
+
+                                PRIMARY KEY (`id_patient`, `parameter_id`, `timestamp`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+    PARTITION BY RANGE COLUMNS(`timestamp`) (
+        PARTITION `p_future` VALUES LESS THAN (MAXVALUE)
+    );
+
+-- Table patient_latest_data : dernière valeur non archivée de chaque paramètre par patient,
+-- maintenue par le script d'insertion (database/main.py) dans la même transaction que patient_data
+CREATE TABLE `patient_latest_data` (
+                                `id_patient` INT UNSIGNED NOT NULL,
+                                `parameter_id` VARCHAR(50) NOT NULL,
+                                `value` DECIMAL(15,2) DEFAULT NULL,
+                                `timestamp` DATETIME(3) NOT NULL,
+                                `alert_flag` TINYINT(1) DEFAULT 0,
+                                `alert_level` TINYINT NOT NULL DEFAULT 0 COMMENT '-1 inconnu, 0 normal, 1 surveillance, 2 critique',
+                                `created_by` INT UNSIGNED DEFAULT NULL,
+
+                                PRIMARY KEY (`id_patient`, `parameter_id`),
+                                INDEX `ix_latest_patient_level` (`id_patient`, `alert_level`),
+
+                                CONSTRAINT `fk_patient_latest_patient`
+                                    FOREIGN KEY (`id_patient`) REFERENCES `patients` (`id_patient`)
+                                        ON DELETE CASCADE ON UPDATE CASCADE,
+
+                                CONSTRAINT `fk_patient_latest_parameter`
+                                    FOREIGN KEY (`parameter_id`) REFERENCES `parameter_reference` (`parameter_id`)
+                                        ON DELETE CASCADE ON UPDATE CASCADE,
+
+                                CONSTRAINT `fk_patient_latest_user`
+                                    FOREIGN KEY (`created_by`) REFERENCES `users` (`id_user`)
+                                        ON DELETE SET NULL ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Table patient_data_rollup : agrégats de patient_data par tranche de temps (tier_seconds = 60, 900, 3600),
+-- alimentée pendant l'ingestion par database/main.py (reconstruction : python main.py backfill_rollups)
+CREATE TABLE `patient_data_rollup` (
+                                `id_patient` INT UNSIGNED NOT NULL,
+                                `parameter_id` VARCHAR(50) NOT NULL,
+                                `tier_seconds` SMALLINT UNSIGNED NOT NULL,
+                                `bucket_start` DATETIME NOT NULL,
+                                `min_value` DECIMAL(15,2) NOT NULL,
+                                `max_value` DECIMAL(15,2) NOT NULL,
+                                `sum_value` DECIMAL(20,2) NOT NULL,
+                                `sample_count` INT UNSIGNED NOT NULL,
+                                `avg_value` DECIMAL(15,2) AS (`sum_value` / `sample_count`) VIRTUAL,
+                                `last_value` DECIMAL(15,2) NOT NULL,
+                                `last_timestamp` DATETIME(3) NOT NULL,
+
+                                PRIMARY KEY (`id_patient`, `parameter_id`, `tier_seconds`, `bucket_start`),
+
+                                CONSTRAINT `fk_patient_rollup_patient`
+                                    FOREIGN KEY (`id_patient`) REFERENCES `patients` (`id_patient`)
+                                        ON DELETE CASCADE ON UPDATE CASCADE,
+
+                                CONSTRAINT `fk_patient_rollup_parameter`
+                                    FOREIGN KEY (`parameter_id`) REFERENCES `parameter_reference` (`parameter_id`)
+                                        ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Table patient_alert_events : transitions de niveau d'alerte (0 normal, 1 surveillance, 2 critique)
+-- par patient / paramètre, avec hystérésis et durée minimale, écrites pendant l'ingestion par database/main.py
+CREATE TABLE `patient_alert_events` (
+                                `id_patient` INT UNSIGNED NOT NULL,
+                                `parameter_id` VARCHAR(50) NOT NULL,
+                                `timestamp` DATETIME(3) NOT NULL,
+                                `from_level` TINYINT NOT NULL,
+                                `to_level` TINYINT NOT NULL,
+                                `value` DECIMAL(15,2) NOT NULL,
+                                `confirmed_at` DATETIME(3) NOT NULL,
+
+                                PRIMARY KEY (`id_patient`, `parameter_id`, `timestamp`),
+                                KEY `ix_alert_events_timestamp` (`timestamp`),
+
+                                CONSTRAINT `fk_patient_alert_events_patient`
+                                    FOREIGN KEY (`id_patient`) REFERENCES `patients` (`id_patient`)
+                                        ON DELETE CASCADE ON UPDATE CASCADE,
+
+                                CONSTRAINT `fk_patient_alert_events_parameter`
+                                    FOREIGN KEY (`parameter_id`) REFERENCES `parameter_reference` (`parameter_id`)
+                                        ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Table patient_waveform_chunks : courbes haute fréquence (ECG, pléthysmographie, respiration),
+-- une ligne par bloc de durée fixe ; payload binaire décrit par encoding / scale (voir database/waveform.py)
+CREATE TABLE `patient_waveform_chunks` (
+                                `id_patient` INT UNSIGNED NOT NULL,
+                                `signal_id` VARCHAR(20) NOT NULL,
+                                `chunk_start` DATETIME(3) NOT NULL,
+                                `sample_rate` SMALLINT UNSIGNED NOT NULL COMMENT 'Hz',
+                                `sample_count` INT UNSIGNED NOT NULL,
+                                `encoding` ENUM('float32','int16','int16_delta') NOT NULL,
+                                `scale` FLOAT NOT NULL COMMENT 'valeur = entier * scale (encodages int16)',
+                                `payload` MEDIUMBLOB NOT NULL,
+
+                                PRIMARY KEY (`id_patient`, `signal_id`, `chunk_start`),
+
+                                CONSTRAINT `fk_patient_waveform_patient`
+                                    FOREIGN KEY (`id_patient`) REFERENCES `patients` (`id_patient`)
+                                        ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
 -- =========================
 -- TRIGGERS
 -- =========================
@@ -381,4 +500,21 @@ SELECT
 FROM `view_latest_patient_data` l
          JOIN `parameter_reference` pr ON pr.`parameter_id` = l.`parameter_id`;
 
+-- Niveau d'alerte courant de chaque série : dernier événement de patient_alert_events
+CREATE OR REPLACE VIEW `view_patient_alert_state` AS
+SELECT
+    e.`id_patient`,
+    e.`parameter_id`,
+    e.`to_level` AS `alert_level`,
+    e.`timestamp` AS `since`,
+    e.`value`
+FROM `patient_alert_events` e
+         JOIN (
+    SELECT `id_patient`, `parameter_id`, MAX(`timestamp`) AS max_ts
+    FROM `patient_alert_events`
+    GROUP BY `id_patient`, `parameter_id`
+) m ON m.`id_patient` = e.`id_patient`
+    AND m.`parameter_id` = e.`parameter_id`
+    AND m.max_ts = e.`timestamp`;
+
 COMMIT;
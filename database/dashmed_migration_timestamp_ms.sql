@@ -0,0 +1,30 @@
+-- Migration : horodatages à la milliseconde (échantillonnage multi-fréquence, SAMPLING_MODE = 'multirate').
+-- À appliquer sur une base créée avant le passage de dashmed_dev.sql en DATETIME(3) ;
+-- le script d'insertion (database/main.py) signale au démarrage les colonnes encore à la seconde.
+-- Les valeurs existantes sont conservées (millisecondes à 0). Chaque ALTER reconstruit la table :
+-- à lancer hors ingestion sur un gros historique.
+
+ALTER TABLE `patient_data`
+    MODIFY `timestamp` DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) COMMENT 'précision milliseconde (échantillonnage multi-fréquence)';
+
+-- patient_latest_data et patient_data_rollup n'existent que sur les bases créées avec le nouveau
+-- schéma (déjà en DATETIME(3)) : modifiées seulement si elles sont présentes
+SET @ddl = IF(
+    EXISTS(SELECT 1 FROM information_schema.tables
+           WHERE table_schema = DATABASE() AND table_name = 'patient_latest_data'),
+    'ALTER TABLE `patient_latest_data` MODIFY `timestamp` DATETIME(3) NOT NULL',
+    'DO 0'
+);
+PREPARE migration FROM @ddl;
+EXECUTE migration;
+DEALLOCATE PREPARE migration;
+
+SET @ddl = IF(
+    EXISTS(SELECT 1 FROM information_schema.tables
+           WHERE table_schema = DATABASE() AND table_name = 'patient_data_rollup'),
+    'ALTER TABLE `patient_data_rollup` MODIFY `last_timestamp` DATETIME(3) NOT NULL',
+    'DO 0'
+);
+PREPARE migration FROM @ddl;
+EXECUTE migration;
+DEALLOCATE PREPARE migration;
@@ -4,20 +4,51 @@ Lit les données depuis un fichier CSV et les insère de manière asynchrone.
 Les insertions sont parallélisées par cycle.
 """
 import asyncio
+import contextlib
 import csv
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import multiprocessing
 import os
 import random
-from datetime import datetime
-from collections import defaultdict
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 
 import aiomysql
 from dotenv import load_dotenv
 
+import metrics
+import pubsub
+import spool
+
+try:
+    import numpy as np
+    import waveform
+except ImportError:  # Seuls le moteur 'numpy', le mode 'multirate', les courbes et l'export en dépendent
+    np = None
+    waveform = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Seul l'export au format 'parquet' en dépend
+    pa = None
+    pq = None
+
 # Configuration de base
 CSV_FILE = 'patient_data.csv'
 INSERT_DELAY_SECONDS = 1.0
 DB_POOL_MIN_SIZE = 5
 DB_POOL_MAX_SIZE = 20
+DB_CONNECT_TIMEOUT_SECONDS = 5  # Détection rapide d'une base injoignable (bascule, redémarrage)
 DB_TABLE_NAME = 'patient_data'
 DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
 GENERATED_CYCLES = 1000
@@ -31,10 +62,254 @@ SPIKE_MULT = 4.0
 ALERT_PROB = 0.1
 MONITORING_PROB = 0.15
 TARGET_CHANGE_PROB = 0.05
+MAX_PICKS_PER_EPISODE = 4  # Paramètres critiques / en surveillance max par patient et par épisode
+
+# Moteur de simulation du générateur :
+#   'python' : pas à pas par paire (patient, paramètre)
+#   'numpy'  : état en tableaux NumPy, cycles calculés de façon vectorisée
+SIMULATION_ENGINE = 'python'
+
+# Échantillonnage de la génération infinie :
+#   'cycle'     : chaque paramètre de chaque patient une fois par INSERT_DELAY_SECONDS (horodatage à la seconde)
+#   'multirate' : fréquence propre à chaque paramètre, ordonnanceur à tas et horodatage à la milliseconde
+#                 (moteur NumPy requis)
+SAMPLING_MODE = 'cycle'
+SAMPLING_RATES_HZ = {
+    'FC_m': 4.0,
+    'SpO2_m': 1.0,
+    'PA_m': 1.0,
+    'FR_m': 1.0,
+    'Temp': 1 / 60,
+    'Diurese_h': 1 / 3600,
+}
+DEFAULT_SAMPLING_RATE_HZ = 1.0
+MULTIRATE_FLUSH_INTERVAL_MS = 250  # Période d'envoi des échantillons accumulés
+MULTIRATE_MAX_INFLIGHT = 4         # Envois simultanés au plus (au-delà, l'ordonnanceur attend la base)
+DATETIME_MS_FORMAT = '%Y-%m-%d %H:%M:%S.%f'  # Tronqué à la milliseconde (colonnes DATETIME(3))
+
+# Génération répartie sur plusieurs processus (1 = un seul processus, comportement historique).
+# Chaque worker possède une tranche disjointe de patients, son état de simulation et son pool.
+SHARD_WORKERS = 1
+SHARD_START_DELAY_SECONDS = 3  # Délai laissé aux workers pour démarrer avant le premier cycle commun
+
+# Reprise à chaud du simulateur (génération infinie) : valeur courante, cible et mode de chaque
+# série, compteur d'épisodes et état du générateur aléatoire sont enregistrés (JSON, écriture
+# atomique) au plus toutes les SIM_SNAPSHOT_INTERVAL_SECONDS, tels qu'à la fin du dernier lot
+# entièrement inséré. Au démarrage, les séries reprennent depuis ce fichier ; celles qui n'y
+# figurent pas partent de leur dernière valeur en base (SIM_SEED_FROM_DB), sinon du milieu de leur plage.
+# Désactivés par défaut (ainsi que SIM_SEED_FROM_DB) : chaque lancement repart de patients neufs.
+SIM_SNAPSHOT_ENABLED = False
+SIM_SNAPSHOT_FILE = 'simulator_state.json'  # '<fichier>.shard-N' par worker
+SIM_SNAPSHOT_INTERVAL_SECONDS = 5.0
+SIM_SEED_FROM_DB = False
+
+# Rafraîchissement à chaud des données de référence (patients, paramètres et seuils, utilisateurs) :
+# une requête de somme de contrôle toutes les REFERENCE_REFRESH_INTERVAL_SECONDS, rechargement
+# complet seulement si elle change. Les nouvelles listes remplacent les anciennes d'un bloc, entre
+# deux lots de génération ; le simulateur ajoute / retire les séries concernées.
+REFERENCE_REFRESH_ENABLED = True
+REFERENCE_REFRESH_INTERVAL_SECONDS = 10.0
 
 # Remplissage automatique des indicateurs absents du CSV
 FILL_VALUES = True
 
+# Lecture du CSV en flux : le fichier doit être trié par CSV_CYCLE_KEY
+# (une nouvelle valeur de la colonne = un nouveau cycle). Avec None, un cycle
+# se termine dès qu'une paire (patient, paramètre) réapparaît (aussi pour les lignes où la colonne
+# est absente ou vide).
+CSV_CYCLE_KEY = 'timestamp'
+CSV_CYCLES_PER_BATCH = 100  # Cycles lus d'un coup par le producteur
+CSV_QUEUE_MAXSIZE = 2       # Lots de cycles lus en avance (mémoire bornée)
+
+# Reprise de l'import CSV (mode 'replay') : le point de reprise (octet et numéro du prochain
+# cycle) est écrit atomiquement au plus toutes les CSV_CHECKPOINT_INTERVAL_SECONDS.
+# Une relance repart de ce point ; les lignes déjà en base sont ignorées (code 'duplicate').
+# Désactivé par défaut : une relance réimporte tout le fichier.
+CSV_CHECKPOINT_ENABLED = False
+CSV_CHECKPOINT_FILE = None  # None : <CSV_FILE>.checkpoint
+CSV_CHECKPOINT_INTERVAL_SECONDS = 1.0
+CSV_FINGERPRINT_BYTES = 65536  # Début du CSV haché pour détecter un fichier remplacé
+CSV_KEEP_TIMESTAMPS = True  # Horodatages du CSV conservés (sinon : créneau temps réel du cycle)
+
+# Mode d'écriture d'un cycle :
+#   'single' : une requête INSERT par enregistrement (une connexion du pool chacune)
+#   'batch'  : INSERT multi-lignes par paquets de BATCH_ROWS_PER_STATEMENT lignes
+# Défaut 'batch' (auparavant 'single', toujours disponible)
+INSERT_MODE = 'batch'
+BATCH_ROWS_PER_STATEMENT = 500
+
+# Politique de commit du mode 'batch' (le mode 'single' valide chaque ligne seule, en autocommit) :
+#   'chunk' : une transaction par paquet de BATCH_ROWS_PER_STATEMENT lignes
+#   'cycle' : les lignes d'un envoi (un cycle ou un groupe de cycles) sont réparties sur au plus
+#             COMMIT_CONNECTIONS transactions de plusieurs paquets, chacune validée en bloc
+# Les cycles temps réel sont regroupés par COMMIT_GROUP_CYCLES dans un envoi, tant que le premier
+# n'attend pas plus de COMMIT_LATENCY_BUDGET_SECONDS. Une transaction annulée par un deadlock
+# ou une attente de verrou est rejouée jusqu'à COMMIT_MAX_RETRIES fois.
+COMMIT_POLICY = 'chunk'
+COMMIT_CONNECTIONS = 4
+COMMIT_GROUP_CYCLES = 1
+COMMIT_LATENCY_BUDGET_SECONDS = 2.0
+COMMIT_MAX_RETRIES = 3
+COMMIT_RETRY_BACKOFF_SECONDS = 0.05  # Doublé à chaque nouvelle tentative
+
+# Table des dernières valeurs (une ligne par patient / paramètre), mise à jour dans la même
+# transaction que les mesures brutes ; désactivée automatiquement si la table est absente
+MAINTAIN_LATEST_TABLE = True
+LATEST_TABLE_NAME = 'patient_latest_data'
+
+# Agrégats min/max/moyenne/dernière valeur par tranche de temps (1 min, 15 min, 1 h),
+# tenus en mémoire pendant l'ingestion et écrits quand la tranche est close.
+# Reconstruction depuis l'historique : `python main.py backfill_rollups`
+MAINTAIN_ROLLUPS = True
+ROLLUP_TABLE_NAME = 'patient_data_rollup'
+ROLLUP_TIERS = (60, 900, 3600)  # Largeur des tranches, en secondes
+ROLLUP_BACKFILL_FETCH_ROWS = 10000  # Lignes lues à la fois par le curseur serveur
+ROLLUP_BACKFILL_FLUSH_BUCKETS = 5000  # Tranches écrites par requête pendant la reconstruction
+
+# Transitions d'alerte (normal / surveillance / critique) par série (patient, paramètre),
+# calculées pendant l'ingestion et écrites en un lot par cycle dans ALERT_EVENTS_TABLE_NAME.
+# Un niveau ne redescend que si la valeur repasse le seuil d'une marge (hystérésis, en fraction
+# de la largeur de la zone normale) et ne change qu'après ALERT_MIN_DURATION_SECONDS de maintien
+MAINTAIN_ALERT_EVENTS = True
+ALERT_EVENTS_TABLE_NAME = 'patient_alert_events'
+ALERT_HYSTERESIS_RATIO = 0.05
+ALERT_MIN_DURATION_SECONDS = 5
+
+# Courbes haute fréquence (mode 'waveform') : un bloc binaire par signal, patient et période
+# WAVEFORM_CHUNK_SECONDS, inséré dans WAVEFORM_TABLE_NAME (voir waveform.py)
+WAVEFORM_TABLE_NAME = 'patient_waveform_chunks'
+WAVEFORM_SIGNALS = {'ECG_II': 250, 'PLETH': 125, 'RESP': 25}  # Fréquence d'échantillonnage (Hz)
+WAVEFORM_CHUNK_SECONDS = 1.0
+WAVEFORM_ENCODING = 'int16_delta'  # 'float32', 'int16' ou 'int16_delta'
+
+# Mode d'exécution (surchargé par le premier argument de la ligne de commande) :
+#   'ingest'           : import du CSV ou génération infinie
+#   'backfill_rollups' : reconstruction de ROLLUP_TABLE_NAME depuis patient_data
+#   'waveform'         : génération continue des courbes haute fréquence
+#   'export'           : génération hors ligne d'un jeu de données dans des fichiers (sans base)
+#   'replay_db'        : rejeu accéléré d'un historique patient_data vers la base cible
+#   'maintain'         : archivage / purge par paquets de l'historique et gestion des partitions
+RUN_MODE = 'ingest'
+
+# Rejeu d'un historique (mode 'replay_db') : lignes de REPLAY_SOURCE_TABLE (base REPLAY_DB_*)
+# lues dans l'ordre des horodatages, re-horodatées sur l'horloge de rejeu et insérées par paquets
+REPLAY_SOURCE_TABLE = 'patient_data'
+REPLAY_TARGET_TABLE = None  # None : DB_TABLE_NAME (autre table : dernières valeurs et agrégats non maintenus)
+REPLAY_FROM = None  # Bornes [début, fin) des horodatages source ('AAAA-MM-JJ HH:MM:SS'), None : tout
+REPLAY_TO = None
+REPLAY_SPEED = 10.0  # Facteur d'accélération (1 = temps réel, 0 = aussi vite que possible)
+REPLAY_KEEP_TIMESTAMPS = False  # Conserver les horodatages source (toujours le cas à vitesse maximale)
+REPLAY_FETCH_ROWS = 10000  # Lignes par page lue dans la source
+REPLAY_BATCH_ROWS = 5000  # Lignes par envoi au plus
+REPLAY_FLUSH_INTERVAL_MS = 250  # Lignes dues dans cette fenêtre envoyées ensemble
+REPLAY_MAX_INFLIGHT = 4  # Envois simultanés au plus (au-delà, la lecture attend la base)
+
+# Maintenance de l'historique (mode 'maintain') : les mesures de DB_TABLE_NAME plus anciennes que
+# ARCHIVE_AFTER_DAYS jours sont déplacées vers ARCHIVE_TABLE_NAME ('archive') ou supprimées ('purge'),
+# série par série et par courtes transactions, sans bloquer l'insertion temps réel.
+# ARCHIVE_TABLE_NAME (et DB_TABLE_NAME si elle est partitionnée) est découpée en partitions de
+# PARTITION_DAYS jours, créées PARTITIONS_AHEAD tranches à l'avance ; les partitions de l'archive
+# plus anciennes que ARCHIVE_RETENTION_DAYS jours sont supprimées (None : conservées).
+MAINTENANCE_ACTION = 'archive'
+ARCHIVE_TABLE_NAME = 'patient_data_archive'
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_RETENTION_DAYS = 365
+PARTITION_DAYS = 7
+PARTITIONS_AHEAD = 4
+MAINTENANCE_CHUNK_ROWS = 2000  # Lignes par transaction au départ, ajusté selon la durée des paquets
+MAINTENANCE_MIN_CHUNK_ROWS = 100
+MAINTENANCE_MAX_CHUNK_ROWS = 20000
+MAINTENANCE_TARGET_CHUNK_SECONDS = 0.2  # Durée visée d'une transaction
+MAINTENANCE_DUTY_CYCLE = 0.25  # Part du temps passée en transaction (pause après chaque paquet)
+MAINTENANCE_LOCK_WAIT_TIMEOUT_SECONDS = 1  # innodb_lock_wait_timeout de la session : cède la place à l'insertion
+MAINTENANCE_INTERVAL_SECONDS = 3600  # Entre deux passes (0 : une seule passe)
+
+# Export hors ligne (mode 'export') : le simulateur (moteur NumPy) tourne sans rythme ni base
+# et écrit dans EXPORT_DIR un fichier (ou une suite de fichiers) par tranche de patients.
+#   'parquet' : un fichier Parquet par tranche, un groupe de lignes par paquet (pyarrow requis)
+#   'binary'  : un fichier .npz par paquet, une colonne par tableau (types compacts)
+#   'csv'     : un CSV par tranche, au format d'import de ce script
+# Sans pyarrow, 'parquet' se replie sur 'binary'.
+EXPORT_FORMAT = 'parquet'
+EXPORT_DIR = 'export'
+EXPORT_START = '2024-01-01 00:00:00'
+EXPORT_PERIOD_SECONDS = 1
+EXPORT_DURATION_SECONDS = 30 * 24 * 3600
+EXPORT_PATIENTS = 500  # Patients numérotés 1..N (None : patients découverts en base)
+EXPORT_WORKERS = os.cpu_count() or 1  # Processus, une tranche de patients chacun
+EXPORT_CHUNK_ROWS = 2_000_000  # Lignes par paquet écrit (mémoire bornée)
+EXPORT_SEED = None  # Graine du générateur (reproductible si fixée)
+EXPORT_REFERENCE_SQL = 'dashmed_inserts.sql'  # Paramètres et seuils si la base n'est pas configurée
+
+# Pilotage du rythme temps réel quand la base ne suit pas :
+#   'none'        : avertissement seulement, les cycles en retard s'enchaînent
+#   'catch_up'    : les cycles en retard sont regroupés et insérés en un seul lot
+#   'drop_oldest' : les cycles en retard sont abandonnés, on repart du plus récent
+#   'degrade'     : sous-échantillonnage des paramètres non prioritaires tant que le retard persiste
+# Les deux dernières perdent des lignes : réservées au générateur, remplacées par 'catch_up' pour un CSV
+PACING_POLICY = 'none'
+LOSSLESS_PACING_POLICIES = ('none', 'catch_up')
+PACING_MAX_COALESCED_CYCLES = 10        # Cycles regroupés au plus par lot de rattrapage
+PACING_DEGRADE_MAX_FACTOR = 8           # Sous-échantillonnage maximal (1 cycle sur N)
+PACING_RECOVERY_CYCLES = 10             # Cycles à l'heure avant de réduire le sous-échantillonnage
+PACING_PRIORITY_PARAMETERS = {'FC_m', 'SpO2_m', 'PA_m', 'FR_m'}  # Jamais sous-échantillonnés
+PACING_LATENCY_WINDOW = 300             # Cycles pris en compte pour les percentiles de latence
+PACING_REPORT_INTERVAL = 60             # Cycles entre deux rapports de rythme
+
+# Flux temps réel : chaque cycle validé en base est publié aux abonnés de chaque patient
+# (socket Unix PUBSUB_UNIX_SOCKET si renseignée, sinon TCP PUBSUB_HOST:PUBSUB_PORT ; voir pubsub.py)
+PUBSUB_ENABLED = False
+PUBSUB_UNIX_SOCKET = None
+PUBSUB_HOST = '127.0.0.1'
+PUBSUB_PORT = 9109
+PUBSUB_SUBSCRIBER_BUFFER = 256  # Patients en attente par abonné lent (au-delà, le plus ancien est abandonné)
+
+# Limiteur adaptatif (AIMD) des écritures simultanées, devant le pool : la limite croît de 1
+# toutes les « limite » requêtes réussies et est multipliée par LIMITER_BACKOFF_RATIO quand une
+# requête dépasse LIMITER_LATENCY_TOLERANCE × la latence de référence des requêtes de même taille
+# (+ LIMITER_LATENCY_SLACK_SECONDS) ou échoue par surcharge (connexion, verrou, deadlock).
+# La limite reste sous le plafond du pool (DB_POOL_MAX_SIZE) : le limiteur n'ouvre pas plus de connexions.
+# Désactivé : limite fixe à DB_POOL_MAX_SIZE.
+LIMITER_ENABLED = True
+LIMITER_INITIAL_CONCURRENCY = 8
+LIMITER_MIN_CONCURRENCY = 2
+LIMITER_MAX_CONCURRENCY = DB_POOL_MAX_SIZE  # Plafonné à DB_POOL_MAX_SIZE
+LIMITER_LATENCY_TOLERANCE = 2.0
+LIMITER_LATENCY_SLACK_SECONDS = 0.005
+LIMITER_BACKOFF_RATIO = 0.75
+
+# Spool disque pendant une indisponibilité de la base (voir spool.py) : un paquet dont la
+# connexion échoue est écrit dans SPOOL_DIR, puis tant que la base est marquée injoignable les
+# boucles temps réel y écrivent directement. Une tâche de fond sonde la base toutes les
+# SPOOL_HEALTH_CHECK_SECONDS et, une fois rétablie, rejoue le spool par lots ordonnés.
+SPOOL_ENABLED = True
+SPOOL_DIR = 'spool'
+SPOOL_SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+SPOOL_MAX_BYTES = 1024 * 1024 * 1024  # Au-delà, les nouvelles lignes sont perdues (comptées en erreur)
+SPOOL_FSYNC_INTERVAL_SECONDS = 1.0
+SPOOL_HEALTH_CHECK_SECONDS = 2.0
+SPOOL_DRAIN_BATCH_ROWS = 5000
+SPOOL_DRAIN_MAX_ROWS_PER_SECOND = 20000  # Rejeu limité pour laisser la base aux cycles en direct
+
+# Instrumentation (compteurs / histogrammes par étape), exposée sur http://METRICS_HOST:METRICS_PORT/metrics
+METRICS_ENABLED = False
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = 9108
+METRICS_LOG_INTERVAL_SECONDS = 60  # Journal JSON périodique des métriques (0 = désactivé)
+
+# Import du CSV :
+#   'replay' : rejoue le CSV cycle par cycle au rythme INSERT_DELAY_SECONDS
+#   'bulk'   : chargement massif via LOAD DATA LOCAL INFILE, sans temporisation
+CSV_IMPORT_MODE = 'replay'
+BULK_ROWS_PER_LOAD = 200000  # Lignes par fichier tampon (= par transaction)
+BULK_DROP_SECONDARY_INDEXES = False
+
+# Index secondaires de patient_data (supprimés puis recréés autour d'un import massif)
+SECONDARY_INDEXES = {
+    'ix_patient_param_time': '(id_patient, parameter_id, timestamp)',
+    'ix_patient_archived_time': '(id_patient, archived, timestamp)',
+}
+
 # Colonnes de la table cible
 DB_COLUMNS = [
     'id_patient',
@@ -55,6 +330,14 @@ DB_CONFIG = {
     'db': os.getenv('DB_NAME'),
 }
 
+# Base source du mode 'replay_db' (variables REPLAY_DB_*, à défaut celles de la base cible)
+REPLAY_SOURCE_CONFIG = {
+    'host': os.getenv('REPLAY_DB_HOST'),
+    'user': os.getenv('REPLAY_DB_USER'),
+    'password': os.getenv('REPLAY_DB_PASS'),
+    'db': os.getenv('REPLAY_DB_NAME'),
+}
+
 # Listes de validation chargées depuis la BDD au démarrage
 VALID_PATIENT_IDS = []
 VALID_PARAMETERS = []
@@ -62,24 +345,148 @@ VALID_USER_IDS = []
 PARAMETER_RANGES = {}  # {parameter_id: {'dm': display_min, 'dmx': display_max, 'nm': normal_min, 'nmx': normal_max, 'cm': critical_min, 'cmx': critical_max}}
 PARAM_VOLATILITY = {}  # {parameter_id: volatility_float}
 
-def load_csv_data(filepath: str):
-    """Charge le CSV en mémoire sous forme de liste de dictionnaires."""
-    print(f"[DEBUG] Chargement du fichier CSV: {filepath}")
-    data = []
-    with open(filepath, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
+# Index de validation (recherche O(1)), reconstruits par build_validation_indexes
+VALID_PATIENT_SET = frozenset()
+VALID_PARAMETER_SET = frozenset()
+VALID_USER_SET = frozenset()
+
+# Codes de rejet de la validation pré-insertion
+REJECT_INVALID_PATIENT = 'invalid_patient'
+REJECT_UNKNOWN_PATIENT = 'unknown_patient'
+REJECT_UNKNOWN_PARAMETER = 'unknown_parameter'
+REJECT_INVALID_USER = 'invalid_user'
+REJECT_UNKNOWN_USER = 'unknown_user'
+REJECT_INVALID_VALUE = 'invalid_value'
+REJECT_DUPLICATE = 'duplicate'
+
+REJECT_MESSAGES = {
+    REJECT_INVALID_PATIENT: "id_patient invalide",
+    REJECT_UNKNOWN_PATIENT: "Patient non trouvé",
+    REJECT_UNKNOWN_PARAMETER: "Paramètre non trouvé",
+    REJECT_INVALID_USER: "created_by invalide",
+    REJECT_UNKNOWN_USER: "Utilisateur non trouvé",
+    REJECT_INVALID_VALUE: "Valeur invalide",
+    REJECT_DUPLICATE: "Déjà présent en base",
+}
+
+# Statut d'une insertion unitaire
+RESULT_SUCCESS = 'success'
+RESULT_SKIP = 'skip'
+RESULT_ERROR = 'error'
+RESULT_SPOOLED = 'spooled'
+
+# Décompte cumulé des enregistrements ignorés, par code de rejet
+skip_reasons = defaultdict(int)
+
+# Décompte cumulé des lignes refusées par la base lors de la reprise ligne à ligne, par code MySQL
+error_reasons = defaultdict(int)
+
+class Measurement:
+    """
+    Mesure typée et compacte, utilisée du producteur (CSV ou générateur) jusqu'à l'insertion.
+    Les champs suivent DB_COLUMNS ; un champ entier illisible dans le CSV vaut None
+    et l'enregistrement est rejeté par validate_record.
+    """
+    __slots__ = tuple(DB_COLUMNS)
+
+    def __init__(self, id_patient, parameter_id, value, timestamp=None, alert_flag=0, created_by=1, archived=0):
+        self.id_patient = id_patient
+        self.parameter_id = parameter_id
+        self.value = value
+        self.timestamp = timestamp
+        self.alert_flag = alert_flag
+        self.created_by = created_by
+        self.archived = archived
+
+    def as_row(self, timestamp):
+        """
+        Tuple de valeurs dans l'ordre de DB_COLUMNS, prêt pour le curseur.
+        `timestamp` ne sert que si la mesure n'a pas son propre horodatage (CSV).
+        """
+        return (self.id_patient, self.parameter_id, self.value, self.timestamp or timestamp,
+                self.alert_flag, self.created_by, self.archived)
+
+    def __repr__(self):
+        return f"Measurement(P{self.id_patient}-{self.parameter_id}={self.value})"
+
+
+def parse_int(text, default=None):
+    """Convertit un champ CSV en entier, `default` si vide, None si illisible."""
+    if text is None or text == '':
+        return default
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+def parse_float(text):
+    """Convertit un champ CSV en flottant, None si vide ou illisible."""
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_csv_records(filepath: str, progress: dict = None, start_offset: int = 0):
+    """
+    Lit le CSV ligne à ligne (générateur) sans jamais le charger en mémoire
+    et produit directement des Measurement (parameter_id interné).
+    Si `progress` est fourni, progress['bytes'] suit la position de lecture et
+    progress['offset'] l'octet de début du dernier enregistrement produit
+    (la taille du fichier une fois la lecture terminée).
+    `start_offset` reprend la lecture à cet octet (début d'un enregistrement) après l'en-tête.
+    """
+    print(f"[DEBUG] Lecture en flux du fichier CSV: {filepath}")
+    with open(filepath, 'rb') as f:
+        position = 0
+
+        def lines():
+            nonlocal position
+            for raw in f:
+                position += len(raw)
+                if progress is not None:
+                    progress['bytes'] = position
+                yield raw.decode('utf-8')
+
+        reader = csv.reader(lines())
+        header = next(reader, None)
+        if header is None:
+            return
+        if start_offset > position:
+            f.seek(start_offset)
+            position = start_offset
+        index = {name: i for i, name in enumerate(header)}
+        i_patient, i_param, i_value = index['id_patient'], index['parameter_id'], index['value']
+        i_timestamp = index.get('timestamp')
+        i_alert, i_created, i_archived = index.get('alert_flag'), index.get('created_by'), index.get('archived')
+        intern = sys.intern
+
+        record_start = position
         for row in reader:
-            data.append(row)
-    print(f"[DEBUG] {len(data)} lignes chargées")
-    return data
+            if progress is not None:
+                progress['offset'] = record_start
+            record_start = position
+            if not row:
+                continue
+            yield Measurement(
+                parse_int(row[i_patient]),
+                intern(row[i_param]),
+                parse_float(row[i_value]),
+                (row[i_timestamp] or None) if i_timestamp is not None else None,
+                parse_int(row[i_alert], 0) if i_alert is not None else 0,
+                parse_int(row[i_created]) if i_created is not None else None,
+                parse_int(row[i_archived], 0) if i_archived is not None else 0,
+            )
+
+        if progress is not None:
+            progress['offset'] = position
 
 
 def generate_fill_value(parameter_id: str) -> float:
     """Génère une valeur aléatoire dans la plage display_min/display_max récupérée de la BDD."""
-    if parameter_id in PARAMETER_RANGES:
-        min_val, max_val = PARAMETER_RANGES[parameter_id]
-        return round(random.uniform(min_val, max_val), 2)
-    return round(random.uniform(0, 100), 2)
+    min_val, max_val = get_param_bounds(parameter_id)
+    return round(random.uniform(min_val, max_val), 2)
 
 def get_param_bounds(parameter_id: str) -> tuple[float, float]:
     """Retourne (display_min, display_max) pour le clamping."""
@@ -133,17 +540,22 @@ def is_in_alert(parameter_id: str, value: float) -> int:
 
     return 0
 
-def get_new_target(parameter_id: str, mode: int = 0) -> float:
-    """
-    Décide d'une nouvelle valeur cible selon les seuils BDD et le mode.
-    """
-    if parameter_id not in PARAMETER_RANGES: return 50.0
+def get_target_zones(parameter_id: str) -> tuple:
+    """Retourne (dm, dmx, nm, nmx, cm, cmx) avec les replis utilisés pour choisir une cible."""
     p = PARAMETER_RANGES[parameter_id]
 
     # Fallback si les seuils sont mal définis
     dm, dmx = p['dm'], p['dmx']
     nm, nmx = p['nm'] or dm, p['nmx'] or dmx
     cm, cmx = p['cm'] or nm - 5, p['cmx'] or nmx + 5
+    return dm, dmx, nm, nmx, cm, cmx
+
+def get_new_target(parameter_id: str, mode: int = 0) -> float:
+    """
+    Décide d'une nouvelle valeur cible selon les seuils BDD et le mode.
+    """
+    if parameter_id not in PARAMETER_RANGES: return 50.0
+    dm, dmx, nm, nmx, cm, cmx = get_target_zones(parameter_id)
 
     if mode == 2:
         # Zone critique (Hors cm/cmx)
@@ -164,6 +576,37 @@ def get_new_target(parameter_id: str, mode: int = 0) -> float:
         safe_nmx = nmx - (nmx - nm) * 0.25
         return random.uniform(safe_nm, safe_nmx)
 
+# Métriques par étape du pipeline (sans effet tant que metrics.ENABLED est faux)
+STAGE_SECONDS = {
+    stage: metrics.histogram('dashmed_stage_seconds', "Durée des étapes du pipeline", {'stage': stage})
+    for stage in ('read', 'generate', 'group', 'validate')
+}
+POOL_WAIT_SECONDS = metrics.histogram('dashmed_pool_wait_seconds', "Attente d'une connexion du pool")
+SQL_SECONDS = metrics.histogram('dashmed_sql_seconds', "Durée d'exécution des requêtes INSERT")
+CYCLE_SECONDS = metrics.histogram('dashmed_cycle_seconds', "Durée d'insertion d'un lot de cycles")
+ROWS_TOTAL = {
+    status: metrics.counter('dashmed_rows_total', "Enregistrements traités par statut", {'status': status})
+    for status in (RESULT_SUCCESS, RESULT_SKIP, RESULT_ERROR)
+}
+CYCLES_TOTAL = metrics.counter('dashmed_cycles_total', "Cycles insérés")
+QUEUE_DEPTH = metrics.gauge('dashmed_batch_queue_depth', "Lots de cycles en attente dans la queue du producteur")
+CYCLE_LAG = metrics.gauge('dashmed_cycle_lag_seconds', "Retard du cycle courant sur l'horloge temps réel")
+DB_UP = metrics.gauge('dashmed_db_up', "1 si la base est joignable, 0 si les mesures partent au spool")
+LIMITER_LIMIT = metrics.gauge('dashmed_write_concurrency_limit', "Limite courante d'écritures simultanées")
+LIMITER_INFLIGHT = metrics.gauge('dashmed_write_inflight', "Écritures en cours")
+LIMITER_WAIT_SECONDS = metrics.histogram('dashmed_write_limiter_wait_seconds', "Attente d'une place du limiteur d'écritures")
+COMMITS_TOTAL = metrics.counter('dashmed_commits_total', "Transactions d'insertion validées")
+COMMIT_RETRIES_TOTAL = metrics.counter('dashmed_commit_retries_total', "Transactions rejouées après un deadlock ou une attente de verrou")
+ALERT_TRANSITIONS_TOTAL = {
+    level: metrics.counter('dashmed_alert_transitions_total', "Transitions d'alerte émises par niveau atteint", {'to_level': str(level)})
+    for level in (0, 1, 2)
+}
+SPOOL_PENDING = metrics.gauge('dashmed_spool_pending_rows', "Lignes en attente dans le spool disque")
+SPOOL_ROWS = {
+    event: metrics.counter('dashmed_spool_rows_total', "Lignes écrites dans / rejouées depuis le spool", {'event': event})
+    for event in ('spooled', 'drained', 'rejected')
+}
+
 # Variables globales d'état pour la génération infinie
 generation_states = {}
 episode_count = 0
@@ -189,7 +632,7 @@ def generate_batch(num_cycles: int = 100) -> list:
         return []
 
     data = []
-    default_created_by = str(VALID_USER_IDS[0]) if VALID_USER_IDS else '1'
+    default_created_by = VALID_USER_IDS[0] if VALID_USER_IDS else 1
 
     for cycle_idx in range(num_cycles):
         if cycle_idx == 0:
@@ -210,11 +653,11 @@ def generate_batch(num_cycles: int = 100) -> list:
                     s = generation_states[(patient_id, param_id)]
                     roll = random.random()
 
-                    if roll < ALERT_PROB and crit_count < 4:
+                    if roll < ALERT_PROB and crit_count < MAX_PICKS_PER_EPISODE:
                         s['mode'] = 2
                         crit_count += 1
                         alerts.append(param_id)
-                    elif roll < ALERT_PROB + MONITORING_PROB and monit_count < 4:
+                    elif roll < ALERT_PROB + MONITORING_PROB and monit_count < MAX_PICKS_PER_EPISODE:
                         s['mode'] = 1
                         monit_count += 1
                         monitoring.append(param_id)
@@ -242,20 +685,431 @@ def generate_batch(num_cycles: int = 100) -> list:
                 res_flag = min(is_in_alert(param_id, nxt), s['mode'])
                 db_alert_flag = 1 if res_flag == 2 else 0
 
-                record = {
-                    'id_patient': str(patient_id),
-                    'parameter_id': param_id,
-                    'value': str(nxt),
-                    'timestamp': '',
-                    'alert_flag': str(db_alert_flag),
-                    'created_by': default_created_by,
-                    'archived': '0'
-                }
-                data.append(record)
+                data.append(Measurement(patient_id, param_id, nxt, None, db_alert_flag, default_created_by, 0))
 
     return data
 
 
+# État du moteur vectorisé : tableaux (patients x paramètres) et constantes par paramètre
+vector_states = {}
+
+def init_vector_states():
+    """Initialise l'état du moteur 'numpy' (équivalent vectorisé de init_generation_states)."""
+    global episode_count
+    vector_states.clear()
+    episode_count = 0
+
+    n_patients, n_params = len(VALID_PATIENT_IDS), len(VALID_PARAMETERS)
+    nan = float('nan')
+
+    bounds = np.array([get_param_bounds(p) for p in VALID_PARAMETERS], dtype=np.float64).reshape(n_params, 2)
+    mn, mx = bounds[:, 0], bounds[:, 1]
+    span = np.maximum(mx - mn, 1e-6)
+    vol = np.array([PARAM_VOLATILITY.get(p, VOLATILITY_DEFAULT) for p in VALID_PARAMETERS], dtype=np.float64)
+
+    # Seuils d'alerte bruts (NaN = seuil absent, toute comparaison est alors fausse)
+    def threshold(key):
+        return np.array([
+            PARAMETER_RANGES[p][key] if p in PARAMETER_RANGES and PARAMETER_RANGES[p][key] is not None else nan
+            for p in VALID_PARAMETERS
+        ], dtype=np.float64)
+
+    # Zones cibles (avec les replis de get_target_zones), NaN pour un paramètre sans seuils
+    zones = np.array([
+        get_target_zones(p) if p in PARAMETER_RANGES else (nan,) * 6
+        for p in VALID_PARAMETERS
+    ], dtype=np.float64).reshape(n_params, 6)
+    dm, dmx, nm, nmx, cm, cmx = zones.T
+
+    mid = np.tile((mn + mx) / 2, (n_patients, 1))
+    vector_states.update({
+        'rng': np.random.default_rng(),
+        'index': {patient_id: i for i, patient_id in enumerate(VALID_PATIENT_IDS)},
+        'col': {param_id: j for j, param_id in enumerate(VALID_PARAMETERS)},
+        'current': mid,
+        'target': mid.copy(),
+        'mode': np.zeros((n_patients, n_params), dtype=np.int8),
+        'min': mn,
+        'max': mx,
+        'step': np.maximum(span * vol, MIN_STEP_ABS),
+        'nm': threshold('nm'),
+        'nmx': threshold('nmx'),
+        'cm': threshold('cm'),
+        'cmx': threshold('cmx'),
+        'has_range': np.array([p in PARAMETER_RANGES for p in VALID_PARAMETERS]),
+        # Intervalles [bas, haut] de tirage des cibles : critique (2 côtés), surveillance (2 côtés), normal
+        'crit_hi': (cmx, dmx), 'crit_lo': (dm, cm),
+        'monit_hi': (nmx, cmx), 'monit_lo': (cm, nm),
+        'normal': (nm + (nmx - nm) * 0.25, nmx - (nmx - nm) * 0.25),
+    })
+
+
+def vector_new_targets(mode, cols):
+    """Version vectorisée de get_new_target pour des modes et indices de paramètres donnés."""
+    st = vector_states
+    rng = st['rng']
+    upper = rng.random(mode.shape) > 0.5
+    u = rng.random(mode.shape)
+
+    def pick(zone):
+        return zone[0][cols], zone[1][cols]
+
+    (ch_lo, ch_hi), (cl_lo, cl_hi) = pick(st['crit_hi']), pick(st['crit_lo'])
+    (mh_lo, mh_hi), (ml_lo, ml_hi) = pick(st['monit_hi']), pick(st['monit_lo'])
+    n_lo, n_hi = pick(st['normal'])
+
+    lo = np.where(mode == 2, np.where(upper, ch_lo, cl_lo),
+                  np.where(mode == 1, np.where(upper, mh_lo, ml_lo), n_lo))
+    hi = np.where(mode == 2, np.where(upper, ch_hi, cl_hi),
+                  np.where(mode == 1, np.where(upper, mh_hi, ml_hi), n_hi))
+
+    return np.where(st['has_range'][cols], lo + (hi - lo) * u, 50.0)
+
+
+def vector_new_episode():
+    """
+    Tire les modes d'un nouvel épisode pour tous les patients d'un coup.
+    Reproduit generate_batch : paramètres parcourus dans un ordre aléatoire par patient,
+    au plus MAX_PICKS_PER_EPISODE critiques puis MAX_PICKS_PER_EPISODE en surveillance.
+    """
+    st = vector_states
+    rng = st['rng']
+    shape = st['mode'].shape
+
+    rolls = rng.random(shape)
+    order = np.argsort(rng.random(shape), axis=1)  # Permutation aléatoire par patient
+    shuffled = np.take_along_axis(rolls, order, axis=1)
+
+    crit = shuffled < ALERT_PROB
+    crit &= np.cumsum(crit, axis=1) <= MAX_PICKS_PER_EPISODE
+    monit = (shuffled < ALERT_PROB + MONITORING_PROB) & ~crit
+    monit &= np.cumsum(monit, axis=1) <= MAX_PICKS_PER_EPISODE
+
+    mode = np.empty(shape, dtype=np.int8)
+    np.put_along_axis(mode, order, np.where(crit, 2, np.where(monit, 1, 0)).astype(np.int8), axis=1)
+    st['mode'] = mode
+
+    cols = np.broadcast_to(np.arange(shape[1]), shape)
+    st['target'] = vector_new_targets(mode, cols)
+
+
+def vector_step(cols=slice(None), dt: float = 1.0):
+    """
+    Calcule un pas pour les colonnes de paramètres `cols` (toutes par défaut) :
+    bruit, spikes, rappel vers la cible, clamp et niveau d'alerte.
+    `dt` est la durée du pas en cycles : le bruit croît en racine de dt et le rappel
+    est composé, pour garder la même dynamique quelle que soit la fréquence.
+    """
+    st = vector_states
+    rng = st['rng']
+    current, target = st['current'][:, cols], st['target'][:, cols]
+    shape = current.shape
+
+    delta = rng.uniform(-1.0, 1.0, shape) * st['step'][cols]
+    if dt != 1.0:
+        delta *= math.sqrt(dt)
+    delta[rng.random(shape) < SPIKE_PROB] *= SPIKE_MULT
+
+    pull = 0.1 if dt == 1.0 else 1.0 - 0.9 ** dt
+    nxt = current + delta + (target - current) * pull
+    np.clip(nxt, st['min'][cols], st['max'][cols], out=nxt)
+    nxt = np.round(nxt, 2)
+    st['current'][:, cols] = nxt
+
+    level = np.where((nxt < st['cm'][cols]) | (nxt > st['cmx'][cols]), 2,
+                     np.where((nxt < st['nm'][cols]) | (nxt > st['nmx'][cols]), 1, 0))
+    alert = np.minimum(level, st['mode'][:, cols]) == 2
+    return nxt, alert
+
+
+def generate_episode_arrays(num_cycles: int) -> tuple:
+    """
+    Un épisode de `num_cycles` cycles (moteur vectorisé) : nouveaux modes au premier cycle,
+    puis changements de cible et pas de simulation. Retourne (valeurs, alertes), tableaux
+    cycles x patients x paramètres.
+    """
+    global episode_count
+    st = vector_states
+    rng = st['rng']
+    n_patients, n_params = st['mode'].shape
+    values = np.empty((num_cycles, n_patients, n_params))
+    alerts = np.empty((num_cycles, n_patients, n_params), dtype=bool)
+
+    for cycle_idx in range(num_cycles):
+        if cycle_idx == 0:
+            episode_count += 1
+            vector_new_episode()
+        else:
+            change = rng.random((n_patients, n_params)) < TARGET_CHANGE_PROB
+            rows, cols = np.nonzero(change)
+            if rows.size:
+                st['target'][rows, cols] = vector_new_targets(st['mode'][rows, cols], cols)
+
+        values[cycle_idx], alerts[cycle_idx] = vector_step()
+    return values, alerts
+
+
+def generate_batch_vectorized(num_cycles: int = 100) -> list:
+    """Équivalent vectorisé de generate_batch : mêmes mesures, même comportement statistique."""
+    if not VALID_PATIENT_IDS or not VALID_PARAMETERS:
+        return []
+
+    st = vector_states
+    values, alerts = generate_episode_arrays(num_cycles)
+    crit_patients = int(np.count_nonzero((st['mode'] == 2).any(axis=1)))
+    monit_patients = int(np.count_nonzero((st['mode'] == 1).any(axis=1)))
+    print(f"\n[DÉCISION] Épisode {episode_count} (Génération de {num_cycles} cycles en arrière-plan, moteur numpy)")
+    print(f"  {crit_patients} patients avec paramètres CRITIQUES | {monit_patients} patients en SURVEILLANCE")
+
+    default_created_by = VALID_USER_IDS[0] if VALID_USER_IDS else 1
+    flags = alerts.reshape(-1).astype(np.int8).tolist()
+    pairs = [(patient_id, param_id) for patient_id in VALID_PATIENT_IDS for param_id in VALID_PARAMETERS] * num_cycles
+
+    return [
+        Measurement(patient_id, param_id, value, None, flag, default_created_by, 0)
+        for (patient_id, param_id), value, flag in zip(pairs, values.reshape(-1).tolist(), flags)
+    ]
+
+
+class RateGroup:
+    """Paramètres partageant une même période d'échantillonnage, générés ensemble à chaque échéance."""
+    __slots__ = ('period_ms', 'cols', 'patients', 'parameters')
+
+    def __init__(self, period_ms: int, cols: list):
+        self.period_ms = period_ms
+        self.cols = np.array(cols, dtype=np.intp)
+        # Paires (patient, paramètre) dans l'ordre de values[:, cols].ravel()
+        names = [VALID_PARAMETERS[c] for c in cols]
+        self.patients = [patient_id for patient_id in VALID_PATIENT_IDS for _ in names]
+        self.parameters = names * len(VALID_PATIENT_IDS)
+
+
+def build_rate_groups() -> list:
+    """Regroupe les colonnes de VALID_PARAMETERS par période (SAMPLING_RATES_HZ, DEFAULT_SAMPLING_RATE_HZ)."""
+    by_period = defaultdict(list)
+    for col, param_id in enumerate(VALID_PARAMETERS):
+        rate = SAMPLING_RATES_HZ.get(param_id, DEFAULT_SAMPLING_RATE_HZ)
+        by_period[max(1, round(1000 / rate))].append(col)
+    return [RateGroup(period_ms, cols) for period_ms, cols in sorted(by_period.items())]
+
+
+def format_timestamp_ms(epoch_ms: int) -> str:
+    return datetime.fromtimestamp(epoch_ms / 1000).strftime(DATETIME_MS_FORMAT)[:-3]
+
+
+def generate_rate_group(group: RateGroup, timestamp: str) -> list:
+    """
+    Un échantillon de chaque série du groupe (moteur vectorisé), au format DB_COLUMNS.
+    Les séries sont construites à partir des listes VALID_*, les lignes sont donc valides.
+    """
+    st = vector_states
+    dt = group.period_ms / 1000 / CYCLE_PERIOD_SECONDS
+
+    # Changements de cible : même probabilité par unité de temps qu'en mode 'cycle'
+    change = st['rng'].random((len(VALID_PATIENT_IDS), len(group.cols))) < min(1.0, TARGET_CHANGE_PROB * dt)
+    rows, idx = np.nonzero(change)
+    if rows.size:
+        cols = group.cols[idx]
+        st['target'][rows, cols] = vector_new_targets(st['mode'][rows, cols], cols)
+
+    values, alerts = vector_step(group.cols, dt)
+    created_by = VALID_USER_IDS[0] if VALID_USER_IDS else 1
+    count = len(group.patients)
+    return list(zip(
+        group.patients, group.parameters, values.ravel().tolist(), itertools.repeat(timestamp, count),
+        alerts.ravel().astype(np.int8).tolist(), itertools.repeat(created_by, count), itertools.repeat(0, count),
+    ))
+
+
+def simulation_engine() -> str:
+    """Moteur effectivement utilisé par la génération infinie ('multirate' impose NumPy)."""
+    return 'numpy' if SIMULATION_ENGINE == 'numpy' or SAMPLING_MODE == 'multirate' else 'python'
+
+
+def init_simulation():
+    """(Ré)initialise l'état du moteur actif pour les listes VALID_* courantes."""
+    if simulation_engine() == 'numpy':
+        init_vector_states()
+    else:
+        init_generation_states()
+
+
+def capture_simulation_state() -> dict:
+    """
+    Copie de l'état du générateur : séries à plat dans l'ordre VALID_PATIENT_IDS x VALID_PARAMETERS,
+    compteur d'épisodes et état du générateur aléatoire du moteur.
+    """
+    engine = simulation_engine()
+    state = {
+        'version': 2,
+        'engine': engine,
+        'patients': list(VALID_PATIENT_IDS),
+        'parameters': list(VALID_PARAMETERS),
+        'episode_count': episode_count,
+    }
+    if engine == 'numpy':
+        st = vector_states
+        state.update(current=st['current'].copy(), target=st['target'].copy(), mode=st['mode'].copy(),
+                     rng=st['rng'].bit_generator.state)
+    else:
+        series = [generation_states[(patient_id, param_id)]
+                  for patient_id in VALID_PATIENT_IDS for param_id in VALID_PARAMETERS]
+        state.update(current=[s['current'] for s in series], target=[s['target'] for s in series],
+                     mode=[s['mode'] for s in series], rng=random.getstate())
+    return state
+
+
+def set_series_state(patient_id, param_id, current: float, target: float, mode: int):
+    """Fixe l'état d'une série dans le moteur actif (état déjà initialisé)."""
+    if simulation_engine() == 'numpy':
+        st = vector_states
+        row, col = st['index'][patient_id], st['col'][param_id]
+        st['current'][row, col], st['target'][row, col], st['mode'][row, col] = current, target, mode
+    else:
+        generation_states[(patient_id, param_id)].update(current=current, target=target, mode=mode)
+
+
+def restore_simulation_state(state: dict) -> set:
+    """
+    Reprend un état enregistré par capture_simulation_state : séries communes (par clé
+    patient / paramètre, la répartition des patients peut avoir changé), compteur d'épisodes
+    et, pour le même moteur, générateur aléatoire. Retourne les séries reprises.
+    """
+    global episode_count
+    wanted = set(VALID_PATIENT_IDS)
+    known = set(VALID_PARAMETERS)
+    restored = set()
+    def flat(values):
+        # Tableaux (patients x paramètres) du moteur 'numpy', listes à plat du moteur 'python'
+        return values.ravel().tolist() if hasattr(values, 'ravel') else values
+
+    keys = ((patient_id, param_id) for patient_id in state['patients'] for param_id in state['parameters'])
+    series = zip(keys, flat(state['current']), flat(state['target']), flat(state['mode']))
+    for key, current, target, mode in series:
+        if key[0] in wanted and key[1] in known:
+            set_series_state(*key, current, target, int(mode))
+            restored.add(key)
+
+    episode_count = state['episode_count']
+    if state['engine'] == simulation_engine():
+        if state['engine'] == 'numpy':
+            vector_states['rng'].bit_generator.state = state['rng']
+        else:
+            # JSON : (version, tuple d'entiers, gauss_next) relu en listes
+            version, internal, gauss_next = state['rng']
+            random.setstate((version, tuple(internal), gauss_next))
+    return restored
+
+
+async def seed_simulation_state(pool, skip: set) -> int:
+    """
+    Part de la dernière valeur en base (une seule requête, SIM_SEED_QUERY) pour chaque série
+    absente de `skip`, ramenée dans les bornes du paramètre. Retourne le nombre de séries reprises.
+    """
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(SIM_SEED_QUERY)
+            rows = await cur.fetchall()
+
+    wanted = set(VALID_PATIENT_IDS)
+    known = set(VALID_PARAMETERS)
+    seeded = 0
+    for patient_id, param_id, value in rows:
+        if patient_id in wanted and param_id in known and (patient_id, param_id) not in skip:
+            mn, mx = get_param_bounds(param_id)
+            value = min(max(float(value), mn), mx)
+            set_series_state(patient_id, param_id, value, value, 0)
+            seeded += 1
+    return seeded
+
+
+class SimulationSnapshot:
+    """
+    Instantané de l'état du simulateur pour une reprise à chaud. Le producteur capture
+    l'état après chaque lot généré (`capture`), `advance` retient le dernier lot entièrement
+    inséré : l'instantané suit les mesures en base et non la génération en avance.
+    Le fichier est réécrit atomiquement (fichier temporaire puis os.replace).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pending = deque()  # (cycles générés à la fin du lot, état)
+        self.state = None
+        self.last_save = 0.0
+        self.saves = 0
+
+    def load(self):
+        """État enregistré, ou None (absent ou illisible)."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] État du simulateur illisible ({self.path}), ignoré: {e}")
+            return None
+        if not isinstance(state, dict) or state.get('version') != 2:
+            print(f"[WARNING] État du simulateur ({self.path}) d'un format inconnu, ignoré")
+            return None
+        return state
+
+    def capture(self, cycles_generated: int):
+        self.pending.append((cycles_generated, capture_simulation_state()))
+
+    def advance(self, cycles_done: int):
+        """Retient l'état du dernier lot dont les `cycles_done` premiers cycles couvrent la fin."""
+        while self.pending and self.pending[0][0] <= cycles_done:
+            self.state = self.pending.popleft()[1]
+
+    def save(self, force: bool = False, current: bool = False):
+        """
+        Écrit l'état retenu, au plus toutes les SIM_SNAPSHOT_INTERVAL_SECONDS sauf `force`.
+        `current` : capture l'état courant (multi-fréquence, où la génération n'a pas d'avance).
+        """
+        now = time.monotonic()
+        if not force and now - self.last_save < SIM_SNAPSHOT_INTERVAL_SECONDS:
+            return
+        if current:
+            self.state = capture_simulation_state()
+        if self.state is None:
+            return
+        self.state['saved_at'] = datetime.now().strftime(DATETIME_FORMAT)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # Tableaux du moteur 'numpy' écrits à plat, relus comme les listes du moteur 'python'
+            json.dump(self.state, f, default=lambda values: values.ravel().tolist())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.last_save = now
+        self.saves += 1
+
+
+async def prepare_simulation(pool, snapshot: SimulationSnapshot = None):
+    """
+    Initialise l'état du moteur de simulation puis le reprend : instantané `snapshot`,
+    puis dernière valeur en base pour les séries restantes (SIM_SEED_FROM_DB).
+    """
+    init_simulation()
+
+    start = time.perf_counter()
+    restored = set()
+    state = snapshot.load() if snapshot is not None else None
+    if state is not None:
+        restored = restore_simulation_state(state)
+        print(f"[INFO] État du simulateur repris de {snapshot.path} ({state.get('saved_at', '?')}) : "
+              f"{len(restored)} séries, épisode {episode_count}")
+
+    total = len(VALID_PATIENT_IDS) * len(VALID_PARAMETERS)
+    if SIM_SEED_FROM_DB and len(restored) < total:
+        try:
+            seeded = await seed_simulation_state(pool, restored)
+            print(f"[INFO] {seeded} séries reprises de leur dernière valeur en base")
+        except Exception as e:
+            print(f"[WARNING] Reprise depuis {DB_TABLE_NAME} impossible, séries au milieu de leur plage: {e}")
+    print(f"[DEBUG] Simulateur prêt en {time.perf_counter() - start:.3f}s")
+
+
 def group_data_by_cycle(data):
     """
     Regroupe les données pour simuler des relevés simultanés.
@@ -264,12 +1118,12 @@ def group_data_by_cycle(data):
     """
     grouped = defaultdict(list)
     for record in data:
-        key = (record['id_patient'], record['parameter_id'])
+        key = (record.id_patient, record.parameter_id)
         grouped[key].append(record)
 
     # Récupérer les patients et paramètres présents dans le CSV
-    csv_patients = set(record['id_patient'] for record in data)
-    csv_parameters = set(record['parameter_id'] for record in data)
+    csv_patients = set(record.id_patient for record in data)
+    csv_parameters = set(record.parameter_id for record in data)
 
     # Si FILL_VALUES est actif, ajouter les indicateurs manquants
     if FILL_VALUES and VALID_PARAMETERS and VALID_PATIENT_IDS:
@@ -280,7 +1134,7 @@ def group_data_by_cycle(data):
 
             # Trouver un exemple de record pour copier created_by et autres métadonnées
             sample_record = data[0] if data else None
-            default_created_by = sample_record.get('created_by', '1') if sample_record else '1'
+            default_created_by = sample_record.created_by if sample_record else 1
 
             # Nombre de cycles basé sur la série la plus longue existante
             max_existing = max(len(records) for records in grouped.values()) if grouped else 1
@@ -290,15 +1144,8 @@ def group_data_by_cycle(data):
                 for param_id in missing_params:
                     key = (patient_id, param_id)
                     for _ in range(max_existing):
-                        filled_record = {
-                            'id_patient': patient_id,
-                            'parameter_id': param_id,
-                            'value': str(generate_fill_value(param_id)),
-                            'timestamp': '',
-                            'alert_flag': '0',
-                            'created_by': default_created_by,
-                            'archived': '0'
-                        }
+                        filled_record = Measurement(patient_id, param_id, generate_fill_value(param_id),
+                                                    None, 0, default_created_by, 0)
                         grouped[key].append(filled_record)
 
     # Nombre de cycles basé sur la série la plus longue
@@ -317,7 +1164,132 @@ def group_data_by_cycle(data):
     return cycles
 
 
-async def create_pool():
+def iter_cycles(records, cycle_key=CSV_CYCLE_KEY):
+    """
+    Regroupe paresseusement un flux d'enregistrements trié en cycles.
+    Avec `cycle_key`, un cycle rassemble les lignes consécutives de même valeur
+    pour cette colonne ; sans clé, ou pour une ligne où elle est vide (colonne
+    absente du CSV), un cycle se termine dès qu'une paire (patient, paramètre)
+    y figure déjà (n-ième relevé de chaque série).
+    """
+    cycle = []
+    current_key = None
+    seen_pairs = set()
+    warned = False
+
+    for record in records:
+        key = getattr(record, cycle_key) if cycle_key else None
+        if key is not None:
+            boundary = bool(cycle) and key != current_key
+        else:
+            if cycle_key and not warned:
+                print(f"[WARNING] Colonne {cycle_key} absente ou vide dans le CSV : "
+                      f"cycle terminé à la répétition d'une paire (patient, paramètre)")
+                warned = True
+            pair = (record.id_patient, record.parameter_id)
+            # Passage d'une ligne horodatée à une ligne sans clé : nouveau cycle
+            boundary = pair in seen_pairs or (bool(cycle) and current_key is not None)
+            if boundary:
+                seen_pairs.clear()
+            seen_pairs.add(pair)
+        current_key = key
+
+        if boundary:
+            yield cycle
+            cycle = []
+        cycle.append(record)
+
+    if cycle:
+        yield cycle
+
+
+def iter_filled_cycles(cycles):
+    """
+    Équivalent en flux du remplissage FILL_VALUES de group_data_by_cycle.
+    Les indicateurs absents du premier cycle sont générés pour chaque patient
+    du cycle ; un indicateur qui apparaît plus loin dans le CSV cesse d'être rempli.
+    """
+    missing_params = None
+
+    for cycle in cycles:
+        cycle_params = {record.parameter_id for record in cycle}
+
+        if missing_params is None:
+            missing_params = set(VALID_PARAMETERS) - cycle_params
+            if missing_params:
+                print(f"[INFO] FILL_VALUES actif: génération de valeurs pour {len(missing_params)} indicateurs manquants")
+                print(f"[INFO] Indicateurs à remplir: {missing_params}")
+        else:
+            missing_params -= cycle_params
+
+        if missing_params:
+            default_created_by = cycle[0].created_by
+            timestamp = cycle[0].timestamp
+            for patient_id in dict.fromkeys(record.id_patient for record in cycle):
+                for param_id in missing_params:
+                    cycle.append(Measurement(patient_id, param_id, generate_fill_value(param_id),
+                                             timestamp, 0, default_created_by, 0))
+
+        yield cycle
+
+
+def iter_slot_timestamps(cycles):
+    """Efface les horodatages du CSV une fois les cycles formés : chaque cycle prend son créneau."""
+    for cycle in cycles:
+        for record in cycle:
+            record.timestamp = None
+        yield cycle
+
+
+def iter_csv_cycles(filepath: str, progress: dict = None, start_offset: int = 0):
+    """Pipeline de lecture en flux : lignes du CSV -> cycles -> remplissage FILL_VALUES."""
+    cycles = iter_cycles(iter_csv_records(filepath, progress, start_offset))
+    if FILL_VALUES and VALID_PARAMETERS and VALID_PATIENT_IDS:
+        cycles = iter_filled_cycles(cycles)
+    if not CSV_KEEP_TIMESTAMPS:
+        cycles = iter_slot_timestamps(cycles)
+    return cycles
+
+
+def take_cycles(cycles, count: int, progress: dict = None, cycle_ends: deque = None) -> list:
+    """
+    Extrait au plus `count` cycles du générateur (exécuté dans un thread).
+    Si `cycle_ends` est fourni, y ajoute l'octet de fin de chaque cycle extrait.
+    """
+    if cycle_ends is None:
+        return list(itertools.islice(cycles, count))
+
+    batch = []
+    for cycle in itertools.islice(cycles, count):
+        batch.append(cycle)
+        # Le cycle n'est produit qu'à la lecture du premier enregistrement du suivant
+        cycle_ends.append(progress['offset'])
+    return batch
+
+
+async def csv_producer(batch_queue: asyncio.Queue, filepath: str, progress: dict = None, checkpoint=None):
+    """
+    Lit le CSV dans un thread par lots de CSV_CYCLES_PER_BATCH cycles, en parallèle
+    de l'insertion. La queue bornée limite la mémoire ; un lot vide signale la fin.
+    Avec un `checkpoint` (CsvCheckpoint), la lecture reprend à son octet et la fin
+    de chaque cycle lu lui est transmise.
+    """
+    start_offset, cycle_ends = (checkpoint.offset, checkpoint.cycle_ends) if checkpoint else (0, None)
+    cycles = iter_csv_cycles(filepath, progress, start_offset)
+    try:
+        while True:
+            with STAGE_SECONDS['read'].time():
+                batch = await asyncio.to_thread(take_cycles, cycles, CSV_CYCLES_PER_BATCH, progress, cycle_ends)
+            await batch_queue.put(batch)
+            if not batch:
+                return
+    except Exception:
+        # Débloque la boucle d'insertion, l'erreur est relevée par `await producer_task`
+        await batch_queue.put([])
+        raise
+
+
+async def create_pool(local_infile: bool = False):
     """Initialise le pool de connexions asynchrones MySQL."""
     print(f"[DEBUG] Connexion: {DB_CONFIG['host']} / {DB_CONFIG['db']}")
 
@@ -327,8 +1299,10 @@ async def create_pool():
         password=DB_CONFIG['password'],
         db=DB_CONFIG['db'],
         autocommit=True,
+        local_infile=local_infile,
         minsize=DB_POOL_MIN_SIZE,
-        maxsize=DB_POOL_MAX_SIZE
+        maxsize=DB_POOL_MAX_SIZE,
+        connect_timeout=DB_CONNECT_TIMEOUT_SECONDS
     )
     print("[DEBUG] Pool créé")
     return pool
@@ -345,273 +1319,2989 @@ async def discover_valid_data(pool: aiomysql.Pool):
 
     async with pool.acquire() as conn:
         async with conn.cursor() as cur:
-            # Vérification de l'existence des patients
-            await cur.execute("SELECT id_patient FROM patients ORDER BY id_patient")
-            patients = await cur.fetchall()
-            VALID_PATIENT_IDS = [p[0] for p in patients]
-            print(f"[INFO] {len(VALID_PATIENT_IDS)} patients: {VALID_PATIENT_IDS}")
-
-            # Récupération des paramètres avec TOUS les seuils
-            await cur.execute("""
-                SELECT parameter_id, display_min, display_max,
-                       normal_min, normal_max, critical_min, critical_max
-                FROM parameter_reference
-            """)
-            params = await cur.fetchall()
-            VALID_PARAMETERS = [p[0] for p in params]
-            PARAMETER_RANGES = {
-                p[0]: {
-                    'dm': float(p[1]) if p[1] is not None else 0.0,
-                    'dmx': float(p[2]) if p[2] is not None else 100.0,
-                    'nm': float(p[3]) if p[3] is not None else None,
-                    'nmx': float(p[4]) if p[4] is not None else None,
-                    'cm': float(p[5]) if p[5] is not None else None,
-                    'cmx': float(p[6]) if p[6] is not None else None
-                } for p in params
-            }
-            print(f"[INFO] {len(VALID_PARAMETERS)} paramètres chargés avec seuils BDD")
-
-            # Vérification des utilisateurs (auteurs des données)
-            await cur.execute("SELECT id_user FROM users ORDER BY id_user")
-            users = await cur.fetchall()
-            VALID_USER_IDS = [u[0] for u in users]
-            print(f"[INFO] {len(VALID_USER_IDS)} utilisateurs: {VALID_USER_IDS}")
+            VALID_PATIENT_IDS, VALID_PARAMETERS, VALID_USER_IDS, PARAMETER_RANGES = await fetch_reference_data(cur)
+    print(f"[INFO] {len(VALID_PATIENT_IDS)} patients: {VALID_PATIENT_IDS}")
+    print(f"[INFO] {len(VALID_PARAMETERS)} paramètres chargés avec seuils BDD")
+    print(f"[INFO] {len(VALID_USER_IDS)} utilisateurs: {VALID_USER_IDS}")
 
+    build_validation_indexes()
+    await check_timestamp_precision(pool)
+    await check_latest_table(pool)
+    await check_rollup_table(pool)
+    await check_alert_events_table(pool)
     print()
 
 
-def validate_record(record):
-    """Vérifie l'intégrité référentielle avant d'envoyer la requête à MySQL."""
-    try:
-        patient_id = int(record['id_patient'])
-        if patient_id not in VALID_PATIENT_IDS:
-            return False, f"Patient {patient_id} non trouvé"
-    except (KeyError, ValueError) as e:
-        return False, f"id_patient invalide: {e}"
+def build_validation_indexes():
+    """Construit les ensembles de validation à partir des listes VALID_* (à rappeler après chaque modification)."""
+    global VALID_PATIENT_SET, VALID_PARAMETER_SET, VALID_USER_SET
+    VALID_PATIENT_SET = frozenset(VALID_PATIENT_IDS)
+    VALID_PARAMETER_SET = frozenset(VALID_PARAMETERS)
+    VALID_USER_SET = frozenset(VALID_USER_IDS)
 
-    param_id = record.get('parameter_id', '')
-    if param_id not in VALID_PARAMETERS:
-        return False, f"Paramètre '{param_id}' non trouvé"
 
-    try:
-        created_by = int(record.get('created_by', 0))
-        if created_by not in VALID_USER_IDS:
-            return False, f"Utilisateur {created_by} non trouvé"
-    except ValueError as e:
-        return False, f"created_by invalide: {e}"
+async def fetch_reference_data(cur) -> tuple:
+    """Lit (patients, paramètres, utilisateurs, seuils par paramètre) au format des listes VALID_* / PARAMETER_RANGES."""
+    # Vérification de l'existence des patients
+    await cur.execute("SELECT id_patient FROM patients ORDER BY id_patient")
+    patients = [p[0] for p in await cur.fetchall()]
 
-    return True, ""
+    # Récupération des paramètres avec TOUS les seuils
+    await cur.execute("""
+        SELECT parameter_id, display_min, display_max,
+               normal_min, normal_max, critical_min, critical_max
+        FROM parameter_reference
+    """)
+    params = await cur.fetchall()
+    parameters = [p[0] for p in params]
+    ranges = {
+        p[0]: {
+            'dm': float(p[1]) if p[1] is not None else 0.0,
+            'dmx': float(p[2]) if p[2] is not None else 100.0,
+            'nm': float(p[3]) if p[3] is not None else None,
+            'nmx': float(p[4]) if p[4] is not None else None,
+            'cm': float(p[5]) if p[5] is not None else None,
+            'cmx': float(p[6]) if p[6] is not None else None
+        } for p in params
+    }
 
+    # Vérification des utilisateurs (auteurs des données)
+    await cur.execute("SELECT id_user FROM users ORDER BY id_user")
+    users = [u[0] for u in await cur.fetchall()]
+    return patients, parameters, users, ranges
 
-async def insert_record(pool, record, timestamp):
-    """Exécute une seule insertion dans la base de données."""
-    is_valid, error_msg = validate_record(record)
-    if not is_valid:
-        return False, error_msg
-
-    columns_str = ', '.join(DB_COLUMNS)
-    placeholders = ', '.join(['%s'] * len(DB_COLUMNS))
-
-    query = f"INSERT INTO {DB_TABLE_NAME} ({columns_str}) VALUES ({placeholders})"
-
-    # Préparation du tuple de valeurs avec conversion de types
-    values = (
-        int(record['id_patient']),
-        record['parameter_id'],
-        float(record['value']),
-        timestamp,
-        int(record.get('alert_flag', 0)),
-        int(record['created_by']),
-        int(record.get('archived', 0))
-    )
 
-    try:
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(query, values)
-                return True, f"P{record['id_patient']}-{record['parameter_id']}={record['value']}"
-    except Exception as e:
-        return False, f"Erreur: {e}"
+# Somme de contrôle des colonnes de référence utilisées par le script (une ligne par table) :
+# une modification d'une autre colonne (nom d'un patient...) ne déclenche pas de rechargement
+REFERENCE_CHECKSUM_QUERY = """
+    SELECT 'patients', COUNT(*), BIT_XOR(CRC32(id_patient)) FROM patients
+    UNION ALL
+    SELECT 'parameter_reference', COUNT(*), BIT_XOR(CRC32(CONCAT_WS('|', parameter_id,
+           IFNULL(display_min, '-'), IFNULL(display_max, '-'), IFNULL(normal_min, '-'),
+           IFNULL(normal_max, '-'), IFNULL(critical_min, '-'), IFNULL(critical_max, '-'))))
+    FROM parameter_reference
+    UNION ALL
+    SELECT 'users', COUNT(*), BIT_XOR(CRC32(id_user)) FROM users
+"""
 
 
-async def insert_cycle(pool, cycle, cycle_num):
-    """Insère tous les enregistrements d'un cycle en parallèle via asyncio.gather."""
-    timestamp = datetime.now().strftime(DATETIME_FORMAT)
+def apply_reference_data(reference: tuple, resize_simulation: bool = False):
+    """
+    Remplace d'un bloc les listes VALID_*, PARAMETER_RANGES et les index de validation
+    (sans point d'attente : aucune tâche ne voit un état intermédiaire). Avec `resize_simulation`,
+    l'état du simulateur est reconstruit pour les nouvelles listes : les séries conservées
+    gardent valeur, cible et mode, les nouvelles partent du milieu de leur plage.
+    L'appelant garantit qu'aucune génération n'est en cours dans un thread.
+    """
+    global VALID_PATIENT_IDS, VALID_PARAMETERS, VALID_USER_IDS, PARAMETER_RANGES
+    state = capture_simulation_state() if resize_simulation else None
+    VALID_PATIENT_IDS, VALID_PARAMETERS, VALID_USER_IDS, PARAMETER_RANGES = reference
+    build_validation_indexes()
+    if state is not None:
+        init_simulation()
+        restore_simulation_state(state)
 
-    # Création des coroutines pour chaque record du cycle
-    tasks = [insert_record(pool, record, timestamp) for record in cycle]
 
-    # Lancement simultané des insertions du cycle
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+class ReferenceRefresher:
+    """
+    Surveille les données de référence en tâche de fond (`run`). Un changement de somme de
+    contrôle déclenche un rechargement complet ; les nouvelles données attendent dans `pending`
+    jusqu'à `apply`, appelé par le producteur entre deux lots (`deferred`), ou sont appliquées
+    tout de suite (import CSV : seule la validation en dépend).
+    """
 
-    success_count = 0
-    skip_count = 0
-    error_count = 0
+    def __init__(self, pool, deferred: bool, interval: float = REFERENCE_REFRESH_INTERVAL_SECONDS):
+        self.pool = pool
+        self.deferred = deferred
+        self.interval = interval
+        self.checksum = None
+        self.pending = None
+        self.reloads = 0
 
-    for i, result in enumerate(results):
-        if isinstance(result, Exception):
-            error_count += 1
-        elif result[0]:
-            success_count += 1
-        else:
-            # Distinction entre erreur MySQL et skip de validation
-            if "non trouvé" in result[1] or "invalide" in result[1]:
-                skip_count += 1
-            else:
-                error_count += 1
+    async def run(self):
+        failed = False
+        while True:
+            try:
+                await self.check()
+                failed = False
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not failed and db_healthy:
+                    print(f"\n[WARNING] Rafraîchissement des données de référence impossible: {e}")
+                failed = True
+            await asyncio.sleep(self.interval)
 
-    return success_count, skip_count, error_count
+    async def check(self):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(REFERENCE_CHECKSUM_QUERY)
+                checksum = tuple(await cur.fetchall())
+                if checksum == self.checksum:
+                    return
+                self.checksum = checksum
+                reference = await fetch_reference_data(cur)
+        # La première somme sert de référence : le rechargement couvre une modification depuis le démarrage
+        if reference == (VALID_PATIENT_IDS, VALID_PARAMETERS, VALID_USER_IDS, PARAMETER_RANGES):
+            return
+        self.pending = reference
+        if not self.deferred:
+            self.apply()
 
+    def apply(self) -> bool:
+        """Applique les données rechargées en attente. Retourne True si la référence a changé."""
+        if self.pending is None:
+            return False
+        reference, self.pending = self.pending, None
+        patients, parameters, users, ranges = reference
+        changes = [
+            f"{label} +{len(set(new) - set(old))}/-{len(set(old) - set(new))}"
+            for label, old, new in (('patients', VALID_PATIENT_IDS, patients),
+                                    ('paramètres', VALID_PARAMETERS, parameters),
+                                    ('utilisateurs', VALID_USER_IDS, users))
+            if set(old) != set(new)
+        ]
+        edited = sorted(p for p in ranges if p in PARAMETER_RANGES and ranges[p] != PARAMETER_RANGES[p])
+        if edited:
+            changes.append(f"seuils modifiés: {', '.join(edited)}")
+        apply_reference_data(reference, resize_simulation=self.deferred)
+        self.reloads += 1
+        print(f"\n[INFO] Données de référence rechargées ({'; '.join(changes) or 'ordre modifié'})")
+        return True
 
-def print_progress_bar(current, total, success, skip, error, elapsed):
-    """Affiche une barre de progression avec statistiques et estimation du temps restant."""
-    bar_length = 40
-    progress = current / total if total > 0 else 0
-    filled = int(bar_length * progress)
-    bar = '█' * filled + '░' * (bar_length - filled)
 
-    # Calcul de l'ETA (Estimated Time of Arrival)
-    eta = (elapsed / current) * (total - current) if current > 0 else 0
+def start_reference_refresher(pool, deferred: bool):
+    """Crée le ReferenceRefresher et sa tâche de fond (None, None si REFERENCE_REFRESH_ENABLED est faux)."""
+    if not REFERENCE_REFRESH_ENABLED:
+        return None, None
+    refresher = ReferenceRefresher(pool, deferred)
+    return refresher, asyncio.create_task(refresher.run())
 
-    print(f"\r[{bar}] {current}/{total} ({progress*100:.1f}%) | "
-          f"✓{success} ⊘{skip} ✗{error} | "
-          f"Temps: {elapsed:.0f}s | ETA: {eta:.0f}s", end='', flush=True)
 
+def reject_reason(patient_id, parameter_id, value, alert_flag, created_by, archived):
+    """
+    Règles de validation communes (intégrité référentielle avant d'envoyer la requête à MySQL).
+    Retourne None si la mesure est valide, sinon un code REJECT_*.
+    """
+    if patient_id is None:
+        return REJECT_INVALID_PATIENT
+    if patient_id not in VALID_PATIENT_SET:
+        return REJECT_UNKNOWN_PATIENT
+    if parameter_id not in VALID_PARAMETER_SET:
+        return REJECT_UNKNOWN_PARAMETER
+    if created_by is None:
+        return REJECT_INVALID_USER
+    if created_by not in VALID_USER_SET:
+        return REJECT_UNKNOWN_USER
+    if value is None or alert_flag is None or archived is None:
+        return REJECT_INVALID_VALUE
+    return None
+
+
+def validate_record(record):
+    """Valide un enregistrement (reject_reason). Retourne None s'il est valide, sinon un code REJECT_*."""
+    return reject_reason(record.id_patient, record.parameter_id, record.value,
+                         record.alert_flag, record.created_by, record.archived)
+
+
+def validate_cycle(cycle):
+    """
+    Valide un cycle entier en une passe.
+    Retourne (mask, reasons) : mask[i] vaut True si cycle[i] est accepté,
+    reasons[i] est None ou le code REJECT_* du rejet.
+    """
+    reasons = [
+        reject_reason(record.id_patient, record.parameter_id, record.value,
+                      record.alert_flag, record.created_by, record.archived)
+        for record in cycle
+    ]
+    mask = [reason is None for reason in reasons]
+    return mask, reasons
+
+
+def validate_rows(rows) -> tuple:
+    """
+    Équivalent de validate_cycle pour des lignes au format DB_COLUMNS (rejeu d'une base).
+    Retourne (lignes acceptées, nombre de rejets), les rejets étant comptés dans skip_reasons.
+    """
+    valid = []
+    for row in rows:
+        patient_id, parameter_id, value, _, alert_flag, created_by, archived = row
+        reason = reject_reason(patient_id, parameter_id, value, alert_flag, created_by, archived)
+        if reason is None:
+            valid.append(row)
+        else:
+            skip_reasons[reason] += 1
+    return valid, len(rows) - len(valid)
+
+
+def count_rejects(reasons) -> int:
+    """Ajoute les rejets d'un cycle à skip_reasons et retourne leur nombre."""
+    count = 0
+    for reason in reasons:
+        if reason is not None:
+            skip_reasons[reason] += 1
+            count += 1
+    return count
+
+
+def format_skip_reasons() -> str:
+    """Résumé lisible des rejets cumulés, par code."""
+    return ", ".join(f"{reason}: {count}" for reason, count in sorted(skip_reasons.items())) or "-"
+
+
+def record_row_error(error: Exception):
+    """Compte une ligne refusée par la base (valeur invalide, clé étrangère) ; la première de chaque code est journalisée."""
+    code = error.args[0] if error.args else None
+    if not error_reasons[code]:
+        print(f"\n[WARNING] Ligne refusée par la base ({code}): {error}")
+    error_reasons[code] += 1
+
+
+def format_error_reasons() -> str:
+    """Résumé lisible des lignes refusées par la base, par code d'erreur MySQL."""
+    return ", ".join(f"{code}: {count}" for code, count in sorted(error_reasons.items(), key=str)) or "-"
+
+
+# Une ligne déjà présente (même patient / paramètre / horodatage, import relancé) est laissée
+# intacte : elle compte 0 ligne affectée au lieu de faire échouer tout le paquet.
+INSERT_QUERY = (
+    f"INSERT INTO {DB_TABLE_NAME} ({', '.join(DB_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(DB_COLUMNS))}) "
+    "ON DUPLICATE KEY UPDATE id_patient = id_patient"
+)
+
+
+LATEST_COLUMNS = ['id_patient', 'parameter_id', 'value', 'timestamp', 'alert_flag', 'alert_level', 'created_by']
+
+# Upsert conditionnel : une valeur plus ancienne que celle en table ne l'écrase pas
+# (paquets insérés en parallèle, cycles regroupés). `timestamp` est mis à jour en dernier.
+LATEST_UPSERT_QUERY = (
+    f"INSERT INTO {LATEST_TABLE_NAME} ({', '.join(LATEST_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(LATEST_COLUMNS))}) "
+    "ON DUPLICATE KEY UPDATE "
+    + ", ".join(
+        f"{column} = IF(VALUES(timestamp) >= timestamp, VALUES({column}), {column})"
+        for column in ('value', 'alert_flag', 'alert_level', 'created_by')
+    )
+    + ", timestamp = GREATEST(timestamp, VALUES(timestamp))"
+)
+
+# Reconstruction ensembliste depuis l'historique (après un import massif)
+LATEST_REFRESH_QUERY = f"""
+    INSERT INTO {LATEST_TABLE_NAME} ({', '.join(LATEST_COLUMNS)})
+    SELECT pd.id_patient, pd.parameter_id, pd.value, pd.timestamp, pd.alert_flag,
+           CASE
+               WHEN pd.value IS NULL THEN -1
+               WHEN pd.alert_flag = 1
+                    OR (r.critical_min IS NOT NULL AND pd.value < r.critical_min)
+                    OR (r.critical_max IS NOT NULL AND pd.value > r.critical_max) THEN 2
+               WHEN (r.normal_min IS NOT NULL AND pd.value < r.normal_min)
+                    OR (r.normal_max IS NOT NULL AND pd.value > r.normal_max) THEN 1
+               ELSE 0
+           END,
+           pd.created_by
+    FROM {DB_TABLE_NAME} pd
+    JOIN (
+        SELECT id_patient, parameter_id, MAX(timestamp) AS max_ts
+        FROM {DB_TABLE_NAME}
+        WHERE archived = 0
+        GROUP BY id_patient, parameter_id
+    ) m ON m.id_patient = pd.id_patient AND m.parameter_id = pd.parameter_id AND m.max_ts = pd.timestamp
+    JOIN parameter_reference r ON r.parameter_id = pd.parameter_id
+    ON DUPLICATE KEY UPDATE
+        value = VALUES(value), alert_flag = VALUES(alert_flag), alert_level = VALUES(alert_level),
+        created_by = VALUES(created_by), timestamp = VALUES(timestamp)
+"""
+
+# Dernière valeur de chaque série (reprise du simulateur) : le MAX(timestamp) par groupe
+# se lit sur la clé primaire (id_patient, parameter_id, timestamp)
+SIM_SEED_QUERY = f"""
+    SELECT pd.id_patient, pd.parameter_id, pd.value
+    FROM {DB_TABLE_NAME} pd
+    JOIN (
+        SELECT id_patient, parameter_id, MAX(timestamp) AS max_ts
+        FROM {DB_TABLE_NAME}
+        GROUP BY id_patient, parameter_id
+    ) m ON m.id_patient = pd.id_patient AND m.parameter_id = pd.parameter_id AND m.max_ts = pd.timestamp
+    WHERE pd.value IS NOT NULL
+"""
+
+
+def latest_alert_level(parameter_id: str, value, alert_flag) -> int:
+    """Niveau d'alerte stocké dans la table des dernières valeurs (même échelle que view_patient_indicator_status.priority)."""
+    if value is None:
+        return -1
+    if alert_flag:
+        return 2
+    return is_in_alert(parameter_id, value)
+
+
+def latest_rows(rows) -> list:
+    """
+    Réduit des lignes au format DB_COLUMNS à la plus récente par (patient, paramètre),
+    hors lignes archivées, au format LATEST_COLUMNS.
+    """
+    latest = {}
+    for id_patient, parameter_id, value, timestamp, alert_flag, created_by, archived in rows:
+        if archived:
+            continue
+        key = (id_patient, parameter_id)
+        current = latest.get(key)
+        if current is None or timestamp >= current[3]:
+            latest[key] = (id_patient, parameter_id, value, timestamp, alert_flag,
+                           latest_alert_level(parameter_id, value, alert_flag), created_by)
+    return list(latest.values())
+
+
+async def table_exists(pool, table: str) -> bool:
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SHOW TABLES LIKE %s", (table,))
+            return bool(await cur.fetchall())
+
+
+async def check_feature_table(pool, table: str, columns, consequence: str) -> bool:
+    """
+    Vérifie qu'une table d'une fonction facultative existe avec toutes ses `columns`
+    (base créée avant son ajout au schéma). Sinon, avertit avec `consequence` et retourne False.
+    """
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_schema = DATABASE() AND table_name = %s", (table,))
+            existing = {row[0].lower() for row in await cur.fetchall()}
+
+    if not existing:
+        print(f"[WARNING] Table {table} absente : {consequence} (voir dashmed_dev.sql)")
+        return False
+    missing = [column for column in columns if column.lower() not in existing]
+    if missing:
+        print(f"[WARNING] Table {table} sans colonnes {', '.join(missing)} : {consequence} (voir dashmed_dev.sql)")
+        return False
+    return True
+
+
+# Colonnes passées en DATETIME(3) (horodatages à la milliseconde), migration : dashmed_migration_timestamp_ms.sql
+MILLISECOND_COLUMNS = (
+    (DB_TABLE_NAME, 'timestamp'),
+    (LATEST_TABLE_NAME, 'timestamp'),
+    (ROLLUP_TABLE_NAME, 'last_timestamp'),
+)
+
+
+async def check_timestamp_precision(pool):
+    """
+    Signale les colonnes de MILLISECOND_COLUMNS encore en DATETIME (seconde) : la base arrondit
+    les millisecondes, et deux mesures d'une même seconde deviennent des doublons (mode 'multirate').
+    """
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT table_name, column_name, datetime_precision FROM information_schema.columns "
+                "WHERE table_schema = DATABASE() AND (table_name, column_name) IN ("
+                + ", ".join(["(%s, %s)"] * len(MILLISECOND_COLUMNS)) + ")",
+                [value for column in MILLISECOND_COLUMNS for value in column],
+            )
+            columns = await cur.fetchall()
+
+    outdated = [f"{table}.{column}" for table, column, precision in columns if (precision or 0) < 3]
+    if not outdated:
+        return
+    consequence = ("les mesures d'une même seconde seront ignorées comme doublons"
+                   if SAMPLING_MODE == 'multirate' else "les millisecondes seront arrondies")
+    print(f"[WARNING] Horodatages à la seconde ({', '.join(outdated)}) : {consequence}. "
+          f"Migration : dashmed_migration_timestamp_ms.sql")
+
+
+async def check_latest_table(pool, initialize: bool = True):
+    """
+    Désactive MAINTAIN_LATEST_TABLE si la table des dernières valeurs n'existe pas (ou pas à jour).
+    Avec `initialize`, une table vide est d'abord remplie depuis l'historique existant.
+    """
+    global MAINTAIN_LATEST_TABLE
+    if not MAINTAIN_LATEST_TABLE:
+        return
+
+    if not await check_feature_table(pool, LATEST_TABLE_NAME, LATEST_COLUMNS, "dernières valeurs non maintenues"):
+        MAINTAIN_LATEST_TABLE = False
+        return
+
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(f"SELECT 1 FROM {LATEST_TABLE_NAME} LIMIT 1")
+            empty = not await cur.fetchall()
+
+    if initialize and empty:
+        await refresh_latest_table(pool)
+
+
+async def upsert_latest(pool, rows):
+    """Met à jour la table des dernières valeurs, hors transaction (mode 'single', reprise après échec)."""
+    if not MAINTAIN_LATEST_TABLE:
+        return
+    latest = latest_rows(rows)
+    if not latest:
+        return
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(LATEST_UPSERT_QUERY, latest)
+    except Exception as e:
+        print(f"\n[WARNING] Mise à jour de {LATEST_TABLE_NAME} impossible: {e}")
+
+
+async def refresh_latest_table(pool):
+    """Recalcule la table des dernières valeurs depuis l'historique complet."""
+    if not MAINTAIN_LATEST_TABLE:
+        return
+    start = time.perf_counter()
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(LATEST_REFRESH_QUERY)
+                await conn.commit()
+    except Exception as e:
+        print(f"[ERROR] Recalcul de {LATEST_TABLE_NAME} impossible: {e}")
+        return
+    print(f"[INFO] {LATEST_TABLE_NAME} recalculée en {time.perf_counter() - start:.2f}s")
+
+
+ROLLUP_COLUMNS = [
+    'id_patient', 'parameter_id', 'tier_seconds', 'bucket_start',
+    'min_value', 'max_value', 'sum_value', 'sample_count', 'last_value', 'last_timestamp',
+]
+
+_ROLLUP_INSERT = (
+    f"INSERT INTO {ROLLUP_TABLE_NAME} ({', '.join(ROLLUP_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(ROLLUP_COLUMNS))}) "
+    "ON DUPLICATE KEY UPDATE "
+)
+
+# Ingestion : une tranche déjà écrite (arrêt, données en retard) est fusionnée avec la nouvelle partie
+ROLLUP_MERGE_QUERY = _ROLLUP_INSERT + (
+    "min_value = LEAST(min_value, VALUES(min_value)), "
+    "max_value = GREATEST(max_value, VALUES(max_value)), "
+    "sum_value = sum_value + VALUES(sum_value), "
+    "sample_count = sample_count + VALUES(sample_count), "
+    "last_value = IF(VALUES(last_timestamp) >= last_timestamp, VALUES(last_value), last_value), "
+    "last_timestamp = GREATEST(last_timestamp, VALUES(last_timestamp))"
+)
+
+# Reconstruction : la tranche recalculée depuis l'historique remplace l'existante
+ROLLUP_REPLACE_QUERY = _ROLLUP_INSERT + ", ".join(
+    f"{column} = VALUES({column})" for column in ROLLUP_COLUMNS[4:]
+)
+
+_EPOCH = datetime(1970, 1, 1)
+_last_converted = [None, 0.0]  # Dernier horodatage converti par timestamp_seconds et ses secondes
+
+
+def timestamp_seconds(timestamp) -> float:
+    """
+    Secondes depuis 1970 (horodatage naïf, sans fuseau) d'une chaîne DATETIME_FORMAT /
+    DATETIME_MS_FORMAT ou d'un datetime. La dernière conversion est gardée : les lignes
+    d'un cycle partagent leur horodatage.
+    """
+    if timestamp != _last_converted[0]:
+        moment = timestamp if isinstance(timestamp, datetime) else datetime.fromisoformat(timestamp)
+        _last_converted[:] = timestamp, (moment - _EPOCH).total_seconds()
+    return _last_converted[1]
+
+
+class RollupAggregator:
+    """
+    Agrégats en cours par (tranche, patient, paramètre) pour chaque largeur de ROLLUP_TIERS.
+    Une tranche est close dès qu'une mesure de la même série tombe dans une autre tranche ;
+    les tranches closes attendent dans `completed` d'être écrites en un lot.
+    """
+
+    def __init__(self, tiers=ROLLUP_TIERS):
+        self.tiers = tuple(tiers)
+        # {(tier, id_patient, parameter_id): [début, min, max, somme, nombre, dernière valeur, dernier horodatage]}
+        self.open = {}
+        self.completed = []
+
+    def add(self, rows):
+        """Ajoute des lignes au format DB_COLUMNS (valeurs vides et lignes archivées ignorées)."""
+        for id_patient, parameter_id, value, timestamp, _, _, archived in rows:
+            if value is None or archived:
+                continue
+            value = float(value)
+            seconds = int(timestamp_seconds(timestamp))
+            for tier in self.tiers:
+                start = seconds - seconds % tier
+                key = (tier, id_patient, parameter_id)
+                bucket = self.open.get(key)
+                if bucket is None or bucket[0] != start:
+                    if bucket is not None:
+                        self.completed.append(self._row(key, bucket))
+                    self.open[key] = [start, value, value, value, 1, value, timestamp]
+                    continue
+                if value < bucket[1]:
+                    bucket[1] = value
+                if value > bucket[2]:
+                    bucket[2] = value
+                bucket[3] += value
+                bucket[4] += 1
+                if timestamp >= bucket[6]:
+                    bucket[5] = value
+                    bucket[6] = timestamp
+
+    @staticmethod
+    def _row(key, bucket) -> tuple:
+        tier, id_patient, parameter_id = key
+        start, low, high, total, count, last_value, last_timestamp = bucket
+        return (id_patient, parameter_id, tier, _EPOCH + timedelta(seconds=start),
+                low, high, round(total, 2), count, last_value, last_timestamp)
+
+    def take_completed(self, include_open: bool = False) -> list:
+        """Retire et retourne les tranches closes (et celles en cours si include_open) au format ROLLUP_COLUMNS."""
+        rows, self.completed = self.completed, []
+        if include_open:
+            rows.extend(self._row(key, bucket) for key, bucket in self.open.items())
+            self.open.clear()
+        return rows
+
+
+rollups = RollupAggregator()
+
+# Serveur du flux temps réel (démarré par start_live_feed si PUBSUB_ENABLED)
+live_feed = None
+
+
+def on_rows_committed(rows, derived: bool = True):
+    """
+    Lignes confirmées par la base : agrégats et états d'alerte en mémoire (si `derived`,
+    lignes de DB_TABLE_NAME), flux temps réel.
+    """
+    if derived and MAINTAIN_ROLLUPS:
+        rollups.add(rows)
+    if derived and MAINTAIN_ALERT_EVENTS:
+        alerts.add(rows)
+    if live_feed is not None:
+        live_feed.stage(rows)
+
+
+async def check_rollup_table(pool):
+    """Désactive MAINTAIN_ROLLUPS si la table des agrégats n'existe pas (ou pas à jour)."""
+    global MAINTAIN_ROLLUPS
+    if MAINTAIN_ROLLUPS and not await check_feature_table(pool, ROLLUP_TABLE_NAME, ROLLUP_COLUMNS,
+                                                          "agrégats non maintenus"):
+        MAINTAIN_ROLLUPS = False
+
+
+async def flush_rollups(pool, final: bool = False):
+    """
+    Écrit en un lot les tranches closes (toutes les tranches en cours si `final`, à l'arrêt).
+    Les tranches partielles sont fusionnées en base par ROLLUP_MERGE_QUERY.
+    """
+    if not MAINTAIN_ROLLUPS:
+        return
+    rows = rollups.take_completed(include_open=final)
+    if not rows:
+        return
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(ROLLUP_MERGE_QUERY, rows)
+    except Exception as e:
+        print(f"\n[WARNING] Écriture de {len(rows)} agrégats impossible: {e}")
+
+
+ALERT_EVENT_COLUMNS = ['id_patient', 'parameter_id', 'timestamp', 'from_level', 'to_level', 'value', 'confirmed_at']
+
+# Un événement déjà écrit (rejeu du spool, redémarrage) n'est pas dupliqué
+ALERT_EVENT_INSERT_QUERY = (
+    f"INSERT INTO {ALERT_EVENTS_TABLE_NAME} ({', '.join(ALERT_EVENT_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(ALERT_EVENT_COLUMNS))}) "
+    "ON DUPLICATE KEY UPDATE to_level = to_level"
+)
+
+# Niveau courant de chaque série : dernier événement (clé primaire id_patient, parameter_id, timestamp)
+ALERT_STATE_QUERY = f"""
+SELECT e.id_patient, e.parameter_id, e.to_level, e.timestamp
+FROM {ALERT_EVENTS_TABLE_NAME} e
+JOIN (
+    SELECT id_patient, parameter_id, MAX(timestamp) AS max_ts
+    FROM {ALERT_EVENTS_TABLE_NAME}
+    GROUP BY id_patient, parameter_id
+) m ON m.id_patient = e.id_patient AND m.parameter_id = e.parameter_id AND m.max_ts = e.timestamp
+"""
+
+
+def hysteresis_level(parameter_id: str, value: float, current: int) -> int:
+    """
+    Niveau d'alerte de `value` pour une série actuellement au niveau `current`.
+    Une aggravation est immédiate (seuils de is_in_alert) ; pour redescendre, la valeur doit
+    repasser chaque seuil d'une marge ALERT_HYSTERESIS_RATIO × largeur de la zone normale.
+    """
+    level = is_in_alert(parameter_id, value)
+    if level >= current or parameter_id not in PARAMETER_RANGES:
+        return level
+
+    p = PARAMETER_RANGES[parameter_id]
+    margin = 0.0
+    if p['nm'] is not None and p['nmx'] is not None:
+        margin = ALERT_HYSTERESIS_RATIO * (p['nmx'] - p['nm'])
+
+    # Seuils resserrés de la marge : le niveau retenu est entre le niveau brut et le niveau courant
+    if (p['cm'] is not None and value < p['cm'] + margin) or (p['cmx'] is not None and value > p['cmx'] - margin):
+        held = 2
+    elif (p['nm'] is not None and value < p['nm'] + margin) or (p['nmx'] is not None and value > p['nmx'] - margin):
+        held = 1
+    else:
+        held = 0
+    return min(current, max(level, held))
+
+
+class AlertTracker:
+    """
+    Machine à états d'alerte par série (patient, paramètre), alimentée par les lignes insérées.
+    Un niveau candidat différent du niveau courant doit se maintenir ALERT_MIN_DURATION_SECONDS
+    (horodatages des mesures) avant d'être confirmé ; seules les transitions confirmées sont
+    mises en attente dans `transitions`, au format ALERT_EVENT_COLUMNS, pour être écrites en un lot.
+    """
+
+    def __init__(self, min_duration: float = ALERT_MIN_DURATION_SECONDS):
+        self.min_duration = min_duration
+        # {(id_patient, parameter_id): [niveau, dernier horodatage (s), niveau candidat, début (s), horodatage, valeur]}
+        self.states = {}
+        self.transitions = []
+
+    def load(self, rows):
+        """Reprend le niveau courant des séries depuis les derniers événements écrits (ALERT_STATE_QUERY)."""
+        for id_patient, parameter_id, level, timestamp in rows:
+            self.states[(id_patient, parameter_id)] = [int(level), timestamp_seconds(timestamp), None, 0.0, None, None]
+
+    def add(self, rows):
+        """Ajoute des lignes au format DB_COLUMNS (valeurs vides, lignes archivées et mesures en retard ignorées)."""
+        for id_patient, parameter_id, value, timestamp, _, _, archived in rows:
+            if value is None or archived:
+                continue
+            value = float(value)
+            seconds = timestamp_seconds(timestamp)
+            key = (id_patient, parameter_id)
+            state = self.states.get(key)
+            if state is None:
+                # Série inconnue : part du niveau normal, la première anomalie produit une transition
+                state = self.states[key] = [0, seconds, None, 0.0, None, None]
+            elif seconds < state[1]:
+                continue
+            state[1] = seconds
+
+            level = hysteresis_level(parameter_id, value, state[0])
+            if level == state[0]:
+                state[2] = None
+                continue
+            if level != state[2]:
+                state[2:6] = [level, seconds, timestamp, value]
+            if seconds - state[3] >= self.min_duration:
+                self.transitions.append((id_patient, parameter_id, state[4], state[0], level, state[5], timestamp))
+                ALERT_TRANSITIONS_TOTAL[level].inc()
+                state[0] = level
+                state[2] = None
+
+    def take_transitions(self) -> list:
+        """Retire et retourne les transitions confirmées, au format ALERT_EVENT_COLUMNS."""
+        rows, self.transitions = self.transitions, []
+        return rows
+
+
+alerts = AlertTracker()
+
+
+async def check_alert_events_table(pool):
+    """
+    Désactive MAINTAIN_ALERT_EVENTS si la table des événements d'alerte n'existe pas (ou pas à jour) ;
+    sinon reprend le niveau courant de chaque série depuis ses derniers événements.
+    """
+    global MAINTAIN_ALERT_EVENTS
+    if not MAINTAIN_ALERT_EVENTS:
+        return
+    if not await check_feature_table(pool, ALERT_EVENTS_TABLE_NAME, ALERT_EVENT_COLUMNS,
+                                     "transitions d'alerte non calculées"):
+        MAINTAIN_ALERT_EVENTS = False
+        return
+
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(ALERT_STATE_QUERY)
+            alerts.load(await cur.fetchall())
+
+
+async def flush_alert_events(pool):
+    """Écrit en un lot les transitions d'alerte confirmées depuis le dernier appel."""
+    if not MAINTAIN_ALERT_EVENTS:
+        return
+    rows = alerts.take_transitions()
+    if not rows:
+        return
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(ALERT_EVENT_INSERT_QUERY, rows)
+    except Exception as e:
+        print(f"\n[WARNING] Écriture de {len(rows)} transitions d'alerte impossible: {e}")
+
+
+async def backfill_rollups():
+    """
+    Reconstruit ROLLUP_TABLE_NAME depuis tout l'historique de patient_data.
+    Les lignes sont lues dans l'ordre de la clé primaire par un curseur côté serveur
+    (SSCursor, mémoire bornée) et les tranches closes sont écrites par lots
+    de ROLLUP_BACKFILL_FLUSH_BUCKETS sur une seconde connexion.
+    """
+    pool = await create_pool()
+    try:
+        if not await table_exists(pool, ROLLUP_TABLE_NAME):
+            print(f"[ERROR] Table {ROLLUP_TABLE_NAME} absente")
+            return
+
+        print(f"[DEBUG] Reconstruction de {ROLLUP_TABLE_NAME} (tranches: {', '.join(f'{t}s' for t in ROLLUP_TIERS)})")
+        print("-" * 60)
+
+        aggregator = RollupAggregator(ROLLUP_TIERS)
+        total_rows = 0
+        total_buckets = 0
+        start = time.perf_counter()
+
+        async with pool.acquire() as read_conn, pool.acquire() as write_conn:
+            async with read_conn.cursor(aiomysql.SSCursor) as reader, write_conn.cursor() as writer:
+                await reader.execute(
+                    f"SELECT {', '.join(DB_COLUMNS)} FROM {DB_TABLE_NAME} "
+                    "ORDER BY id_patient, parameter_id, timestamp"
+                )
+                while True:
+                    rows = await reader.fetchmany(ROLLUP_BACKFILL_FETCH_ROWS)
+                    if rows:
+                        aggregator.add(rows)
+                        total_rows += len(rows)
+                    if len(aggregator.completed) >= ROLLUP_BACKFILL_FLUSH_BUCKETS or not rows:
+                        buckets = aggregator.take_completed(include_open=not rows)
+                        if buckets:
+                            await writer.executemany(ROLLUP_REPLACE_QUERY, buckets)
+                            total_buckets += len(buckets)
+                        elapsed = time.perf_counter() - start
+                        print(f"\r[BACKFILL] {total_rows} lignes lues | {total_buckets} tranches écrites | "
+                              f"{total_rows / elapsed if elapsed > 0 else 0:.0f} lignes/s ", end='', flush=True)
+                    if not rows:
+                        break
+        print()
+        print("-" * 60)
+        print(f"[RESULT] Lignes lues: {total_rows}")
+        print(f"[RESULT] Tranches écrites: {total_buckets}")
+        print(f"[RESULT] Durée: {time.perf_counter() - start:.2f}s")
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+# Erreurs de surcharge de la base (en plus des erreurs de connexion) : trop de connexions,
+# attente de verrou, deadlock
+OVERLOAD_ERROR_CODES = {1040, 1205, 1213}
+
+# Transaction annulée par la base et à rejouer : attente de verrou, deadlock
+LOCK_ERROR_CODES = {1205, 1213}
+
+
+class AdaptiveLimiter:
+    """
+    Nombre d'écritures simultanées autorisées vers la base, ajusté en AIMD :
+    augmentation additive tant que la latence reste proche de la référence,
+    diminution multiplicative (au plus une fois par durée de requête) si elle dérive
+    ou si la base signale une surcharge. La référence est la plus faible latence observée
+    par classe de taille de requête (puissance de 2 du nombre de lignes), qui remonte lentement.
+    S'utilise avec `async with limiter:` autour d'une écriture.
+    """
+
+    def __init__(self, initial: float, min_limit: float, max_limit: float):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.inflight = 0
+        self.waiters = deque()
+        self.baselines = {}
+        self.last_decrease = 0.0
+        self.decreases = 0
+        self.limiter_wait = 0.0
+        self.pool_wait = 0.0
+        self.acquired = 0
+        LIMITER_LIMIT.set(self.limit)
+
+    async def __aenter__(self):
+        if self.inflight < int(self.limit) and not self.waiters:
+            self.inflight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self.waiters.append(future)
+            start = time.perf_counter()
+            try:
+                # La place est réservée par _wake avant le réveil
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self.inflight -= 1
+                    self._wake()
+                with contextlib.suppress(ValueError):
+                    self.waiters.remove(future)
+                raise
+            waited = time.perf_counter() - start
+            self.limiter_wait += waited
+            LIMITER_WAIT_SECONDS.observe(waited)
+        self.acquired += 1
+        LIMITER_INFLIGHT.set(self.inflight)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.inflight -= 1
+        self._wake()
+        LIMITER_INFLIGHT.set(self.inflight)
+        return False
+
+    def _wake(self):
+        while self.waiters and self.inflight < int(self.limit):
+            future = self.waiters.popleft()
+            if not future.done():
+                self.inflight += 1
+                future.set_result(None)
+
+    def observe(self, latency: float, rows: int):
+        """Latence d'une requête réussie de `rows` lignes."""
+        size_class = max(1, rows).bit_length()
+        baseline = self.baselines.get(size_class)
+        if baseline is None or latency < baseline:
+            baseline = latency
+        else:
+            # La référence suit lentement une base durablement plus lente (ou plus chargée)
+            baseline += (latency - baseline) * 0.01
+        self.baselines[size_class] = baseline
+
+        if latency > baseline * LIMITER_LATENCY_TOLERANCE + LIMITER_LATENCY_SLACK_SECONDS:
+            self._decrease(latency)
+        elif self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            LIMITER_LIMIT.set(self.limit)
+            self._wake()
+
+    def on_error(self, error: Exception):
+        """Erreur d'une requête : diminution si elle signale une surcharge ou une connexion perdue."""
+        code = error.args[0] if isinstance(error, aiomysql.MySQLError) and error.args else None
+        if code in OVERLOAD_ERROR_CODES or is_connection_error(error):
+            self._decrease(0.1)
+
+    def _decrease(self, latency: float):
+        now = time.monotonic()
+        # Une seule diminution par durée de requête : les requêtes déjà lancées subissent le même pic
+        if now - self.last_decrease < latency:
+            return
+        self.last_decrease = now
+        if self.limit > self.min_limit:
+            self.limit = max(self.min_limit, self.limit * LIMITER_BACKOFF_RATIO)
+            self.decreases += 1
+            LIMITER_LIMIT.set(self.limit)
+
+    def record_pool_wait(self, seconds: float):
+        self.pool_wait += seconds
+        POOL_WAIT_SECONDS.observe(seconds)
+
+    def summary(self) -> str:
+        acquired = max(1, self.acquired)
+        return (f"écritures simultanées {int(self.limit)} (min {self.min_limit}, max {self.max_limit}, "
+                f"diminutions {self.decreases}) | attente limiteur moy. {self.limiter_wait / acquired * 1000:.1f}ms "
+                f"| attente pool moy. {self.pool_wait / acquired * 1000:.1f}ms")
+
+
+if LIMITER_ENABLED:
+    _limiter_max = min(LIMITER_MAX_CONCURRENCY, DB_POOL_MAX_SIZE)
+    limiter = AdaptiveLimiter(min(LIMITER_INITIAL_CONCURRENCY, _limiter_max),
+                              min(LIMITER_MIN_CONCURRENCY, _limiter_max), _limiter_max)
+else:
+    limiter = AdaptiveLimiter(DB_POOL_MAX_SIZE, DB_POOL_MAX_SIZE, DB_POOL_MAX_SIZE)
+
+
+@contextlib.contextmanager
+def timed_statement(rows: int):
+    """Chronomètre une écriture (SQL_SECONDS) et transmet latence ou erreur au limiteur."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        limiter.on_error(e)
+        raise
+    finally:
+        SQL_SECONDS.observe(time.perf_counter() - start)
+    limiter.observe(time.perf_counter() - start, rows)
+
+
+async def map_limited(func, items) -> list:
+    """
+    Applique la coroutine `func` à chaque élément, au plus `limiter.limit` à la fois, avec
+    autant de tâches que la limite (et non une par élément). Retourne les résultats dans
+    l'ordre ; une exception levée est retournée à la place du résultat.
+    """
+    results = [None] * len(items)
+    pending = iter(enumerate(items))
+
+    async def worker():
+        for i, item in pending:
+            async with limiter:
+                try:
+                    results[i] = await func(item)
+                except Exception as e:
+                    results[i] = e
+
+    await asyncio.gather(*(worker() for _ in range(min(len(items), max(1, int(limiter.limit))))))
+    return results
+
+
+# Spool disque (créé par start_spool si SPOOL_ENABLED) et état de la base vu par le script
+disk_spool = None
+db_healthy = True
+
+# Erreurs MySQL signalant une base injoignable (et non une ligne refusée)
+CONNECTION_ERROR_CODES = {1040, 1053, 2002, 2003, 2006, 2013, 2055}
+
+
+def is_connection_error(error: Exception) -> bool:
+    """Vrai si l'erreur vient de la connexion (serveur arrêté, bascule, réseau) et non des données."""
+    if isinstance(error, (aiomysql.InterfaceError, asyncio.TimeoutError, OSError)):
+        return True
+    return isinstance(error, aiomysql.OperationalError) and bool(error.args) and error.args[0] in CONNECTION_ERROR_CODES
+
+
+def is_lock_error(error: Exception) -> bool:
+    """Vrai pour un deadlock ou un dépassement de innodb_lock_wait_timeout (transaction à rejouer)."""
+    return isinstance(error, aiomysql.MySQLError) and bool(error.args) and error.args[0] in LOCK_ERROR_CODES
+
+
+def commit_group_size(delay: float) -> int:
+    """Cycles regroupés par envoi : COMMIT_GROUP_CYCLES, borné pour que le premier attende au plus COMMIT_LATENCY_BUDGET_SECONDS."""
+    if delay <= 0:
+        return max(1, COMMIT_GROUP_CYCLES)
+    return max(1, min(COMMIT_GROUP_CYCLES, 1 + int(COMMIT_LATENCY_BUDGET_SECONDS / delay)))
+
+
+def mark_db_unhealthy(error: Exception):
+    """Bascule les écritures vers le spool jusqu'à ce que drain_spool constate le retour de la base."""
+    global db_healthy
+    if db_healthy and disk_spool is not None:
+        print(f"\n[WARNING] Base injoignable ({error}) : mesures écrites dans le spool {disk_spool.directory}")
+    db_healthy = False
+    DB_UP.set(0)
+
+
+def spool_rows(rows) -> int:
+    """Écrit des lignes validées dans le spool. Retourne le nombre de lignes perdues (spool plein)."""
+    if disk_spool.append(rows):
+        SPOOL_ROWS['spooled'].inc(len(rows))
+        SPOOL_PENDING.set(len(disk_spool))
+        return 0
+    SPOOL_ROWS['rejected'].inc(len(rows))
+    return len(rows)
+
+
+async def insert_record(pool, record, timestamp):
+    """
+    Exécute une seule insertion dans la base de données.
+    Retourne (statut RESULT_*, détail) ; pour un skip, le détail est le code REJECT_*.
+    """
+    reason = validate_record(record)
+    if reason is not None:
+        return RESULT_SKIP, reason
+
+    try:
+        wait_start = time.perf_counter()
+        async with pool.acquire() as conn:
+            limiter.record_pool_wait(time.perf_counter() - wait_start)
+            async with conn.cursor() as cur:
+                with timed_statement(1):
+                    affected = await cur.execute(INSERT_QUERY, record.as_row(timestamp))
+                if not affected:
+                    return RESULT_SKIP, REJECT_DUPLICATE
+                return RESULT_SUCCESS, f"P{record.id_patient}-{record.parameter_id}={record.value}"
+    except Exception as e:
+        if disk_spool is not None and is_connection_error(e):
+            mark_db_unhealthy(e)
+            if not spool_rows([record.as_row(timestamp)]):
+                return RESULT_SPOOLED, f"P{record.id_patient}-{record.parameter_id}={record.value}"
+        return RESULT_ERROR, f"Erreur: {e}"
+
+
+class PartialDuplicateChunk(Exception):
+    """Paquet en partie déjà présent en base : les lignes nouvelles doivent être identifiées une à une."""
+
+
+async def insert_chunk(pool, rows, spool_on_failure: bool = True, query: str = None, derived: bool = True):
+    """
+    Insère un paquet de lignes en une seule requête multi-lignes (executemany), dans
+    une transaction. Si MAINTAIN_LATEST_TABLE, les dernières valeurs du paquet sont
+    mises à jour dans la même transaction.
+    Un paquet entièrement déjà en base (import relancé) est validé sans effet ; s'il
+    l'est en partie, ou en cas d'échec, le paquet est annulé et rejoué ligne à ligne
+    sur la même connexion pour isoler les doublons et les enregistrements fautifs.
+    Un deadlock ou une attente de verrou rejoue la transaction (COMMIT_MAX_RETRIES) ; rejeux épuisés,
+    le paquet entier est journalisé puis envoyé au spool (avec `spool_on_failure`) ou compté en erreur.
+    Si la connexion échoue, la base est marquée injoignable et, avec `spool_on_failure`,
+    le paquet entier part au spool (ni succès ni erreur), y compris pendant la reprise
+    ligne à ligne : les lignes déjà insérées seront alors rejouées comme doublons. Toute autre
+    erreur interrompant le paquet est journalisée ; les lignes déjà validées restent comptées.
+    `query` remplace INSERT_QUERY (autre table cible) ; sans `derived`, ni dernières valeurs,
+    ni agrégats, ni alertes ne sont maintenus (ils décrivent DB_TABLE_NAME).
+    Retourne (succès, doublons, erreurs).
+    """
+    query = query or INSERT_QUERY
+    maintain_latest = derived and MAINTAIN_LATEST_TABLE
+    inserted = []  # Lignes validées en base uniquement
+    duplicates = 0
+    lock_error = None
+    try:
+        wait_start = time.perf_counter()
+        async with pool.acquire() as conn:
+            limiter.record_pool_wait(time.perf_counter() - wait_start)
+            async with conn.cursor() as cur:
+                for attempt in range(COMMIT_MAX_RETRIES + 1):
+                    try:
+                        with timed_statement(len(rows)):
+                            await conn.begin()
+                            await cur.executemany(query, rows)
+                            if 0 < cur.rowcount < len(rows):
+                                raise PartialDuplicateChunk()
+                            written = rows if cur.rowcount else []
+                            if written and maintain_latest:
+                                await cur.executemany(LATEST_UPSERT_QUERY, latest_rows(written))
+                            await conn.commit()
+                        COMMITS_TOTAL.inc()
+                        inserted = written
+                        duplicates = len(rows) - len(inserted)
+                        break
+                    except Exception as e:
+                        if is_connection_error(e):
+                            raise
+                        await conn.rollback()
+                        if is_lock_error(e):
+                            if attempt < COMMIT_MAX_RETRIES:
+                                COMMIT_RETRIES_TOTAL.inc()
+                                await asyncio.sleep(COMMIT_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+                                continue
+                            # Rejeux épuisés : échec du paquet entier, sans reprise ligne à ligne
+                            # (qui subirait les mêmes verrous)
+                            lock_error = e
+                            break
+                        # Reprise ligne à ligne : une coupure de connexion remonte (paquet au spool),
+                        # une ligne refusée par la base est comptée par code d'erreur
+                        for row in rows:
+                            try:
+                                if await cur.execute(query, row):
+                                    inserted.append(row)
+                                else:
+                                    duplicates += 1
+                            except aiomysql.MySQLError as row_error:
+                                if is_connection_error(row_error):
+                                    raise
+                                record_row_error(row_error)
+                        if inserted and maintain_latest:
+                            try:
+                                await cur.executemany(LATEST_UPSERT_QUERY, latest_rows(inserted))
+                            except Exception as latest_error:
+                                if is_connection_error(latest_error):
+                                    raise
+                                print(f"\n[WARNING] Mise à jour de {LATEST_TABLE_NAME} impossible "
+                                      f"pour {len(inserted)} lignes: {latest_error}")
+                        break
+    except Exception as e:
+        # Les lignes déjà validées pendant la reprise ligne à ligne restent comptées
+        on_rows_committed(inserted, derived)
+        if is_connection_error(e):
+            # Connexion perdue : tout le paquet part au spool (lignes déjà insérées rejouées
+            # comme doublons), ou est en erreur
+            if disk_spool is not None:
+                mark_db_unhealthy(e)
+                if spool_on_failure:
+                    return 0, 0, spool_rows(rows)
+            return 0, 0, len(rows)
+        print(f"\n[ERROR] Paquet de {len(rows)} lignes interrompu après {len(inserted)} insertions: {e}")
+        return len(inserted), duplicates, len(rows) - len(inserted) - duplicates
+
+    if lock_error is not None:
+        # Rien n'a été validé : le paquet part au spool pour un rejeu ultérieur, ou est en erreur
+        spooled = spool_on_failure and disk_spool is not None
+        print(f"\n[WARNING] Paquet de {len(rows)} lignes abandonné après {COMMIT_MAX_RETRIES} rejeux "
+              f"({lock_error.args[0]}) : {'envoyé au spool' if spooled else 'compté en erreur'}")
+        if spooled:
+            return 0, 0, spool_rows(rows)
+        error_reasons[lock_error.args[0]] += len(rows)
+        return 0, 0, len(rows)
+
+    on_rows_committed(inserted, derived)
+    return len(inserted), duplicates, len(rows) - len(inserted) - duplicates
+
+
+async def insert_transaction(pool, rows, spool_on_failure: bool = True, query: str = None, derived: bool = True):
+    """
+    Politique 'cycle' : insère `rows` par paquets de BATCH_ROWS_PER_STATEMENT lignes et met à jour
+    leurs dernières valeurs dans une seule transaction, validée en bloc (tout ou rien).
+    Un deadlock ou une attente de verrou annule la transaction, rejouée jusqu'à COMMIT_MAX_RETRIES
+    fois. Après un autre échec (doublons partiels, ligne refusée) ou des rejeux épuisés, les
+    lignes sont reprises paquet par paquet par insert_chunk, qui isole les lignes en cause.
+    Connexion perdue, `spool_on_failure`, `query` et `derived` : comme dans insert_chunk.
+    Retourne (succès, doublons, erreurs).
+    """
+    query = query or INSERT_QUERY
+    maintain_latest = derived and MAINTAIN_LATEST_TABLE
+    chunk_size = max(1, BATCH_ROWS_PER_STATEMENT)
+    for attempt in range(COMMIT_MAX_RETRIES + 1):
+        try:
+            wait_start = time.perf_counter()
+            async with pool.acquire() as conn:
+                limiter.record_pool_wait(time.perf_counter() - wait_start)
+                async with conn.cursor() as cur:
+                    try:
+                        with timed_statement(len(rows)):
+                            await conn.begin()
+                            inserted = []
+                            for i in range(0, len(rows), chunk_size):
+                                chunk = rows[i:i + chunk_size]
+                                await cur.executemany(query, chunk)
+                                if 0 < cur.rowcount < len(chunk):
+                                    raise PartialDuplicateChunk()
+                                if cur.rowcount:
+                                    inserted.extend(chunk)
+                            if inserted and maintain_latest:
+                                await cur.executemany(LATEST_UPSERT_QUERY, latest_rows(inserted))
+                            await conn.commit()
+                    except Exception as e:
+                        if not is_connection_error(e):
+                            await conn.rollback()
+                        raise
+        except Exception as e:
+            if is_connection_error(e):
+                if disk_spool is not None:
+                    mark_db_unhealthy(e)
+                    if spool_on_failure:
+                        return 0, 0, spool_rows(rows)
+                return 0, 0, len(rows)
+            if is_lock_error(e) and attempt < COMMIT_MAX_RETRIES:
+                COMMIT_RETRIES_TOTAL.inc()
+                await asyncio.sleep(COMMIT_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+                continue
+            results = [await insert_chunk(pool, rows[i:i + chunk_size], spool_on_failure, query, derived)
+                       for i in range(0, len(rows), chunk_size)]
+            return tuple(sum(counts) for counts in zip(*results))
+
+        COMMITS_TOTAL.inc()
+        on_rows_committed(inserted, derived)
+        return len(inserted), len(rows) - len(inserted), 0
+
+
+async def insert_cycles_batch(pool, timed_cycles):
+    """
+    Valide les enregistrements d'un ou plusieurs cycles [(horodatage, cycle), ...]
+    puis les insère par paquets de BATCH_ROWS_PER_STATEMENT lignes,
+    les paquets étant répartis sur le pool.
+    """
+    rows = []
+    skip_count = 0
+    with STAGE_SECONDS['validate'].time():
+        for timestamp, cycle in timed_cycles:
+            mask, reasons = validate_cycle(cycle)
+            skip_count += count_rejects(reasons)
+            rows.extend(record.as_row(timestamp) for record, accepted in zip(cycle, mask) if accepted)
+
+    success_count, duplicate_count, error_count = await insert_rows(pool, rows)
+    return success_count, skip_count + duplicate_count, error_count
+
+
+async def insert_rows(pool, rows, query: str = None, derived: bool = True):
+    """
+    Insère des lignes déjà validées par paquets de BATCH_ROWS_PER_STATEMENT répartis sur le pool,
+    une transaction par paquet ou, avec COMMIT_POLICY = 'cycle', par groupe de paquets.
+    Les lignes déjà en base sont comptées dans skip_reasons (REJECT_DUPLICATE).
+    Tant que la base est injoignable, les lignes vont directement au spool.
+    `query` (autre table cible, voir insert_chunk) : pas de spool, drain_spool rejouant dans
+    DB_TABLE_NAME ; les lignes non insérées sont comptées en erreurs.
+    Retourne (succès, doublons, erreurs).
+    """
+    spool_on_failure = query is None
+    if disk_spool is not None and not db_healthy and spool_on_failure:
+        return 0, 0, spool_rows(rows)
+
+    chunk_size = max(1, BATCH_ROWS_PER_STATEMENT)
+    if COMMIT_POLICY == 'cycle':
+        # Au plus COMMIT_CONNECTIONS transactions de paquets entiers, une par connexion
+        chunk_count = -(-len(rows) // chunk_size)
+        transactions = max(1, min(COMMIT_CONNECTIONS, chunk_count))
+        per_transaction = max(1, -(-chunk_count // transactions)) * chunk_size
+        parts = [rows[i:i + per_transaction] for i in range(0, len(rows), per_transaction)]
+        results = await map_limited(
+            lambda part: insert_transaction(pool, part, spool_on_failure, query, derived), parts)
+    else:
+        chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+        results = await map_limited(
+            lambda chunk: insert_chunk(pool, chunk, spool_on_failure, query, derived), chunks)
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+    success_count = sum(success for success, _, _ in results)
+    duplicate_count = sum(duplicates for _, duplicates, _ in results)
+    error_count = sum(error for _, _, error in results)
+    if duplicate_count:
+        skip_reasons[REJECT_DUPLICATE] += duplicate_count
+    return success_count, duplicate_count, error_count
+
+
+async def insert_cycles(pool, timed_cycles):
+    """
+    Insère ensemble un ou plusieurs cycles [(horodatage, cycle), ...] selon INSERT_MODE.
+    Base injoignable : le chemin par paquets écrit les lignes validées au spool.
+    """
+    if INSERT_MODE == 'batch' or (disk_spool is not None and not db_healthy):
+        return await insert_cycles_batch(pool, timed_cycles)
+
+    # Une insertion par record, au plus limiter.limit simultanées
+    timed_records = [(timestamp, record) for timestamp, cycle in timed_cycles for record in cycle]
+    results = await map_limited(lambda timed: insert_record(pool, timed[1], timed[0]), timed_records)
+
+    success_count = 0
+    skip_count = 0
+    error_count = 0
+    inserted = []
+
+    for (timestamp, record), result in zip(timed_records, results):
+        if isinstance(result, Exception) or result[0] == RESULT_ERROR:
+            error_count += 1
+        elif result[0] == RESULT_SUCCESS:
+            success_count += 1
+            inserted.append(record.as_row(timestamp))
+        elif result[0] == RESULT_SPOOLED:
+            continue
+        else:
+            skip_reasons[result[1]] += 1
+            skip_count += 1
+
+    # Un INSERT par mesure : les dernières valeurs sont mises à jour en un lot après le cycle
+    await upsert_latest(pool, inserted)
+    on_rows_committed(inserted)
+
+    return success_count, skip_count, error_count
+
+
+async def insert_cycle(pool, cycle, cycle_num, timestamp=None):
+    """
+    Insère tous les enregistrements d'un cycle en parallèle.
+    Sans `timestamp`, le cycle est horodaté à l'heure courante.
+    """
+    if timestamp is None:
+        timestamp = datetime.now().strftime(DATETIME_FORMAT)
+    return await insert_cycles(pool, [(timestamp, cycle)])
+
+
+async def ping_database(pool) -> bool:
+    """Sonde la base par un SELECT 1 borné à SPOOL_HEALTH_CHECK_SECONDS."""
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await asyncio.wait_for(cur.execute("SELECT 1"), SPOOL_HEALTH_CHECK_SECONDS)
+        return True
+    except Exception:
+        return False
+
+
+async def drain_spool(pool):
+    """
+    Tâche de fond : tant que la base est injoignable, la sonde toutes les SPOOL_HEALTH_CHECK_SECONDS.
+    Une fois rétablie, rejoue le spool dans l'ordre par lots de SPOOL_DRAIN_BATCH_ROWS lignes,
+    au plus SPOOL_DRAIN_MAX_ROWS_PER_SECOND, pendant que les cycles en direct continuent.
+    Un lot n'est retiré du spool qu'une fois inséré ; les lignes déjà en base sont des doublons.
+    """
+    global db_healthy
+    while True:
+        if not db_healthy:
+            await asyncio.sleep(SPOOL_HEALTH_CHECK_SECONDS)
+            if await ping_database(pool):
+                db_healthy = True
+                DB_UP.set(1)
+                print(f"\n[INFO] Base rétablie : rejeu de {len(disk_spool)} lignes depuis le spool")
+            continue
+
+        rows = disk_spool.read(SPOOL_DRAIN_BATCH_ROWS)
+        if not rows:
+            # Position éventuellement avancée sur des lignes illisibles : validée avant d'attendre
+            disk_spool.ack()
+            await asyncio.sleep(SPOOL_HEALTH_CHECK_SECONDS)
+            continue
+
+        start = time.perf_counter()
+        async with limiter:
+            success, duplicates, errors = await insert_chunk(pool, rows, spool_on_failure=False)
+        if not db_healthy:
+            # Lot non retiré : relu après le retour de la base
+            continue
+        disk_spool.ack()
+        if duplicates:
+            skip_reasons[REJECT_DUPLICATE] += duplicates
+        SPOOL_ROWS['drained'].inc(len(rows))
+        SPOOL_PENDING.set(len(disk_spool))
+        ROWS_TOTAL[RESULT_SUCCESS].inc(success)
+        ROWS_TOTAL[RESULT_SKIP].inc(duplicates)
+        ROWS_TOTAL[RESULT_ERROR].inc(errors)
+        if not len(disk_spool):
+            print(f"\n[INFO] Spool vidé ({disk_spool.drained} lignes rejouées)")
+
+        # Limitation du débit de rejeu
+        remaining = len(rows) / SPOOL_DRAIN_MAX_ROWS_PER_SECOND - (time.perf_counter() - start)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+
+def start_spool(pool, directory: str = SPOOL_DIR):
+    """
+    Ouvre le spool disque (si SPOOL_ENABLED) et lance sa tâche de rejeu.
+    Les lignes laissées par une exécution précédente sont rejouées d'abord.
+    Retourne la tâche, ou None.
+    """
+    global disk_spool
+    if not SPOOL_ENABLED:
+        return None
+    disk_spool = spool.DiskSpool(directory, SPOOL_SEGMENT_MAX_BYTES, SPOOL_MAX_BYTES, SPOOL_FSYNC_INTERVAL_SECONDS)
+    DB_UP.set(1)
+    SPOOL_PENDING.set(len(disk_spool))
+    if len(disk_spool):
+        print(f"[INFO] Spool: {len(disk_spool)} lignes d'une exécution précédente à rejouer ({directory})")
+    return asyncio.create_task(drain_spool(pool))
+
+
+async def stop_spool(drain_task):
+    """Arrête le rejeu et ferme le spool (les lignes restantes seront rejouées au prochain démarrage)."""
+    global disk_spool
+    if drain_task is None:
+        return
+    drain_task.cancel()
+    await asyncio.gather(drain_task, return_exceptions=True)
+    if disk_spool.spooled or disk_spool.drained or len(disk_spool):
+        print(f"[INFO] Spool: {disk_spool.summary()}")
+    disk_spool.close()
+    disk_spool = None
+
+
+class PacingController:
+    """
+    Suivi du rythme de la boucle temps réel : retard sur l'horloge, latence des cycles
+    (percentiles sur une fenêtre glissante), profondeur de la queue du producteur,
+    et état de la politique PACING_POLICY (cycles regroupés / abandonnés, sous-échantillonnage).
+    """
+
+    def __init__(self, policy: str, delay: float):
+        self.policy = policy
+        self.delay = delay
+        self.latencies = deque(maxlen=PACING_LATENCY_WINDOW)
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.queue_depth = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.decimation = 1
+        self.on_time_streak = 0
+        self.first_lost = None  # Premier cycle abandonné ou sous-échantillonné
+
+    def lose(self, cycle_idx: int):
+        """Note un cycle dont des lignes ne seront pas insérées ('drop_oldest', 'degrade')."""
+        if self.first_lost is None:
+            self.first_lost = cycle_idx
+
+    def complete_cycles(self, cycle_idx: int) -> int:
+        """Nombre de cycles de tête insérés (ou mis au spool) en entier, sur les `cycle_idx` traités."""
+        return cycle_idx if self.first_lost is None else min(cycle_idx, self.first_lost)
+
+    def late_slots(self, lag: float) -> int:
+        """Nombre de créneaux déjà échus en plus du cycle courant."""
+        return int(lag // self.delay) if self.delay > 0 else 0
+
+    def record(self, latency: float, lag: float):
+        """Enregistre la latence d'un cycle et ajuste le sous-échantillonnage ('degrade')."""
+        self.latencies.append(latency)
+        self.lag = lag
+        self.max_lag = max(self.max_lag, lag)
+
+        if self.policy != 'degrade':
+            return
+        if lag > self.delay:
+            self.on_time_streak = 0
+            if self.decimation < PACING_DEGRADE_MAX_FACTOR:
+                self.decimation *= 2
+                print(f"\n[PACING] Retard {lag:.2f}s : paramètres non prioritaires à 1 cycle sur {self.decimation}")
+        elif lag == 0.0:
+            self.on_time_streak += 1
+            if self.decimation > 1 and self.on_time_streak >= PACING_RECOVERY_CYCLES:
+                self.decimation //= 2
+                self.on_time_streak = 0
+                print(f"\n[PACING] Rythme rétabli : paramètres non prioritaires à 1 cycle sur {self.decimation}")
+
+    def sample(self, cycle, cycle_idx: int):
+        """Applique le sous-échantillonnage courant aux paramètres non prioritaires."""
+        if self.decimation == 1 or cycle_idx % self.decimation == 0:
+            return cycle
+        self.lose(cycle_idx)
+        return [record for record in cycle if record.parameter_id in PACING_PRIORITY_PARAMETERS]
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> str:
+        return (f"retard {self.lag:.2f}s (max {self.max_lag:.2f}s) | latence p50 {self.percentile(0.5) * 1000:.0f}ms "
+                f"p95 {self.percentile(0.95) * 1000:.0f}ms p99 {self.percentile(0.99) * 1000:.0f}ms | "
+                f"queue {self.queue_depth} | regroupés {self.coalesced} | abandonnés {self.dropped} | "
+                f"échantillonnage 1/{self.decimation}")
+
+
+def print_progress_bar(cycle, progress, success, skip, error, elapsed):
+    """Affiche une barre de progression (part du fichier lue) avec statistiques et temps restant estimé."""
+    bar_length = 40
+    progress = min(max(progress, 0.0), 1.0)
+    filled = int(bar_length * progress)
+    bar = '█' * filled + '░' * (bar_length - filled)
+
+    # Calcul de l'ETA (Estimated Time of Arrival)
+    eta = elapsed / progress * (1 - progress) if progress > 0 else 0
+
+    print(f"\r[{bar}] Cycle {cycle} ({progress*100:.1f}%) | "
+          f"✓{success} ⊘{skip} ✗{error} | "
+          f"Temps: {elapsed:.0f}s | ETA: {eta:.0f}s", end='', flush=True)
+
+
+def csv_fingerprint(filepath: str, length: int) -> str:
+    """Empreinte des `length` premiers octets du CSV (inchangée si le fichier est complété)."""
+    with open(filepath, 'rb') as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+
+class CsvCheckpoint:
+    """
+    Point de reprise de l'import CSV : octet de début et numéro du prochain cycle à insérer.
+    Le producteur ajoute à `cycle_ends` l'octet de fin de chaque cycle lu ; `advance` les
+    consomme à mesure que la boucle d'insertion valide les cycles. Le fichier est réécrit
+    atomiquement (fichier temporaire puis os.replace).
+    """
+
+    def __init__(self, csv_path: str, path: str = None):
+        self.csv_path = csv_path
+        self.path = path or csv_path + '.checkpoint'
+        self.offset = 0
+        self.cycle = 0
+        self.cycles_done = 0
+        self.cycle_ends = deque()
+        self.fingerprint_bytes = min(CSV_FINGERPRINT_BYTES, os.path.getsize(csv_path))
+        self.fingerprint = csv_fingerprint(csv_path, self.fingerprint_bytes)
+        self.last_save = 0.0
+
+    def load(self) -> bool:
+        """Reprend le point enregistré s'il correspond au CSV. Retourne True en cas de reprise."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Point de reprise illisible ({self.path}), import depuis le début: {e}")
+            return False
+
+        length = state.get('fingerprint_bytes', 0)
+        if (state.get('offset', 0) > os.path.getsize(self.csv_path)
+                or csv_fingerprint(self.csv_path, length) != state.get('fingerprint')):
+            print(f"[WARNING] Point de reprise ignoré : {self.csv_path} a été remplacé")
+            return False
+
+        self.offset = state['offset']
+        self.cycle = state['cycle']
+        self.fingerprint_bytes, self.fingerprint = length, state['fingerprint']
+        return True
+
+    def advance(self, cycles_done: int):
+        """Avance jusqu'au `cycles_done`-ième cycle traité depuis le démarrage."""
+        while self.cycles_done < cycles_done and self.cycle_ends:
+            self.offset = self.cycle_ends.popleft()
+            self.cycle += 1
+            self.cycles_done += 1
+
+    def save(self, force: bool = False):
+        """Écrit le point de reprise, au plus toutes les CSV_CHECKPOINT_INTERVAL_SECONDS sauf `force`."""
+        now = time.monotonic()
+        if not force and now - self.last_save < CSV_CHECKPOINT_INTERVAL_SECONDS:
+            return
+        # Les cycles partis au spool doivent être sur disque avant d'être dépassés
+        if disk_spool is not None:
+            disk_spool.sync(force=True)
+        state = {
+            'csv': os.path.abspath(self.csv_path),
+            'offset': self.offset,
+            'cycle': self.cycle,
+            'fingerprint_bytes': self.fingerprint_bytes,
+            'fingerprint': self.fingerprint,
+            'saved_at': datetime.now().strftime(DATETIME_FORMAT),
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.last_save = now
+
+
+async def insert_all_async(filepath: str, delay: float = INSERT_DELAY_SECONDS):
+    """
+    Boucle d'insertion pour un fichier CSV fini.
+    Le CSV est lu en flux par csv_producer pendant que les cycles sont insérés.
+    Si CSV_CHECKPOINT_ENABLED, l'import reprend au dernier point de reprise enregistré.
+    """
+    file_size = os.path.getsize(filepath)
+    checkpoint = None
+    if CSV_CHECKPOINT_ENABLED:
+        checkpoint = CsvCheckpoint(filepath, CSV_CHECKPOINT_FILE)
+        if checkpoint.load():
+            if checkpoint.offset >= file_size:
+                print(f"[WARNING] {filepath} déjà importé entièrement d'après {checkpoint.path} : rien à insérer "
+                      f"(supprimer ce fichier ou fixer CSV_CHECKPOINT_ENABLED = False pour le réimporter)")
+                return
+            if checkpoint.offset > 0:
+                print(f"[WARNING] Reprise de l'import au cycle {checkpoint.cycle} "
+                      f"(octet {checkpoint.offset}, {checkpoint.offset / file_size * 100:.1f}%) d'après "
+                      f"{checkpoint.path} : supprimer ce fichier pour repartir du début")
+
+    pool = await create_pool()
+    await discover_valid_data(pool)
+
+    drain_task = start_spool(pool)
+    # Import CSV : seule la validation dépend de la référence, appliquée dès son rechargement
+    _, refresh_task = start_reference_refresher(pool, deferred=False)
+    start_offset = checkpoint.offset if checkpoint else 0
+    progress = {'bytes': start_offset, 'offset': start_offset}
+    batch_queue = asyncio.Queue(maxsize=CSV_QUEUE_MAXSIZE)
+    producer_task = asyncio.create_task(csv_producer(batch_queue, filepath, progress, checkpoint))
+
+    print(f"[DEBUG] Fichier: {file_size / 1e6:.1f} Mo, lecture par lots de {CSV_CYCLES_PER_BATCH} cycles")
+    # Fichier enregistré : aucune ligne ne doit être abandonnée ni sous-échantillonnée
+    policy = PACING_POLICY if PACING_POLICY in LOSSLESS_PACING_POLICIES else 'catch_up'
+    if policy != PACING_POLICY:
+        print(f"[INFO] PACING_POLICY '{PACING_POLICY}' réservée au générateur : 'catch_up' pour un CSV")
+    print(f"[DEBUG] Délai entre cycles: {delay}s | Rythme: {policy}")
+    print("-" * 60)
+
+    start_time = datetime.now()
+    pacer = PacingController(policy, delay)
+
+    def report(cycle_idx, total_success, total_skip, total_error):
+        elapsed = (datetime.now() - start_time).total_seconds()
+        print_progress_bar(cycle_idx, progress['bytes'] / file_size if file_size else 1.0,
+                           total_success, total_skip, total_error, elapsed)
+        if checkpoint is not None:
+            # Jamais au-delà d'un cycle abandonné par le rythme : une reprise doit le réinsérer
+            checkpoint.advance(pacer.complete_cycles(cycle_idx))
+            checkpoint.save()
+
+    try:
+        cycle_count, total_success, total_skip, total_error = await run_realtime_loop(
+            pool, batch_queue, delay, time.time(), report, pacer=pacer)
+        print()
+        # Remonte une éventuelle erreur de lecture du CSV
+        await producer_task
+    finally:
+        producer_task.cancel()
+        if refresh_task is not None:
+            refresh_task.cancel()
+        await stop_spool(drain_task)
+        if checkpoint is not None:
+            checkpoint.save(force=True)
+        await flush_rollups(pool, final=True)
+        await flush_alert_events(pool)
+        pool.close()
+        await pool.wait_closed()
+
+    if cycle_count == 0:
+        print("[ERROR] Aucun cycle")
+        return
+
+    end_time = datetime.now()
+    duration = (end_time - start_time).total_seconds()
+
+    print("-" * 60)
+    print(f"[RESULT] Cycles: {cycle_count}")
+    print(f"[RESULT] Succès: {total_success}")
+    print(f"[RESULT] Ignorés: {total_skip} ({format_skip_reasons()})")
+    print(f"[RESULT] Erreurs: {total_error} (refusées par la base: {format_error_reasons()})")
+    print(f"[RESULT] Rythme: {pacer.summary()}")
+    print(f"[RESULT] Concurrence: {limiter.summary()}")
+    if checkpoint is not None:
+        print(f"[RESULT] Point de reprise: cycle {checkpoint.cycle} (octet {checkpoint.offset}) -> {checkpoint.path}")
+    print(f"[RESULT] Durée: {duration:.2f}s")
+    if duration > 0:
+        print(f"[RESULT] Vitesse: {total_success / duration:.1f} insert/s")
+
+
+async def set_secondary_indexes(pool, enabled: bool):
+    """Supprime ou recrée les index secondaires de SECONDARY_INDEXES sur la table cible."""
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(f"SHOW INDEX FROM {DB_TABLE_NAME}")
+            existing = {row[2] for row in await cur.fetchall()}
+
+            if enabled:
+                clauses = [f"ADD INDEX {name} {columns}"
+                           for name, columns in SECONDARY_INDEXES.items() if name not in existing]
+            else:
+                clauses = [f"DROP INDEX {name}" for name in SECONDARY_INDEXES if name in existing]
+
+            if not clauses:
+                return
+            action = "Recréation" if enabled else "Suppression"
+            print(f"[INFO] {action} des index secondaires: {', '.join(clauses)}")
+            await cur.execute(f"ALTER TABLE {DB_TABLE_NAME} {', '.join(clauses)}")
+
+
+async def bulk_load_file(pool, path: str) -> int:
+    """Charge un fichier tampon CSV via LOAD DATA LOCAL INFILE dans une seule transaction."""
+    query = (
+        f"LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE {DB_TABLE_NAME} "
+        "CHARACTER SET utf8mb4 "
+        "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+        "LINES TERMINATED BY '\\n' "
+        f"({', '.join(DB_COLUMNS)})"
+    )
+    async with pool.acquire() as conn:
+        await conn.begin()
+        try:
+            async with conn.cursor() as cur:
+                await cur.execute(query, (path,))
+                loaded = cur.rowcount
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+    return loaded
+
+
+async def bulk_import_csv(filepath: str):
+    """
+    Import massif du CSV (restauration / historique) sans temporisation entre cycles.
+    Les lignes validées sont écrites dans un fichier tampon puis chargées par
+    LOAD DATA LOCAL INFILE, par transactions de BULK_ROWS_PER_LOAD lignes.
+    Les lignes suivent le même découpage en cycles que l'insertion temps réel
+    (iter_cycles, avec repli sur la répétition d'une paire) et le même remplissage
+    FILL_VALUES (iter_filled_cycles). Les horodatages du CSV sont conservés
+    (heure courante si absents) ; une valeur générée prend celui de son cycle.
+    """
+    pool = await create_pool(local_infile=True)
+    await discover_valid_data(pool)
+
+    fd, buffer_path = tempfile.mkstemp(prefix='dashmed_bulk_', suffix='.csv')
+    os.close(fd)
+
+    total_written = 0
+    total_loaded = 0
+    total_skip = 0
+    start = time.perf_counter()
+
+    async def flush(buffer_file, rows_in_buffer):
+        nonlocal total_loaded
+        buffer_file.close()
+        load_start = time.perf_counter()
+        loaded = await bulk_load_file(pool, buffer_path)
+        load_duration = time.perf_counter() - load_start
+        total_loaded += loaded
+        rate = rows_in_buffer / load_duration if load_duration > 0 else 0
+        print(f"[BULK] {rows_in_buffer} lignes envoyées en {load_duration:.2f}s "
+              f"({rate:.0f} lignes/s) | Total chargé: {total_loaded}")
+
+    try:
+        if BULK_DROP_SECONDARY_INDEXES:
+            await set_secondary_indexes(pool, enabled=False)
+
+        print(f"[DEBUG] Import massif: {BULK_ROWS_PER_LOAD} lignes par transaction")
+        print("-" * 60)
+
+        now = datetime.now().strftime(DATETIME_FORMAT)
+        buffer_file = open(buffer_path, 'w', encoding='utf-8', newline='')
+        writer = csv.writer(buffer_file, lineterminator='\n')
+        rows_in_buffer = 0
+
+        cycles = iter_cycles(iter_csv_records(filepath))
+        if FILL_VALUES and VALID_PARAMETERS and VALID_PATIENT_IDS:
+            cycles = iter_filled_cycles(cycles)
+
+        for cycle in cycles:
+            mask, reasons = validate_cycle(cycle)
+            for record, valid, reason in zip(cycle, mask, reasons):
+                if not valid:
+                    skip_reasons[reason] += 1
+                    total_skip += 1
+                    continue
+                writer.writerow(record.as_row(now))
+                rows_in_buffer += 1
+                total_written += 1
+
+            # Un cycle n'est jamais coupé entre deux transactions
+            if rows_in_buffer >= BULK_ROWS_PER_LOAD:
+                await flush(buffer_file, rows_in_buffer)
+                buffer_file = open(buffer_path, 'w', encoding='utf-8', newline='')
+                writer = csv.writer(buffer_file, lineterminator='\n')
+                rows_in_buffer = 0
+
+        if rows_in_buffer:
+            await flush(buffer_file, rows_in_buffer)
+        else:
+            buffer_file.close()
+
+        await refresh_latest_table(pool)
+        if MAINTAIN_ROLLUPS:
+            print(f"[INFO] {ROLLUP_TABLE_NAME} n'est pas alimentée par l'import massif : "
+                  "lancer `python main.py backfill_rollups`")
+    finally:
+        if BULK_DROP_SECONDARY_INDEXES:
+            await set_secondary_indexes(pool, enabled=True)
+        os.remove(buffer_path)
+        pool.close()
+        await pool.wait_closed()
+
+    duration = time.perf_counter() - start
+
+    print("-" * 60)
+    print(f"[RESULT] Lignes chargées: {total_loaded}")
+    print(f"[RESULT] Ignorées (validation): {total_skip} ({format_skip_reasons()})")
+    print(f"[RESULT] Rejetées par la BDD (doublons): {total_written - total_loaded}")
+    print(f"[RESULT] Durée: {duration:.2f}s")
+    if duration > 0:
+        print(f"[RESULT] Vitesse: {total_loaded / duration:.1f} lignes/s")
+
+
+async def random_producer(batch_queue: asyncio.Queue, num_cycles=100, snapshot: SimulationSnapshot = None,
+                          refresher: ReferenceRefresher = None):
+    """
+    Génère les données de façon asynchrone pour ne jamais bloquer l'insertion.
+    L'état du moteur doit avoir été préparé (prepare_simulation) ; `snapshot` reçoit
+    l'état atteint à la fin de chaque lot. Les données de référence rechargées par
+    `refresher` sont appliquées entre deux lots, quand aucune génération n'est en cours.
+    """
+    generate = generate_batch_vectorized if simulation_engine() == 'numpy' else generate_batch
+    generated = 0
+    while True:
+        if refresher is not None:
+            refresher.apply()
+        with STAGE_SECONDS['generate'].time():
+            data = await asyncio.to_thread(generate, num_cycles)
+        with STAGE_SECONDS['group'].time():
+            cycles = group_data_by_cycle(data)
+        generated += len(cycles)
+        if snapshot is not None:
+            snapshot.capture(generated)
+        await batch_queue.put(cycles)
+
+
+async def run_realtime_loop(pool, batch_queue, delay, clock_origin, on_cycle, stop_event=None, pacer=None):
+    """
+    Boucle temps réel commune : consomme les lots de cycles de `batch_queue` (un lot vide
+    marque la fin du flux) et insère le cycle k à l'instant clock_origin + k * delay
+    (horloge murale, partagée entre processus). Chaque cycle est horodaté à son créneau,
+    ce qui garde des horodatages monotones même en retard. Quand la base ne suit pas,
+    `pacer` applique PACING_POLICY. Jusqu'à commit_group_size(delay) cycles sont regroupés
+    par envoi (COMMIT_GROUP_CYCLES). on_cycle(k, succès, ignorés, erreurs) reçoit
+    les totaux cumulés après chaque insertion. Retourne (cycles, succès, ignorés, erreurs).
+    """
+    if pacer is None:
+        pacer = PacingController(PACING_POLICY, delay)
+
+    pending = deque()
+    totals = [0, 0, 0]
+    cycle_idx = 0
+    lag = 0.0
+    group = []
+    group_size = commit_group_size(delay)
+
+    def slot_timestamp(idx):
+        return datetime.fromtimestamp(clock_origin + idx * delay).strftime(DATETIME_FORMAT)
 
-async def insert_all_async(data, delay: float = INSERT_DELAY_SECONDS):
-    """Boucle d'insertion pour un jeu de données fini (test ou CSV)."""
+    async def send(timed_cycles):
+        start = time.perf_counter()
+        success, skip, error = await insert_cycles(pool, timed_cycles)
+        if live_feed is not None:
+            live_feed.flush()
+        if rollups.completed:
+            await flush_rollups(pool)
+        if alerts.transitions:
+            await flush_alert_events(pool)
+        latency = time.perf_counter() - start
+        pacer.record(latency, lag)
+
+        CYCLE_SECONDS.observe(latency)
+        CYCLE_LAG.set(lag)
+        CYCLES_TOTAL.inc(len(timed_cycles))
+        ROWS_TOTAL[RESULT_SUCCESS].inc(success)
+        ROWS_TOTAL[RESULT_SKIP].inc(skip)
+        ROWS_TOTAL[RESULT_ERROR].inc(error)
+
+        totals[0] += success
+        totals[1] += skip
+        totals[2] += error
+        on_cycle(cycle_idx, *totals)
+
+        if cycle_idx // PACING_REPORT_INTERVAL != (cycle_idx - len(timed_cycles)) // PACING_REPORT_INTERVAL:
+            print(f"\n[PACING] {pacer.summary()} | {limiter.summary()}")
+
+    try:
+        while stop_event is None or not stop_event.is_set():
+            if not pending:
+                pacer.queue_depth = batch_queue.qsize()
+                QUEUE_DEPTH.set(pacer.queue_depth)
+                cycles = await batch_queue.get()
+                if not cycles:
+                    break
+                pending.extend(cycles)
+
+            scheduled = clock_origin + cycle_idx * delay
+            sleep_time = scheduled - time.time()
+            if sleep_time > 0:
+                await asyncio.sleep(sleep_time)
+            lag = max(0.0, time.time() - scheduled)
+            late = pacer.late_slots(lag)
+            if lag > 0.5 and pacer.policy == 'none':
+                print(f"\n[WARNING] Retard important : {lag:.2f}s (La base est trop lente)")
+
+            # Récupère sans attendre les lots déjà prêts pour pouvoir regrouper / abandonner
+            while late >= len(pending) and not batch_queue.empty():
+                cycles = batch_queue.get_nowait()
+                if not cycles:
+                    batch_queue.put_nowait(cycles)
+                    break
+                pending.extend(cycles)
+
+            timed_cycles = []
+            if pacer.policy == 'catch_up' and late:
+                count = min(1 + late, PACING_MAX_COALESCED_CYCLES, len(pending))
+                for _ in range(count):
+                    timed_cycles.append((slot_timestamp(cycle_idx), pending.popleft()))
+                    cycle_idx += 1
+                pacer.coalesced += count - 1
+            else:
+                if pacer.policy == 'drop_oldest' and late:
+                    dropped = min(late, len(pending) - 1)
+                    for _ in range(dropped):
+                        pending.popleft()
+                        pacer.lose(cycle_idx)
+                        cycle_idx += 1
+                    pacer.dropped += dropped
+                cycle = pacer.sample(pending.popleft(), cycle_idx)
+                timed_cycles.append((slot_timestamp(cycle_idx), cycle))
+                cycle_idx += 1
+
+            # Regroupement de cycles consécutifs en un seul envoi (COMMIT_GROUP_CYCLES)
+            group.extend(timed_cycles)
+            if len(group) >= group_size:
+                timed_cycles, group = group, []
+                await send(timed_cycles)
+    finally:
+        # Cycles d'un groupe incomplet (fin du flux, arrêt) : insérés avant de rendre la main
+        if group:
+            timed_cycles, group = group, []
+            await send(timed_cycles)
+
+    return (cycle_idx, *totals)
+
+
+async def run_multirate_loop(pool, clock_origin, on_flush, stop_event=None, refresher=None):
+    """
+    Génération multi-fréquence (SAMPLING_MODE = 'multirate') : un tas d'échéances, une entrée
+    par groupe de fréquence (et non par série). À chaque échéance, le groupe est généré d'un
+    bloc et horodaté à son échéance (milliseconde) ; les échéances en retard sont rattrapées
+    avec leur propre horodatage. Les échantillons accumulés partent toutes les
+    MULTIRATE_FLUSH_INTERVAL_MS, avec au plus MULTIRATE_MAX_INFLIGHT envois simultanés.
+    on_flush(échantillons, succès, erreurs, retard) reçoit les totaux cumulés.
+    Les données de référence rechargées par `refresher` sont appliquées entre deux échéances.
+    """
+    global episode_count
+    groups = build_rate_groups()
+    origin_ms = int(clock_origin * 1000)
+    schedule = [(origin_ms, i) for i in range(len(groups))]
+    heapq.heapify(schedule)
+
+    episode_ms = int(REDEFINITION_INTERVAL * CYCLE_PERIOD_SECONDS * 1000)
+    next_episode_ms = origin_ms
+    flush_ms = MULTIRATE_FLUSH_INTERVAL_MS
+    next_flush_ms = origin_ms + flush_ms
+
+    print("[DEBUG] Groupes de fréquence: " + ", ".join(
+        f"{1000 / g.period_ms:g} Hz x {len(g.cols)}" for g in groups))
+
+    pending = []
+    inflight = set()
+    totals = {'samples': 0, 'success': 0, 'error': 0}
+
+    async def send(rows, lag):
+        success, skip, error = await insert_rows(pool, rows)
+        if live_feed is not None:
+            live_feed.flush()
+        if rollups.completed:
+            await flush_rollups(pool)
+        if alerts.transitions:
+            await flush_alert_events(pool)
+        totals['success'] += success
+        totals['error'] += error
+        ROWS_TOTAL[RESULT_SUCCESS].inc(success)
+        ROWS_TOTAL[RESULT_SKIP].inc(skip)
+        ROWS_TOTAL[RESULT_ERROR].inc(error)
+        on_flush(totals['samples'], totals['success'], totals['error'], lag)
+
+    async def flush(lag):
+        nonlocal pending
+        if not pending:
+            return
+        while len(inflight) >= MULTIRATE_MAX_INFLIGHT:
+            await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+        task = asyncio.create_task(send(pending, lag))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+        pending = []
+
+    lag = 0.0
+    try:
+        while stop_event is None or not stop_event.is_set():
+            now_ms = time.time() * 1000
+            if refresher is not None and refresher.apply():
+                # Groupes reconstruits ; une période déjà planifiée garde son échéance
+                due_by_period = {groups[i].period_ms: due for due, i in schedule}
+                groups = build_rate_groups()
+                schedule = [
+                    (due_by_period.get(g.period_ms,
+                                       origin_ms + math.ceil((now_ms - origin_ms) / g.period_ms) * g.period_ms), i)
+                    for i, g in enumerate(groups)
+                ]
+                heapq.heapify(schedule)
+
+            if now_ms >= next_flush_ms:
+                await flush(lag)
+                next_flush_ms = max(next_flush_ms + flush_ms, now_ms)
+
+            due_ms = schedule[0][0]
+            if due_ms > now_ms:
+                await asyncio.sleep((min(due_ms, next_flush_ms) - now_ms) / 1000)
+                continue
+
+            lag = (now_ms - due_ms) / 1000
+            CYCLE_LAG.set(lag)
+
+            with STAGE_SECONDS['generate'].time():
+                while schedule[0][0] <= now_ms:
+                    due_ms, i = heapq.heappop(schedule)
+                    if due_ms >= next_episode_ms:
+                        episode_count += 1
+                        vector_new_episode()
+                        next_episode_ms += episode_ms
+                        print(f"\n[DÉCISION] Épisode {episode_count} (multi-fréquence)")
+                    group = groups[i]
+                    rows = generate_rate_group(group, format_timestamp_ms(due_ms))
+                    totals['samples'] += len(rows)
+                    pending.extend(rows)
+                    heapq.heappush(schedule, (due_ms + group.period_ms, i))
+    finally:
+        await flush(0.0)
+        if inflight:
+            await asyncio.gather(*inflight, return_exceptions=True)
+
+    return totals['samples'], totals['success'], totals['error']
+
+
+async def insert_infinite_async(delay: float = INSERT_DELAY_SECONDS):
+    """Boucle d'insertion infinie : génère et insère simultanément."""
     pool = await create_pool()
     await discover_valid_data(pool)
 
-    if data is None:
+    if not VALID_PATIENT_IDS or not VALID_PARAMETERS:
+        print("[ERROR] Données BDD non découvertes")
         pool.close()
         await pool.wait_closed()
         return
 
-    cycles = group_data_by_cycle(data)
-    if not cycles:
-        print("[ERROR] Aucun cycle")
+    if (SIMULATION_ENGINE == 'numpy' or SAMPLING_MODE == 'multirate') and np is None:
+        print("[ERROR] Moteur 'numpy' demandé mais NumPy n'est pas installé (pip install numpy)")
         pool.close()
         await pool.wait_closed()
         return
 
-    total_records = sum(len(cycle) for cycle in cycles)
+    if SHARD_WORKERS > 1:
+        # Le coordinateur n'insère rien lui-même : chaque worker ouvre son propre pool
+        pool.close()
+        await pool.wait_closed()
+        await run_sharded(delay)
+        return
 
-    print(f"[DEBUG] {len(cycles)} cycles, {total_records} enregistrements")
+    print(f"[DEBUG] Démarrage de la génération et insertion infinie en parallèle.")
     print(f"[DEBUG] Délai entre cycles: {delay}s")
-    print(f"[DEBUG] Temps estimé: {len(cycles) * delay:.0f}s")
     print("-" * 60)
 
-    total_success = 0
-    total_skip = 0
-    total_error = 0
+    snapshot = SimulationSnapshot(SIM_SNAPSHOT_FILE) if SIM_SNAPSHOT_ENABLED else None
+    await prepare_simulation(pool, snapshot)
     start_time = datetime.now()
-    import time
-    next_cycle_target = time.perf_counter()
 
-    try:
-        for i, cycle in enumerate(cycles, start=1):
-            next_cycle_target += delay
-            success, skip, error = await insert_cycle(pool, cycle, i)
-            total_success += success
-            total_skip += skip
-            total_error += error
+    def report(cycle_idx, total_success, total_skip, total_error):
+        elapsed = (datetime.now() - start_time).total_seconds()
+        print(f"\r[INSERT] Cycle {cycle_idx} | ✓{total_success} ⊘{total_skip} ✗{total_error} | Temps: {elapsed:.0f}s ", end='', flush=True)
+        if snapshot is not None:
+            snapshot.advance(cycle_idx)
+            snapshot.save()
 
+    if SAMPLING_MODE == 'multirate':
+        def report_samples(samples, total_success, total_error, lag):
             elapsed = (datetime.now() - start_time).total_seconds()
-            print_progress_bar(i, len(cycles), total_success, total_skip, total_error, elapsed)
+            print(f"\r[INSERT] {samples} échantillons | ✓{total_success} ✗{total_error} | "
+                  f"Retard: {lag:.2f}s | Temps: {elapsed:.0f}s ", end='', flush=True)
+            if snapshot is not None:
+                snapshot.save(current=True)
 
-            if i < len(cycles):
-                sleep_time = next_cycle_target - time.perf_counter()
-                if sleep_time > 0:
-                    await asyncio.sleep(sleep_time)
-                else:
-                    if sleep_time < -0.5:
-                        print(f"\n[WARNING] Retard important : {abs(sleep_time):.2f}s (La base est trop lente)")
-        print()
+        drain_task = start_spool(pool)
+        refresher, refresh_task = start_reference_refresher(pool, deferred=True)
+        try:
+            await run_multirate_loop(pool, math.ceil(time.time()), report_samples, refresher=refresher)
+        except asyncio.CancelledError:
+            print("\n[INFO] Arrêt de la boucle infinie demandé.")
+        finally:
+            if refresh_task is not None:
+                refresh_task.cancel()
+            if snapshot is not None:
+                snapshot.save(force=True, current=True)
+            await stop_spool(drain_task)
+            await flush_rollups(pool, final=True)
+            await flush_alert_events(pool)
+            pool.close()
+            await pool.wait_closed()
+        return
+
+    # maxsize=2 correspond à l'énoncé : génère 2 en avance (dont 1 en attente dans la queue)
+    batch_queue = asyncio.Queue(maxsize=2)
+    # Lance le producteur en tâche de fond
+    refresher, refresh_task = start_reference_refresher(pool, deferred=True)
+    producer_task = asyncio.create_task(random_producer(batch_queue, REDEFINITION_INTERVAL, snapshot, refresher))
+    drain_task = start_spool(pool)
+
+    try:
+        await run_realtime_loop(pool, batch_queue, delay, time.time(), report)
+    except asyncio.CancelledError:
+        print("\n[INFO] Arrêt de la boucle infinie demandé.")
     finally:
+        producer_task.cancel()
+        if refresh_task is not None:
+            refresh_task.cancel()
+        if snapshot is not None:
+            snapshot.save(force=True)
+            print(f"[INFO] État du simulateur enregistré dans {snapshot.path}")
+        await stop_spool(drain_task)
+        await flush_rollups(pool, final=True)
+        await flush_alert_events(pool)
         pool.close()
         await pool.wait_closed()
 
-    end_time = datetime.now()
-    duration = (end_time - start_time).total_seconds()
 
+def shard_worker_main(shard_idx, patient_ids, reference, delay, clock_origin, counters, stop_event):
+    """
+    Point d'entrée d'un processus worker : reprend les données de référence découvertes
+    par le coordinateur, restreintes à sa tranche de patients, et exécute la boucle temps réel.
+    counters[3 * shard_idx : 3 * shard_idx + 3] reçoit ses totaux ✓/⊘/✗.
+    """
+    global VALID_PATIENT_IDS, VALID_PARAMETERS, VALID_USER_IDS, PARAMETER_RANGES
+    VALID_PATIENT_IDS = patient_ids
+    VALID_PARAMETERS, VALID_USER_IDS, PARAMETER_RANGES = reference
+    build_validation_indexes()
+    # Un état du simulateur par worker, comme le spool
+    snapshot = SimulationSnapshot(f"{SIM_SNAPSHOT_FILE}.shard-{shard_idx}") if SIM_SNAPSHOT_ENABLED else None
+
+    def report(cycle_idx, total_success, total_skip, total_error):
+        base = 3 * shard_idx
+        counters[base] = total_success
+        counters[base + 1] = total_skip
+        counters[base + 2] = total_error
+        if snapshot is not None and SAMPLING_MODE != 'multirate':
+            snapshot.advance(cycle_idx)
+            snapshot.save()
+
+    def report_samples(samples, total_success, total_error, lag):
+        report(samples, total_success, 0, total_error)
+        if snapshot is not None:
+            snapshot.save(current=True)
+
+    async def run():
+        pool = await create_pool()
+        await check_latest_table(pool, initialize=False)
+        await check_rollup_table(pool)
+        await check_alert_events_table(pool)
+        await prepare_simulation(pool, snapshot)
+        # Un spool par worker : chacun rejoue ses propres lignes
+        drain_task = start_spool(pool, os.path.join(SPOOL_DIR, f"shard-{shard_idx}"))
+        if SAMPLING_MODE == 'multirate':
+            try:
+                await run_multirate_loop(pool, clock_origin, report_samples, stop_event)
+            finally:
+                if snapshot is not None:
+                    snapshot.save(force=True, current=True)
+                await stop_spool(drain_task)
+                await flush_rollups(pool, final=True)
+                await flush_alert_events(pool)
+                pool.close()
+                await pool.wait_closed()
+            return
+
+        batch_queue = asyncio.Queue(maxsize=2)
+        producer_task = asyncio.create_task(random_producer(batch_queue, REDEFINITION_INTERVAL, snapshot))
+        try:
+            await run_realtime_loop(pool, batch_queue, delay, clock_origin, report, stop_event)
+        finally:
+            producer_task.cancel()
+            if snapshot is not None:
+                snapshot.save(force=True)
+            await stop_spool(drain_task)
+            await flush_rollups(pool, final=True)
+            await flush_alert_events(pool)
+            pool.close()
+            await pool.wait_closed()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+async def run_sharded(delay: float):
+    """
+    Coordinateur multi-processus : répartit VALID_PATIENT_IDS en SHARD_WORKERS tranches
+    disjointes, fixe une origine d'horloge commune (seconde pleine) pour aligner les cycles
+    de tous les workers et affiche les compteurs agrégés.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    workers = min(SHARD_WORKERS, len(VALID_PATIENT_IDS))
+    shards = [VALID_PATIENT_IDS[i::workers] for i in range(workers)]
+    reference = (VALID_PARAMETERS, VALID_USER_IDS, PARAMETER_RANGES)
+    counters = ctx.Array('q', 3 * workers, lock=False)
+    stop_event = ctx.Event()
+    clock_origin = math.ceil(time.time()) + SHARD_START_DELAY_SECONDS
+
+    processes = [
+        ctx.Process(target=shard_worker_main, name=f"shard-{i}",
+                    args=(i, shard, reference, delay, clock_origin, counters, stop_event))
+        for i, shard in enumerate(shards)
+    ]
+    for process in processes:
+        process.start()
+
+    print(f"[DEBUG] {workers} workers, {len(VALID_PATIENT_IDS)} patients "
+          f"({', '.join(str(len(shard)) for shard in shards)} par worker)")
+    print(f"[DEBUG] Premier cycle commun à {datetime.fromtimestamp(clock_origin).strftime(DATETIME_FORMAT)}")
+    print(f"[DEBUG] Délai entre cycles: {delay}s")
     print("-" * 60)
-    print(f"[RESULT] Cycles: {len(cycles)}")
-    print(f"[RESULT] Succès: {total_success}")
-    print(f"[RESULT] Ignorés: {total_skip}")
-    print(f"[RESULT] Erreurs: {total_error}")
-    print(f"[RESULT] Durée: {duration:.2f}s")
-    if duration > 0:
-        print(f"[RESULT] Vitesse: {total_success / duration:.1f} insert/s")
+
+    start_time = datetime.now()
+    reported = {RESULT_SUCCESS: 0, RESULT_SKIP: 0, RESULT_ERROR: 0}
+    try:
+        while any(process.is_alive() for process in processes):
+            await asyncio.sleep(delay)
+            total_success = sum(counters[0::3])
+            total_skip = sum(counters[1::3])
+            total_error = sum(counters[2::3])
+            # Les workers ne sont pas instrumentés : seuls leurs totaux remontent aux métriques
+            for status, total in ((RESULT_SUCCESS, total_success), (RESULT_SKIP, total_skip), (RESULT_ERROR, total_error)):
+                ROWS_TOTAL[status].inc(total - reported[status])
+                reported[status] = total
+            alive = sum(process.is_alive() for process in processes)
+            elapsed = (datetime.now() - start_time).total_seconds()
+            print(f"\r[INSERT] {alive}/{workers} workers | ✓{total_success} ⊘{total_skip} ✗{total_error} | Temps: {elapsed:.0f}s ", end='', flush=True)
+        print("\n[WARNING] Tous les workers se sont arrêtés")
+    except asyncio.CancelledError:
+        print("\n[INFO] Arrêt de la boucle infinie demandé.")
+    finally:
+        stop_event.set()
+        for process in processes:
+            process.join(timeout=2 * delay + 1)
+            if process.is_alive():
+                process.terminate()
 
 
-async def random_producer(batch_queue: asyncio.Queue, num_cycles=100):
-    """Génère les données de façon asynchrone pour ne jamais bloquer l'insertion."""
-    init_generation_states()
-    while True:
-        data = await asyncio.to_thread(generate_batch, num_cycles)
-        cycles = group_data_by_cycle(data)
-        await batch_queue.put(cycles)
+WAVEFORM_COLUMNS = ['id_patient', 'signal_id', 'chunk_start', 'sample_rate', 'sample_count', 'encoding', 'scale', 'payload']
 
+WAVEFORM_INSERT_QUERY = (
+    f"INSERT INTO {WAVEFORM_TABLE_NAME} ({', '.join(WAVEFORM_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(WAVEFORM_COLUMNS))})"
+)
 
-async def insert_infinite_async(delay: float = INSERT_DELAY_SECONDS):
-    """Boucle d'insertion infinie : génère et insère simultanément."""
+
+def build_waveform_rows(generators: dict, chunk_start: str) -> list:
+    """Génère le bloc suivant de chaque signal pour tous les patients, au format WAVEFORM_COLUMNS."""
+    rows = []
+    for signal_id, generator in generators.items():
+        scale = waveform.SIGNAL_SCALES[signal_id]
+        chunk = generator.next_chunk(WAVEFORM_CHUNK_SECONDS)
+        for patient_id, samples in zip(VALID_PATIENT_IDS, chunk):
+            rows.append((patient_id, signal_id, chunk_start, generator.sample_rate, samples.size,
+                         WAVEFORM_ENCODING, scale, waveform.encode_chunk(samples, WAVEFORM_ENCODING, scale)))
+    return rows
+
+
+async def insert_waveforms_async():
+    """
+    Génération continue des courbes : toutes les WAVEFORM_CHUNK_SECONDS, un bloc par signal
+    et par patient, encodé (WAVEFORM_ENCODING) et inséré en une requête multi-lignes.
+    Les blocs sont horodatés à leur créneau (milliseconde), comme les cycles temps réel.
+    """
     pool = await create_pool()
     await discover_valid_data(pool)
 
-    if not VALID_PATIENT_IDS or not VALID_PARAMETERS:
-        print("[ERROR] Données BDD non découvertes")
+    try:
+        if not VALID_PATIENT_IDS:
+            print("[ERROR] Données BDD non découvertes")
+            return
+        if not await table_exists(pool, WAVEFORM_TABLE_NAME):
+            print(f"[ERROR] Table {WAVEFORM_TABLE_NAME} absente")
+            return
+
+        generators = {
+            signal_id: waveform.WaveformGenerator(signal_id, rate, len(VALID_PATIENT_IDS))
+            for signal_id, rate in WAVEFORM_SIGNALS.items()
+        }
+        samples_per_chunk = sum(WAVEFORM_SIGNALS.values()) * WAVEFORM_CHUNK_SECONDS * len(VALID_PATIENT_IDS)
+
+        print(f"[DEBUG] Courbes: {', '.join(f'{s} {r} Hz' for s, r in WAVEFORM_SIGNALS.items())} | "
+              f"blocs de {WAVEFORM_CHUNK_SECONDS}s en {WAVEFORM_ENCODING}")
+        print("-" * 60)
+
+        clock_origin = math.ceil(time.time())
+        chunk_idx = 0
+        total_chunks = 0
+        total_bytes = 0
+        total_error = 0
+        start_time = datetime.now()
+
+        while True:
+            scheduled = clock_origin + chunk_idx * WAVEFORM_CHUNK_SECONDS
+            sleep_time = scheduled - time.time()
+            if sleep_time > 0:
+                await asyncio.sleep(sleep_time)
+
+            with STAGE_SECONDS['generate'].time():
+                rows = await asyncio.to_thread(build_waveform_rows, generators, format_timestamp_ms(int(scheduled * 1000)))
+            chunk_idx += 1
+
+            try:
+                async with pool.acquire() as conn:
+                    async with conn.cursor() as cur:
+                        with SQL_SECONDS.time():
+                            await cur.executemany(WAVEFORM_INSERT_QUERY, rows)
+                total_chunks += len(rows)
+                total_bytes += sum(len(row[-1]) for row in rows)
+            except Exception as e:
+                total_error += len(rows)
+                print(f"\n[ERROR] Insertion des blocs impossible: {e}")
+
+            elapsed = (datetime.now() - start_time).total_seconds()
+            lag = max(0.0, time.time() - scheduled)
+            bytes_per_sample = total_bytes / (samples_per_chunk * chunk_idx)
+            print(f"\r[WAVEFORM] Bloc {chunk_idx} | ✓{total_chunks} ✗{total_error} | "
+                  f"{bytes_per_sample:.2f} octets/échantillon | Retard: {lag:.2f}s | Temps: {elapsed:.0f}s ",
+                  end='', flush=True)
+    except asyncio.CancelledError:
+        print("\n[INFO] Arrêt de la génération des courbes demandé.")
+    finally:
         pool.close()
         await pool.wait_closed()
+
+
+async def read_waveform(pool, id_patient: int, signal_id: str, start, end):
+    """
+    Lit la courbe d'un patient sur l'intervalle [start, end) (datetime ou chaîne) et retourne
+    (horodatage du premier échantillon, fréquence, tableau float32).
+    Chaque bloc est décodé par numpy.frombuffer sur son payload, puis les blocs sont
+    concaténés et rognés aux bornes demandées.
+    """
+    if isinstance(start, str):
+        start = datetime.fromisoformat(start)
+    if isinstance(end, str):
+        end = datetime.fromisoformat(end)
+
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            # Un bloc commencé avant `start` peut le couvrir : marge d'une durée de bloc
+            await cur.execute(
+                f"SELECT chunk_start, sample_rate, sample_count, encoding, scale, payload "
+                f"FROM {WAVEFORM_TABLE_NAME} "
+                "WHERE id_patient = %s AND signal_id = %s AND chunk_start > %s AND chunk_start < %s "
+                "ORDER BY chunk_start",
+                (id_patient, signal_id, start - timedelta(seconds=WAVEFORM_CHUNK_SECONDS), end),
+            )
+            chunks = await cur.fetchall()
+
+    if not chunks:
+        return start, 0, np.empty(0, dtype=np.float32)
+
+    first_start, sample_rate = chunks[0][0], chunks[0][1]
+    values = np.concatenate([
+        waveform.decode_chunk(payload, encoding, scale)
+        for _, _, _, encoding, scale, payload in chunks
+    ])
+
+    # Rognage : les blocs sont contigus, l'indice se déduit du temps écoulé depuis le premier
+    skip = max(0, int(round((start - first_start).total_seconds() * sample_rate)))
+    keep = max(0, int(round((end - first_start).total_seconds() * sample_rate)))
+    return first_start + timedelta(seconds=skip / sample_rate), sample_rate, values[skip:keep]
+
+
+async def replay_database():
+    """
+    Mode 'replay_db' : rejoue les lignes de REPLAY_SOURCE_TABLE (base source REPLAY_SOURCE_CONFIG)
+    dans l'ordre des horodatages, lues par pages de REPLAY_FETCH_ROWS lignes (pagination par clé sur
+    timestamp, id_patient, parameter_id) : aucune lecture ne reste ouverte pendant les attentes.
+    Une ligne d'horodatage source t part à l'instant début + (t - t0) / REPLAY_SPEED de
+    l'horloge de rejeu et est horodatée à cet instant (horodatage source conservé avec
+    REPLAY_KEEP_TIMESTAMPS ou REPLAY_SPEED = 0, aussi vite que possible). Les lignes sont
+    validées contre la référence de la cible et écrites par insert_rows dans REPLAY_TARGET_TABLE.
+    """
+    target_table = REPLAY_TARGET_TABLE or DB_TABLE_NAME
+    source_config = {key: REPLAY_SOURCE_CONFIG[key] or DB_CONFIG[key] for key in DB_CONFIG}
+    if source_config == DB_CONFIG and REPLAY_SOURCE_TABLE == target_table and REPLAY_KEEP_TIMESTAMPS:
+        print("[ERROR] Source et cible identiques avec les horodatages d'origine : rien à rejouer")
         return
 
-    # maxsize=2 correspond à l'énoncé : génère 2 en avance (dont 1 en attente dans la queue)
-    batch_queue = asyncio.Queue(maxsize=2)
-    # Lance le producteur en tâche de fond
-    producer_task = asyncio.create_task(random_producer(batch_queue, REDEFINITION_INTERVAL))
+    pool = await create_pool()
+    await discover_valid_data(pool)
+    # Dernières valeurs, agrégats et alertes décrivent DB_TABLE_NAME : non maintenus pour une autre table
+    target_query, derived = None, True
+    if target_table != DB_TABLE_NAME:
+        if not await table_exists(pool, target_table):
+            print(f"[ERROR] Table cible {target_table} absente")
+            pool.close()
+            await pool.wait_closed()
+            return
+        target_query, derived = INSERT_QUERY.replace(DB_TABLE_NAME, target_table, 1), False
 
-    print(f"[DEBUG] Démarrage de la génération et insertion infinie en parallèle.")
-    print(f"[DEBUG] Délai entre cycles: {delay}s")
+    conditions, params = [], []
+    if REPLAY_FROM is not None:
+        conditions.append("timestamp >= %s")
+        params.append(REPLAY_FROM)
+    if REPLAY_TO is not None:
+        conditions.append("timestamp < %s")
+        params.append(REPLAY_TO)
+    select = f"SELECT {', '.join(DB_COLUMNS)} FROM {REPLAY_SOURCE_TABLE} "
+    order = f"ORDER BY timestamp, id_patient, parameter_id LIMIT {max(1, REPLAY_FETCH_ROWS)}"
+    first_page_query = select + (f"WHERE {' AND '.join(conditions)} " if conditions else "") + order
+    # Pages suivantes : après la dernière clé lue (unique), le filtre sur timestamp seul borne le parcours d'index
+    next_conditions = conditions + ["timestamp >= %s", "(timestamp, id_patient, parameter_id) > (%s, %s, %s)"]
+    next_page_query = select + f"WHERE {' AND '.join(next_conditions)} " + order
+
+    speed = REPLAY_SPEED
+    retime = speed > 0 and not REPLAY_KEEP_TIMESTAMPS
+    window = REPLAY_FLUSH_INTERVAL_MS / 1000
+
+    print(f"[DEBUG] Rejeu {source_config['host']} / {source_config['db']}.{REPLAY_SOURCE_TABLE} "
+          f"-> {DB_CONFIG['db']}.{target_table} | vitesse: {f'{speed:g}x' if speed > 0 else 'maximale'}")
     print("-" * 60)
 
-    total_success = 0
-    total_skip = 0
-    total_error = 0
-    start_time = datetime.now()
-    import time
-    next_cycle_target = time.perf_counter()
-    global_cycle_idx = 0
+    drain_task = start_spool(pool)
+    source = await aiomysql.connect(
+        host=source_config['host'], user=source_config['user'], password=source_config['password'],
+        db=source_config['db'], autocommit=True, connect_timeout=DB_CONNECT_TIMEOUT_SECONDS,
+    )
+    totals = {'read': 0, 'success': 0, 'skip': 0, 'error': 0}
+    inflight = set()
+    pending = []
+    lag = 0.0
+    source_clock = None
+    start = time.perf_counter()
+
+    async def send(rows):
+        success, duplicates, error = await insert_rows(pool, rows, target_query, derived)
+        if live_feed is not None:
+            live_feed.flush()
+        if rollups.completed:
+            await flush_rollups(pool)
+        if alerts.transitions:
+            await flush_alert_events(pool)
+        totals['success'] += success
+        totals['skip'] += duplicates
+        totals['error'] += error
+        ROWS_TOTAL[RESULT_SUCCESS].inc(success)
+        ROWS_TOTAL[RESULT_SKIP].inc(duplicates)
+        ROWS_TOTAL[RESULT_ERROR].inc(error)
+
+    async def flush():
+        nonlocal pending
+        if not pending:
+            return
+        while len(inflight) >= REPLAY_MAX_INFLIGHT:
+            await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+        task = asyncio.create_task(send(pending))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+        pending = []
+
+    def report():
+        elapsed = time.perf_counter() - start
+        print(f"\r[REPLAY] {totals['read']} lignes lues | ✓{totals['success']} ⊘{totals['skip']} ✗{totals['error']} | "
+              f"Source: {source_clock} | Retard: {lag:.2f}s | {totals['success'] / elapsed if elapsed > 0 else 0:.0f} lignes/s ",
+              end='', flush=True)
 
     try:
+        origin = first_source = None
+        last_report = 0.0
+        last_key = None
         while True:
-            cycles = await batch_queue.get()
+            # Page lue entièrement (curseur tamponné) : rien ne reste ouvert sur la source pendant le rythme
+            await source.ping(reconnect=True)
+            async with source.cursor() as reader:
+                if last_key is None:
+                    await reader.execute(first_page_query, params)
+                else:
+                    await reader.execute(next_page_query, [*params, last_key[0], *last_key])
+                block = await reader.fetchall()
+            if not block:
+                break
+            last_key = (block[-1][3], block[-1][0], block[-1][1])
+            totals['read'] += len(block)
+            valid, rejected = validate_rows(block)
+            totals['skip'] += rejected
+
+            for row in valid:
+                source_ts = row[3]
+                if origin is None:
+                    origin, first_source = time.time(), source_ts
+                offset = (source_ts - first_source).total_seconds() / speed if speed > 0 else 0.0
+                due = origin + offset
+                if speed > 0:
+                    now = time.time()
+                    if due > now + window:
+                        # Prochaine ligne hors de la fenêtre : envoi de la fenêtre puis attente
+                        await flush()
+                        await asyncio.sleep(due - now)
+                        now = time.time()
+                    lag = max(0.0, now - due)
+                    CYCLE_LAG.set(lag)
+                # Valeur et horodatage au format des lignes générées (spool JSON, flux temps réel)
+                timestamp = (format_timestamp_ms(int(due * 1000)) if retime
+                             else source_ts.strftime(DATETIME_MS_FORMAT)[:-3])
+                pending.append((row[0], row[1], float(row[2]), timestamp, *row[4:]))
+                source_clock = source_ts
+                if len(pending) >= REPLAY_BATCH_ROWS:
+                    await flush()
 
-            for cycle in cycles:
-                global_cycle_idx += 1
-                next_cycle_target += delay
+            if speed <= 0:
+                await flush()
+            if time.perf_counter() - last_report >= 0.5:
+                report()
+                last_report = time.perf_counter()
+        await flush()
+        if inflight:
+            await asyncio.gather(*inflight, return_exceptions=True)
+        report()
+        print()
+    except asyncio.CancelledError:
+        print("\n[INFO] Arrêt du rejeu demandé.")
+    finally:
+        for task in inflight:
+            task.cancel()
+        source.close()
+        await stop_spool(drain_task)
+        await flush_rollups(pool, final=True)
+        await flush_alert_events(pool)
+        pool.close()
+        await pool.wait_closed()
+
+    duration = time.perf_counter() - start
+    print("-" * 60)
+    print(f"[RESULT] Lignes lues: {totals['read']}")
+    print(f"[RESULT] Succès: {totals['success']}")
+    print(f"[RESULT] Ignorés: {totals['skip']} ({format_skip_reasons()})")
+    print(f"[RESULT] Erreurs: {totals['error']} (refusées par la base: {format_error_reasons()})")
+    print(f"[RESULT] Retard final sur l'horloge de rejeu: {lag:.2f}s")
+    print(f"[RESULT] Durée: {duration:.2f}s")
+    if duration > 0:
+        print(f"[RESULT] Vitesse: {totals['success'] / duration:.1f} lignes/s")
+
+
+PARTITIONS_QUERY = (
+    "SELECT partition_name, partition_description FROM information_schema.partitions "
+    "WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL "
+    "ORDER BY partition_ordinal_position"
+)
+
+# Copie d'un paquet vers l'archive ; une ligne déjà archivée (passe interrompue) est remplacée
+ARCHIVE_COPY_QUERY = (
+    f"INSERT INTO {ARCHIVE_TABLE_NAME} ({', '.join(DB_COLUMNS)}) "
+    f"SELECT {', '.join(DB_COLUMNS)} FROM {DB_TABLE_NAME} WHERE "
+)
+ARCHIVE_COPY_SUFFIX = " ON DUPLICATE KEY UPDATE " + ", ".join(
+    f"{column} = VALUES({column})" for column in DB_COLUMNS if column not in ('id_patient', 'parameter_id', 'timestamp')
+)
 
-                success, skip, error = await insert_cycle(pool, cycle, global_cycle_idx)
-                total_success += success
-                total_skip += skip
-                total_error += error
+def partition_floor(moment: datetime) -> datetime:
+    """Début de la tranche de PARTITION_DAYS jours (comptés depuis 1970) contenant `moment`."""
+    days = (moment - _EPOCH).days
+    return _EPOCH + timedelta(days=days - days % PARTITION_DAYS)
+
+
+async def manage_partitions(pool, table: str, retention_days) -> tuple:
+    """
+    Partitions par tranches de temps d'une table partitionnée par RANGE COLUMNS(timestamp)
+    (une partition `p<AAAAMMJJ>` par borne supérieure, plus `p_future` jusqu'à MAXVALUE) :
+    crée les partitions jusqu'à PARTITIONS_AHEAD tranches à l'avance en scindant `p_future`
+    si elle est vide (sinon la scission copierait ses lignes sous verrou : signalée et reportée)
+    et supprime celles entièrement plus anciennes que `retention_days`
+    (None : conservées). Retourne (partitions créées, partitions supprimées) ; (0, 0) si la
+    table n'est pas partitionnée.
+    """
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(PARTITIONS_QUERY, (table,))
+            partitions = await cur.fetchall()
+            if not partitions:
+                return 0, 0
 
-                elapsed = (datetime.now() - start_time).total_seconds()
-                print(f"\r[INSERT] Cycle {global_cycle_idx} | ✓{total_success} ⊘{total_skip} ✗{total_error} | Temps: {elapsed:.0f}s ", end='', flush=True)
+            bounds = {
+                name: datetime.fromisoformat(description.strip("'"))
+                for name, description in partitions if description != 'MAXVALUE'
+            }
+            period = timedelta(days=PARTITION_DAYS)
+            now = datetime.now()
 
-                sleep_time = next_cycle_target - time.perf_counter()
-                if sleep_time > 0:
-                    await asyncio.sleep(sleep_time)
+            created = []
+            if not any(name == 'p_future' for name, _ in partitions):
+                print(f"[WARNING] {table} sans partition p_future : partitions futures non créées")
+            else:
+                # Lecture exacte : information_schema.partitions.table_rows n'est qu'une estimation sous InnoDB
+                await cur.execute(f"SELECT MIN(timestamp), MAX(timestamp) FROM {table} PARTITION (p_future)")
+                future_first, future_last = await cur.fetchone()
+                if future_first is not None:
+                    print(f"[WARNING] {table}: p_future non vide (mesures du {future_first} au {future_last}), "
+                          f"partitions futures non créées. Lancer la maintenance plus souvent ou augmenter "
+                          f"PARTITIONS_AHEAD, puis scinder p_future hors ingestion (REORGANIZE PARTITION copie ses lignes)")
                 else:
-                    if sleep_time < -0.5:
-                        print(f"\n[WARNING] Retard important : {abs(sleep_time):.2f}s (La base est trop lente)")
+                    # Première borne : la partition initiale reçoit tout ce qui précède la date d'archivage
+                    bound = max(bounds.values()) + period if bounds else partition_floor(now - timedelta(days=ARCHIVE_AFTER_DAYS))
+                    horizon = partition_floor(now) + PARTITIONS_AHEAD * period
+                    while bound <= horizon:
+                        created.append(bound)
+                        bound += period
+
+            if created:
+                definitions = ", ".join(
+                    f"PARTITION p{bound:%Y%m%d} VALUES LESS THAN ('{bound:{DATETIME_FORMAT}}')" for bound in created
+                )
+                await cur.execute(
+                    f"ALTER TABLE {table} REORGANIZE PARTITION p_future INTO "
+                    f"({definitions}, PARTITION p_future VALUES LESS THAN (MAXVALUE))"
+                )
+
+            dropped = []
+            if retention_days is not None:
+                limit = now - timedelta(days=retention_days)
+                dropped = [name for name, bound in bounds.items() if bound <= limit]
+                if dropped:
+                    await cur.execute(f"ALTER TABLE {table} DROP PARTITION {', '.join(dropped)}")
+
+    if created or dropped:
+        print(f"[INFO] {table}: {len(created)} partitions créées, {len(dropped)} supprimées"
+              + (f" ({', '.join(dropped)})" if dropped else ""))
+    return len(created), len(dropped)
+
+
+async def server_lock_wait_ms(cur) -> int:
+    """Temps cumulé d'attente de verrous de ligne InnoDB du serveur (ms, toutes sessions)."""
+    await cur.execute("SHOW GLOBAL STATUS LIKE 'Innodb_row_lock_time'")
+    row = await cur.fetchone()
+    return int(row[1]) if row else 0
+
+
+async def archive_old_rows(pool, cutoff: datetime, totals: dict):
+    """
+    Déplace vers ARCHIVE_TABLE_NAME ('archive') ou supprime ('purge') les lignes de
+    DB_TABLE_NAME antérieures à `cutoff`, série (patient, paramètre) par série, en paquets
+    bornés sur la clé primaire : chaque paquet est une courte transaction dont les verrous
+    portent sur des horodatages anciens, loin des insertions temps réel.
+    La taille des paquets suit MAINTENANCE_TARGET_CHUNK_SECONDS ; après chaque paquet, une
+    pause limite la part du temps passée en transaction à MAINTENANCE_DUTY_CYCLE. Un paquet
+    qui attend un verrou plus de MAINTENANCE_LOCK_WAIT_TIMEOUT_SECONDS est annulé et réessayé
+    plus petit.
+    """
+    chunk_rows = MAINTENANCE_CHUNK_ROWS
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SET SESSION innodb_lock_wait_timeout = %s", (MAINTENANCE_LOCK_WAIT_TIMEOUT_SECONDS,))
+            # Parcours des préfixes de la clé primaire (lecture d'index, sans la table)
+            await cur.execute(f"SELECT DISTINCT id_patient, parameter_id FROM {DB_TABLE_NAME}")
+            series = await cur.fetchall()
+
+            start = time.perf_counter()
+            for series_idx, (id_patient, parameter_id) in enumerate(series, 1):
+                while True:
+                    # Borne haute du paquet : le chunk_rows-ième horodatage ancien de la série
+                    await cur.execute(
+                        f"SELECT timestamp FROM {DB_TABLE_NAME} "
+                        "WHERE id_patient = %s AND parameter_id = %s AND timestamp < %s "
+                        "ORDER BY timestamp LIMIT 1 OFFSET %s",
+                        (id_patient, parameter_id, cutoff, chunk_rows - 1),
+                    )
+                    row = await cur.fetchone()
+                    condition = "id_patient = %s AND parameter_id = %s AND timestamp " + ("<= %s" if row else "< %s")
+                    params = (id_patient, parameter_id, row[0] if row else cutoff)
+
+                    chunk_start = time.perf_counter()
+                    try:
+                        await conn.begin()
+                        if MAINTENANCE_ACTION == 'archive':
+                            await cur.execute(ARCHIVE_COPY_QUERY + condition + ARCHIVE_COPY_SUFFIX, params)
+                        moved = await cur.execute(f"DELETE FROM {DB_TABLE_NAME} WHERE {condition}", params)
+                        await conn.commit()
+                    except aiomysql.MySQLError as e:
+                        await conn.rollback()
+                        if not is_lock_error(e):
+                            raise
+                        totals['lock_timeouts'] += 1
+                        totals['lock_timeout_seconds'] += time.perf_counter() - chunk_start
+                        chunk_rows = max(MAINTENANCE_MIN_CHUNK_ROWS, chunk_rows // 2)
+                        await asyncio.sleep(MAINTENANCE_LOCK_WAIT_TIMEOUT_SECONDS)
+                        continue
+                    duration = time.perf_counter() - chunk_start
+                    totals['rows'] += moved
+                    totals['chunks'] += 1
+                    totals['transaction_seconds'] += duration
+
+                    if duration > MAINTENANCE_TARGET_CHUNK_SECONDS:
+                        chunk_rows = max(MAINTENANCE_MIN_CHUNK_ROWS, chunk_rows // 2)
+                    elif duration < MAINTENANCE_TARGET_CHUNK_SECONDS / 2 and row:
+                        chunk_rows = min(MAINTENANCE_MAX_CHUNK_ROWS, chunk_rows * 2)
+
+                    elapsed = time.perf_counter() - start
+                    print(f"\r[MAINTENANCE] Série {series_idx}/{len(series)} | {totals['rows']} lignes | "
+                          f"{totals['rows'] / elapsed if elapsed > 0 else 0:.0f} lignes/s | paquet {chunk_rows} | "
+                          f"timeouts verrou {totals['lock_timeouts']} ", end='', flush=True)
+
+                    await asyncio.sleep(duration * (1 - MAINTENANCE_DUTY_CYCLE) / MAINTENANCE_DUTY_CYCLE)
+                    if not row:
+                        break
+    print()
+
+
+async def maintain_history():
+    """
+    Mode 'maintain' : tâche de maintenance de l'historique, à lancer à côté de l'insertion.
+    À chaque passe (toutes les MAINTENANCE_INTERVAL_SECONDS) : partitions de ARCHIVE_TABLE_NAME
+    (et de DB_TABLE_NAME si elle est partitionnée) créées à l'avance et expirées, puis
+    archivage ou purge par paquets des mesures plus anciennes que ARCHIVE_AFTER_DAYS.
+    Rapporte le débit (lignes/s) et l'attente de verrous.
+    """
+    if MAINTENANCE_ACTION not in ('archive', 'purge'):
+        print(f"[ERROR] MAINTENANCE_ACTION inconnue: {MAINTENANCE_ACTION} (attendu: archive, purge)")
+        return
+
+    pool = await create_pool()
+    try:
+        if MAINTENANCE_ACTION == 'archive' and not await table_exists(pool, ARCHIVE_TABLE_NAME):
+            print(f"[ERROR] Table {ARCHIVE_TABLE_NAME} absente")
+            return
+
+        target = ARCHIVE_TABLE_NAME if MAINTENANCE_ACTION == 'archive' else 'suppression'
+        print(f"[DEBUG] Maintenance de {DB_TABLE_NAME}: mesures de plus de {ARCHIVE_AFTER_DAYS} jours -> {target} | "
+              f"paquets de {MAINTENANCE_CHUNK_ROWS} lignes (cible {MAINTENANCE_TARGET_CHUNK_SECONDS}s), "
+              f"{MAINTENANCE_DUTY_CYCLE:.0%} du temps en transaction")
+        print("-" * 60)
+
+        while True:
+            pass_start = time.perf_counter()
+            if MAINTENANCE_ACTION == 'archive':
+                await manage_partitions(pool, ARCHIVE_TABLE_NAME, ARCHIVE_RETENTION_DAYS)
+            # Historique partitionné : en purge, les partitions expirées sont supprimées d'un bloc
+            await manage_partitions(pool, DB_TABLE_NAME, ARCHIVE_AFTER_DAYS if MAINTENANCE_ACTION == 'purge' else None)
+
+            totals = {'rows': 0, 'chunks': 0, 'transaction_seconds': 0.0, 'lock_timeouts': 0, 'lock_timeout_seconds': 0.0}
+            try:
+                async with pool.acquire() as conn:
+                    async with conn.cursor() as cur:
+                        lock_wait_before = await server_lock_wait_ms(cur)
+                await archive_old_rows(pool, datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS), totals)
+                async with pool.acquire() as conn:
+                    async with conn.cursor() as cur:
+                        lock_wait_ms = await server_lock_wait_ms(cur) - lock_wait_before
+            except Exception as e:
+                # Base indisponible ou erreur SQL : passe interrompue, reprise à la suivante
+                print(f"\n[ERROR] Passe de maintenance interrompue: {e}")
+                lock_wait_ms = '-'
+
+            duration = time.perf_counter() - pass_start
+            print(f"[RESULT] Lignes {'archivées' if MAINTENANCE_ACTION == 'archive' else 'purgées'}: {totals['rows']} "
+                  f"en {totals['chunks']} paquets")
+            if duration > 0:
+                print(f"[RESULT] Débit: {totals['rows'] / duration:.1f} lignes/s "
+                      f"({totals['transaction_seconds'] / duration:.0%} du temps en transaction)")
+            print(f"[RESULT] Verrous: {totals['lock_timeouts']} paquets annulés après attente "
+                  f"({totals['lock_timeout_seconds']:.2f}s) | attente de verrous du serveur pendant la passe: {lock_wait_ms} ms")
+
+            if not MAINTENANCE_INTERVAL_SECONDS:
+                break
+            await asyncio.sleep(MAINTENANCE_INTERVAL_SECONDS)
     except asyncio.CancelledError:
-        print("\n[INFO] Arrêt de la boucle infinie demandé.")
+        print("\n[INFO] Arrêt de la maintenance demandé.")
     finally:
-        producer_task.cancel()
         pool.close()
         await pool.wait_closed()
 
 
+def load_reference_from_sql(path: str) -> tuple:
+    """
+    Paramètres et seuils lus dans l'INSERT de parameter_reference d'un script SQL (export sans base).
+    Retourne (paramètres, seuils) au format VALID_PARAMETERS / PARAMETER_RANGES.
+    """
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    statement = re.search(r"INSERT INTO `parameter_reference`\s*\(([^)]*)\)\s*VALUES(.*?);\s*\n", text, re.S)
+    if statement is None:
+        raise ValueError(f"aucun INSERT INTO `parameter_reference` dans {path}")
+
+    # Les six dernières colonnes sont les seuils ; les chaînes (description...) sont sautées en bloc
+    columns = [c.strip(' `\r\n') for c in statement.group(1).split(',')]
+    keys = {'display_min': 'dm', 'display_max': 'dmx', 'normal_min': 'nm',
+            'normal_max': 'nmx', 'critical_min': 'cm', 'critical_max': 'cmx'}
+    if columns[0] != 'parameter_id' or set(columns[-6:]) != set(keys):
+        raise ValueError(f"colonnes de parameter_reference inattendues dans {path}: {columns}")
+    number = r"\s*(NULL|-?\d+(?:\.\d+)?)\s*"
+    row_pattern = re.compile(r"\(\s*'((?:[^']|'')+)'(?:'(?:[^']|'')*'|[^'()])*?," + ",".join([number] * 6) + r"\)")
+
+    parameters, ranges = [], {}
+    for parameter_id, *values in row_pattern.findall(statement.group(2)):
+        bounds = {keys[column]: None if value == 'NULL' else float(value) for column, value in zip(columns[-6:], values)}
+        bounds['dm'] = 0.0 if bounds['dm'] is None else bounds['dm']
+        bounds['dmx'] = 100.0 if bounds['dmx'] is None else bounds['dmx']
+        parameters.append(parameter_id)
+        ranges[parameter_id] = bounds
+    return parameters, ranges
+
+
+class ExportWriter:
+    """
+    Écriture d'une tranche de l'export dans EXPORT_FORMAT, par paquets de colonnes
+    (id_patient, parameter_id, value, timestamp, alert_flag, created_by, archived).
+    `parameter_id` arrive en codes (indices dans `parameters`), `timestamp` en secondes epoch.
+    """
+
+    def __init__(self, fmt: str, path: str, parameters: list):
+        self.fmt = fmt
+        self.path = path
+        self.parameters = parameters
+        self.parts = 0
+        self.parquet = None
+        self.csv_file = None
+        if fmt == 'binary':
+            os.makedirs(path, exist_ok=True)
+        elif fmt == 'csv':
+            self.csv_file = open(path, 'w', newline='', encoding='utf-8')
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(DB_COLUMNS)
+
+    def write(self, columns: dict):
+        if self.fmt == 'parquet':
+            table = pa.table({
+                'id_patient': columns['id_patient'],
+                'parameter_id': pa.DictionaryArray.from_arrays(columns['parameter_id'], pa.array(self.parameters)),
+                'value': columns['value'],
+                'timestamp': pa.array(columns['timestamp'], pa.timestamp('s')),
+                'alert_flag': columns['alert_flag'],
+                'created_by': columns['created_by'],
+                'archived': columns['archived'],
+            })
+            if self.parquet is None:
+                self.parquet = pq.ParquetWriter(self.path, table.schema, compression='zstd')
+            self.parquet.write_table(table)
+        elif self.fmt == 'binary':
+            np.savez(os.path.join(self.path, f"part-{self.parts:05d}.npz"),
+                     parameters=np.array(self.parameters), **columns)
+        else:
+            # Horodatages formatés une fois par cycle (valeurs consécutives identiques)
+            stamps, first = np.unique(columns['timestamp'], return_index=True)
+            formatted = np.repeat(
+                [datetime.fromtimestamp(t).strftime(DATETIME_FORMAT) for t in stamps.tolist()],
+                np.diff(np.append(first, len(columns['timestamp']))))
+            names = np.array(self.parameters, dtype=object)[columns['parameter_id']]
+            self.csv_writer.writerows(zip(
+                columns['id_patient'].tolist(), names.tolist(), columns['value'].tolist(), formatted.tolist(),
+                columns['alert_flag'].tolist(), columns['created_by'].tolist(), columns['archived'].tolist()))
+        self.parts += 1
+
+    def close(self) -> int:
+        """Ferme la tranche et retourne sa taille en octets."""
+        if self.parquet is not None:
+            self.parquet.close()
+        if self.csv_file is not None:
+            self.csv_file.close()
+        if os.path.isdir(self.path):
+            return sum(entry.stat().st_size for entry in os.scandir(self.path))
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+
+def export_shard(shard_idx: int, patient_ids: list, reference: tuple, plan: dict) -> tuple:
+    """
+    Point d'entrée d'un processus d'export : simule sa tranche de patients sur `plan['cycles']`
+    cycles, par épisodes de REDEFINITION_INTERVAL cycles, et écrit un paquet dès
+    `plan['chunk_rows']` lignes accumulées. Retourne (lignes, octets écrits, durée).
+    """
+    global VALID_PATIENT_IDS, VALID_PARAMETERS, VALID_USER_IDS, PARAMETER_RANGES
+    VALID_PATIENT_IDS = patient_ids
+    VALID_PARAMETERS, VALID_USER_IDS, PARAMETER_RANGES = reference
+    build_validation_indexes()
+    init_vector_states()
+    seed = plan['seed']
+    vector_states['rng'] = np.random.default_rng(None if seed is None else [seed, shard_idx])
+
+    start = time.perf_counter()
+    fmt = plan['format']
+    extension = {'parquet': '.parquet', 'binary': '', 'csv': '.csv'}[fmt]
+    writer = ExportWriter(fmt, os.path.join(plan['directory'], f"shard-{shard_idx}{extension}"), VALID_PARAMETERS)
+
+    n_patients, n_params = len(patient_ids), len(VALID_PARAMETERS)
+    series = n_patients * n_params
+    total_cycles, origin, period = plan['cycles'], plan['origin'], plan['period']
+    created_by = VALID_USER_IDS[0] if VALID_USER_IDS else 1
+    patient_column = np.repeat(np.array(patient_ids, dtype=np.int32), n_params)
+    param_column = np.tile(np.arange(n_params, dtype=np.int16), n_patients)
+
+    done = 0
+    rows = 0
+    while done < total_cycles:
+        # Paquet : épisodes entiers jusqu'à EXPORT_CHUNK_ROWS lignes
+        blocks = []
+        first_cycle = done
+        while done < total_cycles and (not blocks or (done - first_cycle) * series < plan['chunk_rows']):
+            count = min(REDEFINITION_INTERVAL, total_cycles - done)
+            blocks.append(generate_episode_arrays(count))
+            done += count
+        cycles = done - first_cycle
+        values = np.concatenate([b[0] for b in blocks]).ravel()
+        alerts = np.concatenate([b[1] for b in blocks]).ravel()
+        timestamps = origin + (first_cycle + np.arange(cycles, dtype=np.int64)) * period
+        writer.write({
+            'id_patient': np.tile(patient_column, cycles),
+            'parameter_id': np.tile(param_column, cycles),
+            'value': values,
+            'timestamp': np.repeat(timestamps, series),
+            'alert_flag': alerts.astype(np.int8),
+            'created_by': np.full(values.size, created_by, dtype=np.int32),
+            'archived': np.zeros(values.size, dtype=np.int8),
+        })
+        rows += values.size
+
+    return rows, writer.close(), time.perf_counter() - start
+
+
+async def export_dataset():
+    """
+    Mode 'export' : génère hors ligne EXPORT_DURATION_SECONDS de données à partir de EXPORT_START,
+    une mesure par série toutes les EXPORT_PERIOD_SECONDS, en EXPORT_WORKERS processus (une
+    tranche de patients chacun), sans rythme ni insertion. La base, si elle est configurée,
+    ne sert qu'à lire les données de référence ; sinon les seuils viennent de EXPORT_REFERENCE_SQL.
+    """
+    global VALID_PATIENT_IDS, VALID_PARAMETERS, VALID_USER_IDS, PARAMETER_RANGES
+    if all(DB_CONFIG.values()):
+        pool = await create_pool()
+        try:
+            await discover_valid_data(pool)
+        finally:
+            pool.close()
+            await pool.wait_closed()
+    else:
+        VALID_PARAMETERS, PARAMETER_RANGES = load_reference_from_sql(EXPORT_REFERENCE_SQL)
+        VALID_USER_IDS = [1]
+        print(f"[INFO] Base non configurée : {len(VALID_PARAMETERS)} paramètres lus dans {EXPORT_REFERENCE_SQL}")
+    if EXPORT_PATIENTS is not None:
+        VALID_PATIENT_IDS = list(range(1, EXPORT_PATIENTS + 1))
+
+    if not VALID_PATIENT_IDS or not VALID_PARAMETERS:
+        print("[ERROR] Aucun patient ou paramètre à générer")
+        return
+
+    fmt = EXPORT_FORMAT
+    if fmt == 'parquet' and pa is None:
+        print("[WARNING] pyarrow absent (pip install pyarrow) : export au format 'binary'")
+        fmt = 'binary'
+
+    workers = max(1, min(EXPORT_WORKERS, len(VALID_PATIENT_IDS)))
+    shards = [VALID_PATIENT_IDS[i::workers] for i in range(workers)]
+    reference = (VALID_PARAMETERS, VALID_USER_IDS, PARAMETER_RANGES)
+    total_cycles = EXPORT_DURATION_SECONDS // EXPORT_PERIOD_SECONDS
+    expected = total_cycles * len(VALID_PATIENT_IDS) * len(VALID_PARAMETERS)
+    # Réglages transmis explicitement : les processus 'spawn' réimportent le module
+    plan = {
+        'format': fmt,
+        'directory': EXPORT_DIR,
+        'origin': int(datetime.strptime(EXPORT_START, DATETIME_FORMAT).timestamp()),
+        'period': EXPORT_PERIOD_SECONDS,
+        'cycles': total_cycles,
+        'chunk_rows': EXPORT_CHUNK_ROWS,
+        'seed': EXPORT_SEED,
+    }
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+
+    print(f"[DEBUG] Export {fmt} dans {EXPORT_DIR}/ : {len(VALID_PATIENT_IDS)} patients x {len(VALID_PARAMETERS)} paramètres "
+          f"x {total_cycles} cycles ({expected} lignes) à partir de {EXPORT_START}, toutes les {EXPORT_PERIOD_SECONDS}s")
+    print(f"[DEBUG] {workers} processus ({', '.join(str(len(shard)) for shard in shards)} patients chacun)")
+    print("-" * 60)
+
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+        futures = [
+            loop.run_in_executor(executor, export_shard, i, shard, reference, plan)
+            for i, shard in enumerate(shards)
+        ]
+        total_rows = total_bytes = 0
+        for future in asyncio.as_completed(futures):
+            rows, size, seconds = await future
+            total_rows += rows
+            total_bytes += size
+            print(f"[EXPORT] Tranche terminée : {rows} lignes, {size / 1e6:.1f} Mo en {seconds:.1f}s "
+                  f"({rows / seconds if seconds else 0:.0f} lignes/s)")
+    duration = time.perf_counter() - start
+
+    print("-" * 60)
+    print(f"[RESULT] Lignes: {total_rows}")
+    print(f"[RESULT] Taille: {total_bytes / 1e6:.1f} Mo ({total_bytes / max(1, total_rows):.2f} octets/ligne)")
+    print(f"[RESULT] Durée: {duration:.2f}s")
+    if duration > 0:
+        print(f"[RESULT] Vitesse: {total_rows / duration:.0f} lignes/s")
+
+
+async def start_metrics() -> list:
+    """Active l'instrumentation si METRICS_ENABLED : endpoint /metrics et journal JSON périodique."""
+    metrics.ENABLED = METRICS_ENABLED
+    if not METRICS_ENABLED:
+        return []
+
+    server = await metrics.start_http_server(METRICS_HOST, METRICS_PORT)
+    print(f"[INFO] Métriques exposées sur http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    tasks = [asyncio.create_task(server.serve_forever())]
+    if METRICS_LOG_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(metrics.log_periodically(METRICS_LOG_INTERVAL_SECONDS)))
+    return tasks
+
+
+async def start_live_feed():
+    """Démarre le serveur pub-sub du flux temps réel si PUBSUB_ENABLED."""
+    global live_feed
+    if not PUBSUB_ENABLED:
+        return None
+    if SHARD_WORKERS > 1:
+        print("[WARNING] Flux temps réel indisponible en mode multi-processus (SHARD_WORKERS > 1)")
+        return None
+
+    live_feed = await pubsub.PubSubServer(PUBSUB_SUBSCRIBER_BUFFER).start(PUBSUB_HOST, PUBSUB_PORT, PUBSUB_UNIX_SOCKET)
+    address = PUBSUB_UNIX_SOCKET or f"{PUBSUB_HOST}:{PUBSUB_PORT}"
+    print(f"[INFO] Flux temps réel publié sur {address}")
+    return live_feed
+
+
 async def main():
     """Point d'entrée du script : vérifie l'environnement et lance le process."""
     print("=" * 60)
@@ -620,23 +4310,57 @@ async def main():
     print(f"[DEBUG] Démarrage: {datetime.now()}")
     print()
 
+    run_mode = sys.argv[1] if len(sys.argv) > 1 else RUN_MODE
+    if run_mode not in ('ingest', 'backfill_rollups', 'waveform', 'export', 'replay_db', 'maintain'):
+        print(f"[ERROR] Mode inconnu: {run_mode} (attendu: ingest, backfill_rollups, waveform, export, replay_db, maintain)")
+        return
+    if run_mode in ('waveform', 'export') and np is None:
+        print(f"[ERROR] Le mode '{run_mode}' nécessite NumPy (pip install numpy)")
+        return
+
+    # L'export hors ligne n'a besoin de la base que pour lire la référence, si elle est configurée
+    if run_mode == 'export':
+        await export_dataset()
+        print()
+        print(f"[DEBUG] Fin: {datetime.now()}")
+        print("=" * 60)
+        return
+
     # Vérification des variables d'environnement
     if not all(DB_CONFIG.values()):
         print("[ERROR] Configuration BDD incomplète!")
         return
 
+    background_tasks = await start_metrics()
+
+    if run_mode == 'backfill_rollups':
+        await backfill_rollups()
+    elif run_mode == 'waveform':
+        await insert_waveforms_async()
+    elif run_mode == 'replay_db':
+        await start_live_feed()
+        await replay_database()
+    elif run_mode == 'maintain':
+        await maintain_history()
     # Chargement des données CSV ou génération aléatoire
-    if os.path.exists(CSV_FILE):
-        data = load_csv_data(CSV_FILE)
-        if not data:
-            print("[ERROR] Aucune donnée dans le CSV")
-            return
-        await insert_all_async(data, delay=INSERT_DELAY_SECONDS)
+    elif os.path.exists(CSV_FILE):
+        if CSV_IMPORT_MODE == 'bulk':
+            await bulk_import_csv(CSV_FILE)
+        else:
+            await start_live_feed()
+            await insert_all_async(CSV_FILE, delay=INSERT_DELAY_SECONDS)
     else:
         print(f"[INFO] Fichier CSV non trouvé: {CSV_FILE}")
         print(f"[INFO] Lancement de la génération aléatoire en continu.")
+        await start_live_feed()
         await insert_infinite_async(delay=INSERT_DELAY_SECONDS)
 
+    for task in background_tasks:
+        task.cancel()
+    if live_feed is not None:
+        print(f"[RESULT] Flux temps réel: {live_feed.summary()}")
+        await live_feed.close()
+
     print()
     print(f"[DEBUG] Fin: {datetime.now()}")
     print("=" * 60)
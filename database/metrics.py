@@ -0,0 +1,189 @@
+"""
+Instrumentation légère du pipeline d'ingestion : compteurs, jauges et histogrammes.
+Les mesures sont exposées au format texte Prometheus sur /metrics et peuvent être
+journalisées périodiquement en JSON. Désactivée (ENABLED = False), chaque mesure
+se réduit à un test de booléen.
+"""
+import asyncio
+import bisect
+import contextlib
+import json
+import time
+
+ENABLED = False
+
+# Bornes par défaut des histogrammes (secondes)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# {nom: (type, aide, {labels (tuple trié): métrique})}
+REGISTRY = {}
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+def _register(kind: str, name: str, help_text: str, labels: dict, metric):
+    entry = REGISTRY.setdefault(name, (kind, help_text, {}))
+    key = tuple(sorted((labels or {}).items()))
+    return entry[2].setdefault(key, metric)
+
+
+class Counter:
+    """Compteur monotone."""
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        if ENABLED:
+            self.value += amount
+
+
+class Gauge:
+    """Valeur instantanée."""
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        if ENABLED:
+            self.value = value
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes (format Prometheus)."""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        if ENABLED:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Contexte mesurant la durée du bloc (sans effet si l'instrumentation est désactivée)."""
+        return _Timer(self) if ENABLED else _NULL_TIMER
+
+    def quantile(self, q: float) -> float:
+        """Estimation d'un quantile : borne supérieure du bucket qui l'atteint."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float('inf')
+
+
+def counter(name: str, help_text: str, labels: dict = None) -> Counter:
+    return _register('counter', name, help_text, labels, Counter())
+
+
+def gauge(name: str, help_text: str, labels: dict = None) -> Gauge:
+    return _register('gauge', name, help_text, labels, Gauge())
+
+
+def histogram(name: str, help_text: str, labels: dict = None, buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _register('histogram', name, help_text, labels, Histogram(buckets))
+
+
+def render() -> str:
+    """Toutes les métriques au format d'exposition texte Prometheus."""
+    lines = []
+    for name, (kind, help_text, series) in REGISTRY.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, metric in series.items():
+            if kind == 'histogram':
+                cumulative = 0
+                for bound, count in zip(metric.buckets, metric.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {metric.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {metric.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {metric.value}")
+    return '\n'.join(lines) + '\n'
+
+
+def snapshot() -> dict:
+    """Valeurs courantes sous forme de dict sérialisable (journal JSON)."""
+    data = {}
+    for name, (kind, _, series) in REGISTRY.items():
+        for labels, metric in series.items():
+            key = name + _format_labels(labels)
+            if kind == 'histogram':
+                data[key] = {
+                    'count': metric.count,
+                    'sum': round(metric.sum, 6),
+                    'p50': metric.quantile(0.5),
+                    'p99': metric.quantile(0.99),
+                }
+            else:
+                data[key] = metric.value
+    return data
+
+
+async def _handle_http(reader, writer):
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        parts = request_line.split()
+        if len(parts) >= 2 and parts[1] == b'/metrics':
+            status, body = '200 OK', render().encode()
+        else:
+            status, body = '404 Not Found', b'Not Found\n'
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def start_http_server(host: str, port: int):
+    """Démarre le serveur HTTP exposant /metrics."""
+    return await asyncio.start_server(_handle_http, host, port)
+
+
+async def log_periodically(interval: float):
+    """Écrit un instantané des métriques en JSON (une ligne) toutes les `interval` secondes."""
+    while True:
+        await asyncio.sleep(interval)
+        print(json.dumps({'event': 'metrics', 'time': time.time(), 'metrics': snapshot()}), flush=True)
@@ -0,0 +1,186 @@
+"""
+Flux temps réel des mesures insérées : serveur pub-sub local (socket Unix ou TCP).
+
+Protocole ligne par ligne, en JSON :
+  client -> serveur : {"subscribe": [3, 5]}, {"subscribe": "*"}, {"unsubscribe": [3]}
+  serveur -> client : {"subscribed": [3, 5]} puis, à chaque cycle validé en base,
+                      {"id_patient": 3, "rows": [{"parameter_id", "value", "timestamp", "alert_flag"}, ...]}
+
+Chaque patient est un sujet. Un abonné lent ne ralentit ni le script ni les autres
+abonnés : ses messages en attente sont fusionnés par patient (dernière valeur de chaque
+paramètre) et son tampon est borné à `buffer_size` patients (le plus ancien est abandonné).
+"""
+import asyncio
+import json
+import os
+from collections import OrderedDict
+
+ALL_TOPICS = '*'
+
+
+class Message:
+    """Mesures d'un patient pour un cycle ; l'encodage JSON est partagé entre abonnés."""
+    __slots__ = ('id_patient', 'rows', '_encoded')
+
+    def __init__(self, id_patient, rows):
+        self.id_patient = id_patient
+        self.rows = rows
+        self._encoded = None
+
+    def merged(self, newer):
+        """Fusion pour un abonné en retard : dernière valeur de chaque paramètre."""
+        latest = {}
+        for row in self.rows + newer.rows:
+            current = latest.get(row['parameter_id'])
+            if current is None or row['timestamp'] >= current['timestamp']:
+                latest[row['parameter_id']] = row
+        return Message(self.id_patient, list(latest.values()))
+
+    def encode(self) -> bytes:
+        if self._encoded is None:
+            self._encoded = (json.dumps({'id_patient': self.id_patient, 'rows': self.rows}) + '\n').encode()
+        return self._encoded
+
+
+class Subscriber:
+    """Connexion abonnée : sujets suivis et messages en attente d'envoi (un par patient au plus)."""
+
+    def __init__(self, server, writer):
+        self.server = server
+        self.writer = writer
+        self.topics = set()
+        self.pending = OrderedDict()
+        self.ready = asyncio.Event()
+
+    def wants(self, id_patient) -> bool:
+        return ALL_TOPICS in self.topics or id_patient in self.topics
+
+    def offer(self, message: Message):
+        current = self.pending.get(message.id_patient)
+        if current is not None:
+            self.pending[message.id_patient] = current.merged(message)
+            self.server.coalesced += 1
+        else:
+            if len(self.pending) >= self.server.buffer_size:
+                self.pending.popitem(last=False)
+                self.server.dropped += 1
+            self.pending[message.id_patient] = message
+        self.ready.set()
+
+    async def send_loop(self):
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                while self.pending:
+                    _, message = self.pending.popitem(last=False)
+                    self.writer.write(message.encode())
+                    await self.writer.drain()
+        except ConnectionError:
+            pass
+
+    def handle_command(self, line: bytes):
+        try:
+            command = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(command, dict):
+            return
+
+        for key, update in (('subscribe', self.topics.update), ('unsubscribe', self.topics.difference_update)):
+            topics = command.get(key)
+            if topics is None:
+                continue
+            if topics == ALL_TOPICS:
+                topics = [ALL_TOPICS]
+            elif not isinstance(topics, list):
+                topics = [topics]
+            try:
+                update({topic if topic == ALL_TOPICS else int(topic) for topic in topics})
+            except (TypeError, ValueError):
+                return
+
+        self.writer.write((json.dumps({'subscribed': sorted(self.topics, key=str)}) + '\n').encode())
+
+
+class PubSubServer:
+    """
+    Serveur de diffusion : `stage(rows)` accumule les lignes validées en base pendant un cycle,
+    `flush()` les publie, un message par patient, aux abonnés de ce patient.
+    """
+
+    def __init__(self, buffer_size: int = 256):
+        self.buffer_size = max(1, buffer_size)
+        self.subscribers = set()
+        self.handlers = set()
+        self.staged = {}
+        self.server = None
+        self.unix_path = None
+        self.published = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    async def start(self, host: str = '127.0.0.1', port: int = 9109, unix_path: str = None):
+        """Écoute sur la socket Unix `unix_path` si fournie, sinon en TCP sur host:port."""
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            self.server = await asyncio.start_unix_server(self._handle, unix_path)
+            self.unix_path = unix_path
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port)
+        return self
+
+    async def _handle(self, reader, writer):
+        subscriber = Subscriber(self, writer)
+        self.subscribers.add(subscriber)
+        self.handlers.add(asyncio.current_task())
+        sender = asyncio.create_task(subscriber.send_loop())
+        try:
+            while line := await reader.readline():
+                subscriber.handle_command(line)
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            self.handlers.discard(asyncio.current_task())
+            sender.cancel()
+            writer.close()
+
+    def stage(self, rows):
+        """Ajoute des lignes au format DB_COLUMNS (id_patient, parameter_id, value, timestamp, alert_flag, ...)."""
+        if not self.subscribers:
+            return
+        for row in rows:
+            self.staged.setdefault(row[0], []).append({
+                'parameter_id': row[1],
+                'value': row[2],
+                'timestamp': str(row[3]),
+                'alert_flag': row[4],
+            })
+
+    def flush(self):
+        """Publie les lignes accumulées depuis le dernier appel (sans attendre les abonnés)."""
+        if not self.staged:
+            return
+        staged, self.staged = self.staged, {}
+        for id_patient, rows in staged.items():
+            message = Message(id_patient, rows)
+            for subscriber in self.subscribers:
+                if subscriber.wants(id_patient):
+                    subscriber.offer(message)
+            self.published += 1
+
+    def summary(self) -> str:
+        return (f"{len(self.subscribers)} abonnés | publiés {self.published} | "
+                f"fusionnés {self.coalesced} | abandonnés {self.dropped}")
+
+    async def close(self):
+        for subscriber in list(self.subscribers):
+            subscriber.writer.close()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.unix_path and os.path.exists(self.unix_path):
+            os.remove(self.unix_path)
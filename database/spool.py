@@ -0,0 +1,208 @@
+"""
+Spool disque des mesures non insérées pendant une indisponibilité de la base.
+
+Les lignes sont ajoutées en fin de fichiers segments (`spool-<n°>.jsonl`, un lot JSON par
+ligne), dans l'ordre d'arrivée. Les écritures sont poussées au système à chaque lot,
+mais synchronisées sur disque (fsync) au plus toutes les `fsync_interval` secondes.
+Un segment plein (`segment_max_bytes`) est fermé et un nouveau est ouvert ; au-delà de
+`max_bytes` au total, les nouveaux lots sont refusés (comptés dans `rejected`).
+
+La relecture se fait dans l'ordre, segment par segment : `read(max_rows)` retourne les
+lignes suivantes sans les consommer, `ack()` les valide et supprime les segments
+entièrement rejoués. Après un arrêt, la lecture repart du début du plus ancien segment
+restant : les lignes déjà rejouées sont renvoyées (l'insertion doit tolérer les doublons).
+"""
+import json
+import os
+import time
+
+SEGMENT_PREFIX = 'spool-'
+SEGMENT_SUFFIX = '.jsonl'
+
+
+def _json_default(value):
+    # Scalaires NumPy (moteur vectorisé) : converti en type Python
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+class DiskSpool:
+    """File d'attente disque append-only, découpée en segments."""
+
+    def __init__(self, directory: str, segment_max_bytes: int = 16 * 1024 * 1024,
+                 max_bytes: int = 1024 * 1024 * 1024, fsync_interval: float = 1.0):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval = fsync_interval
+
+        self.writer = None
+        self.write_seq = 0
+        self.write_size = 0
+        self.last_fsync = 0.0
+        self.dirty = False
+
+        self.read_seq = None
+        self.read_offset = 0
+        self.pending_ack = None
+
+        self.segments = {}  # {n° de segment: taille en octets}
+        self.pending_rows = 0
+        self.spooled = 0
+        self.drained = 0
+        self.rejected = 0
+        self.corrupt = 0
+
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                    seq = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+                    self.segments[seq] = os.path.getsize(self._path(seq))
+            self.pending_rows = sum(self._count_rows(seq) for seq in self.segments)
+        self.write_seq = max(self.segments, default=0) + 1
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{seq:08d}{SEGMENT_SUFFIX}")
+
+    def _count_rows(self, seq: int) -> int:
+        count = 0
+        with open(self._path(seq), 'rb') as f:
+            for line in f:
+                try:
+                    count += len(json.loads(line))
+                except ValueError:
+                    pass
+        return count
+
+    @property
+    def size(self) -> int:
+        return sum(self.segments.values())
+
+    def __len__(self):
+        return self.pending_rows
+
+    def append(self, rows) -> bool:
+        """Ajoute un lot de lignes (tuples) en fin de spool. Retourne False si le spool est plein."""
+        if not rows:
+            return True
+        data = (json.dumps(rows, default=_json_default, separators=(',', ':')) + '\n').encode()
+        if self.size + len(data) > self.max_bytes:
+            self.rejected += len(rows)
+            return False
+
+        if self.writer is None or self.write_size + len(data) > self.segment_max_bytes:
+            self._rotate()
+        self.writer.write(data)
+        self.writer.flush()
+        self.write_size += len(data)
+        self.segments[self.write_seq] = self.write_size
+        self.pending_rows += len(rows)
+        self.spooled += len(rows)
+        self.dirty = True
+        self.sync()
+        return True
+
+    def _rotate(self):
+        if self.writer is not None:
+            self.sync(force=True)
+            self.writer.close()
+            self.write_seq += 1
+        os.makedirs(self.directory, exist_ok=True)
+        self.writer = open(self._path(self.write_seq), 'ab')
+        self.write_size = self.writer.tell()
+        self.segments[self.write_seq] = self.write_size
+
+    def sync(self, force: bool = False):
+        """fsync du segment courant, au plus toutes les `fsync_interval` secondes sauf `force`."""
+        if not self.dirty or self.writer is None:
+            return
+        now = time.monotonic()
+        if force or now - self.last_fsync >= self.fsync_interval:
+            os.fsync(self.writer.fileno())
+            self.last_fsync = now
+            self.dirty = False
+
+    def read(self, max_rows: int) -> list:
+        """
+        Retourne au plus `max_rows` lignes (par lots entiers) à partir de la position de
+        lecture, sans les consommer. Le lot suivant n'est lu qu'après `ack()`.
+        Les lignes illisibles (lot tronqué par un arrêt brutal, JSON invalide) et les segments
+        vides sont passés et validés ici, pour que la lecture reprenne au segment suivant.
+        """
+        if max_rows <= 0:
+            return []
+        while True:
+            rows = []
+            seq, offset = self.read_seq, self.read_offset
+            if seq is None or seq not in self.segments:
+                seq, offset = min(self.segments, default=None), 0
+            if seq is None:
+                return rows
+            start_offset = offset
+
+            # Le segment en cours d'écriture doit être lisible jusqu'à son dernier lot
+            if seq == self.write_seq and self.writer is not None:
+                self.writer.flush()
+
+            with open(self._path(seq), 'rb') as f:
+                f.seek(offset)
+                while len(rows) < max_rows:
+                    line = f.readline()
+                    if not line.endswith(b'\n'):
+                        # Fin du segment, ou lot tronqué par un arrêt brutal (ignoré s'il n'est plus écrit)
+                        if line and seq != self.write_seq:
+                            self.corrupt += 1
+                            offset += len(line)
+                        break
+                    offset += len(line)
+                    try:
+                        rows.extend(tuple(row) for row in json.loads(line))
+                    except ValueError:
+                        self.corrupt += 1
+
+            self.pending_ack = (seq, offset, len(rows))
+            if rows or (seq == self.write_seq and offset == start_offset):
+                return rows
+            # Rien de lisible : la position est validée (segment clos supprimé), puis segment suivant
+            self.ack()
+            if seq == self.write_seq:
+                return rows
+
+    def ack(self):
+        """Valide le dernier `read()` et supprime les segments entièrement rejoués."""
+        if self.pending_ack is None:
+            return
+        seq, offset, count = self.pending_ack
+        self.pending_ack = None
+        self.pending_rows = max(0, self.pending_rows - count)
+        self.drained += count
+
+        if offset >= self.segments.get(seq, 0) and seq != self.write_seq:
+            os.remove(self._path(seq))
+            del self.segments[seq]
+            self.read_seq, self.read_offset = None, 0
+        else:
+            self.read_seq, self.read_offset = seq, offset
+
+        # Segment courant rejoué en entier : repart sur un segment vide
+        if self.writer is not None and self.read_seq == self.write_seq and self.read_offset >= self.write_size:
+            self.pending_rows = 0
+            self.writer.close()
+            os.remove(self._path(self.write_seq))
+            del self.segments[self.write_seq]
+            self.writer = None
+            self.write_seq += 1
+            self.write_size = 0
+            self.read_seq, self.read_offset = None, 0
+
+    def summary(self) -> str:
+        return (f"en attente {self.pending_rows} lignes ({self.size / 1e6:.1f} Mo, {len(self.segments)} segments) | "
+                f"spoolées {self.spooled} | rejouées {self.drained} | refusées (plein) {self.rejected} | "
+                f"lots illisibles {self.corrupt}")
+
+    def close(self):
+        if self.writer is not None:
+            self.sync(force=True)
+            self.writer.close()
+            self.writer = None
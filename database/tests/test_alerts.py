@@ -0,0 +1,100 @@
+"""Tests des transitions d'alerte AlertTracker (python -m unittest discover -s tests, depuis database/)."""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+# Zone normale 60-100 (marge d'hystérésis 5 % de 40 = 2), zone critique 40-140
+RANGES = {'FC': {'dm': 0.0, 'dmx': 250.0, 'nm': 60.0, 'nmx': 100.0, 'cm': 40.0, 'cmx': 140.0}}
+
+
+def row(second: int, value: float) -> tuple:
+    return (1, 'FC', value, f"2025-01-01 10:00:{second:02d}", 0, 1, 0)
+
+
+class AlertTrackerTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.multiple(main, PARAMETER_RANGES=RANGES, ALERT_HYSTERESIS_RATIO=0.05)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tracker = main.AlertTracker(min_duration=5)
+
+    def test_level_is_confirmed_after_min_duration(self):
+        self.tracker.add([row(0, 120), row(3, 121)])
+        self.assertEqual(self.tracker.take_transitions(), [])
+
+        self.tracker.add([row(5, 122)])
+
+        # Horodatage et valeur du début de l'anomalie, confirmée à 10:00:05
+        self.assertEqual(self.tracker.take_transitions(), [
+            (1, 'FC', '2025-01-01 10:00:00', 0, 1, 120.0, '2025-01-01 10:00:05'),
+        ])
+
+    def test_short_spike_is_debounced(self):
+        self.tracker.add([row(0, 120), row(2, 80), row(10, 150), row(12, 80), row(20, 80)])
+
+        self.assertEqual(self.tracker.take_transitions(), [])
+
+    def test_candidate_restarts_when_level_changes(self):
+        self.tracker.add([row(0, 120), row(3, 150), row(6, 150)])
+        self.assertEqual(self.tracker.take_transitions(), [])
+
+        self.tracker.add([row(8, 150)])
+
+        self.assertEqual(self.tracker.take_transitions(), [
+            (1, 'FC', '2025-01-01 10:00:03', 0, 2, 150.0, '2025-01-01 10:00:08'),
+        ])
+
+    def test_recovery_needs_hysteresis_margin(self):
+        self.tracker.load([(1, 'FC', 1, '2025-01-01 09:59:00')])
+
+        # 99 est dans la zone normale mais à moins de la marge du seuil : le niveau 1 est maintenu
+        self.tracker.add([row(0, 99), row(10, 99)])
+        self.assertEqual(self.tracker.take_transitions(), [])
+
+        self.tracker.add([row(20, 97), row(25, 96)])
+        self.assertEqual(self.tracker.take_transitions(), [
+            (1, 'FC', '2025-01-01 10:00:20', 1, 0, 97.0, '2025-01-01 10:00:25'),
+        ])
+
+    def test_loaded_level_is_not_emitted_again(self):
+        self.tracker.load([(1, 'FC', 1, '2025-01-01 09:59:00')])
+
+        self.tracker.add([row(0, 120), row(30, 125)])
+
+        self.assertEqual(self.tracker.take_transitions(), [])
+
+    def test_late_rows_are_ignored(self):
+        self.tracker.add([row(10, 80), row(0, 120), row(5, 120)])
+
+        self.assertEqual(self.tracker.states[(1, 'FC')][2], None)
+
+
+class HysteresisLevelTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.multiple(main, PARAMETER_RANGES=RANGES, ALERT_HYSTERESIS_RATIO=0.05)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_escalation_is_immediate(self):
+        self.assertEqual(main.hysteresis_level('FC', 101, 0), 1)
+        self.assertEqual(main.hysteresis_level('FC', 141, 1), 2)
+
+    def test_descent_keeps_level_inside_margin(self):
+        self.assertEqual(main.hysteresis_level('FC', 139, 2), 2)
+        self.assertEqual(main.hysteresis_level('FC', 137, 2), 1)
+        self.assertEqual(main.hysteresis_level('FC', 97, 2), 0)
+        self.assertEqual(main.hysteresis_level('FC', 61, 1), 1)
+
+    def test_unknown_parameter_is_normal(self):
+        self.assertEqual(main.hysteresis_level('XX', 1000, 2), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
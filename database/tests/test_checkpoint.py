@@ -0,0 +1,113 @@
+"""Tests du point de reprise de l'import CSV (python -m unittest discover -s tests, depuis database/)."""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from collections import deque
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark  # noqa: E402
+import main  # noqa: E402
+
+
+def read_cycles(path: str, start_offset: int = 0, count: int = 100, cycle_ends: deque = None) -> list:
+    """Cycles du CSV à partir de `start_offset`, sous forme de tuples comparables."""
+    progress = {'bytes': start_offset, 'offset': start_offset}
+    with contextlib.redirect_stdout(io.StringIO()):
+        cycles = main.iter_cycles(main.iter_csv_records(path, progress, start_offset))
+        batch = main.take_cycles(cycles, count, progress, cycle_ends)
+    return [[(r.id_patient, r.parameter_id, r.value, r.timestamp) for r in cycle] for cycle in batch]
+
+
+class CsvCheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(main, 'disk_spool', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.csv_path = os.path.join(self.tmp.name, 'data.csv')
+        benchmark.write_synthetic_csv(self.csv_path, patients=2, parameters=3, cycles=6)
+
+    def save_after(self, cycles_done: int, cycles_read: int = 4) -> main.CsvCheckpoint:
+        checkpoint = main.CsvCheckpoint(self.csv_path)
+        read_cycles(self.csv_path, count=cycles_read, cycle_ends=checkpoint.cycle_ends)
+        checkpoint.advance(cycles_done)
+        checkpoint.save(force=True)
+        return checkpoint
+
+    def load(self) -> tuple:
+        checkpoint = main.CsvCheckpoint(self.csv_path)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            loaded = checkpoint.load()
+        return checkpoint, loaded, output.getvalue()
+
+    def test_resume_reads_the_remaining_cycles(self):
+        all_cycles = read_cycles(self.csv_path)
+        self.save_after(2)
+
+        checkpoint, loaded, _ = self.load()
+
+        self.assertTrue(loaded)
+        self.assertEqual(checkpoint.cycle, 2)
+        self.assertEqual(read_cycles(self.csv_path, checkpoint.offset), all_cycles[2:])
+
+    def test_advance_stops_at_cycles_read(self):
+        checkpoint = self.save_after(10, cycles_read=3)
+
+        self.assertEqual(checkpoint.cycle, 3)
+        self.assertEqual(checkpoint.cycle_ends, deque())
+
+    def test_saved_checkpoint_does_not_advance_past_unconfirmed_cycles(self):
+        checkpoint = self.save_after(1)
+
+        self.assertEqual(len(checkpoint.cycle_ends), 3)
+        self.assertEqual(self.load()[0].cycle, 1)
+
+    def test_appended_csv_is_resumed(self):
+        self.save_after(3)
+        with open(self.csv_path, 'a', encoding='utf-8') as f:
+            f.write("1,P00,90.0,2023-11-14 22:13:30,0,1,0\n")
+
+        checkpoint, loaded, _ = self.load()
+
+        self.assertTrue(loaded)
+        self.assertEqual(checkpoint.cycle, 3)
+        self.assertEqual(read_cycles(self.csv_path, checkpoint.offset)[-1],
+                         [(1, 'P00', 90.0, '2023-11-14 22:13:30')])
+
+    def test_replaced_csv_is_imported_from_start(self):
+        self.save_after(3)
+        benchmark.write_synthetic_csv(self.csv_path, patients=3, parameters=3, cycles=6)
+
+        checkpoint, loaded, output = self.load()
+
+        self.assertFalse(loaded)
+        self.assertEqual((checkpoint.offset, checkpoint.cycle), (0, 0))
+        self.assertIn("remplacé", output)
+
+    def test_unreadable_checkpoint_is_ignored(self):
+        with open(self.csv_path + '.checkpoint', 'w', encoding='utf-8') as f:
+            f.write('{"offset": ')
+
+        checkpoint, loaded, output = self.load()
+
+        self.assertFalse(loaded)
+        self.assertEqual(checkpoint.offset, 0)
+        self.assertIn("illisible", output)
+
+    def test_missing_checkpoint_starts_from_beginning(self):
+        checkpoint, loaded, _ = self.load()
+
+        self.assertFalse(loaded)
+        self.assertEqual((checkpoint.offset, checkpoint.cycle), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
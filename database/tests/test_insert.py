@@ -0,0 +1,152 @@
+"""Tests de insert_chunk sur le faux pool du benchmark (python -m unittest discover -s tests, depuis database/)."""
+import contextlib
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiomysql  # noqa: E402
+
+import benchmark  # noqa: E402
+import main  # noqa: E402
+
+
+def row(patient: int, second: int, value: float = 80.0) -> tuple:
+    return (patient, 'FC', value, f"2025-01-01 00:00:{second:02d}", 0, 1, 0)
+
+
+def key(r: tuple) -> tuple:
+    """Clé primaire de patient_data : (id_patient, parameter_id, timestamp)."""
+    return r[0], r[1], r[3]
+
+
+class KeyedCursor(benchmark.FakeCursor):
+    """Curseur du faux pool qui applique INSERT_QUERY à un ensemble de clés (doublon : rowcount 0)."""
+
+    def _write(self, rows) -> int:
+        target = self.conn.pending if self.conn.in_transaction else self.pool.keys
+        written = 0
+        for r in rows:
+            if key(r) in self.pool.failing:
+                raise self.pool.failing[key(r)]
+            if key(r) in self.pool.keys or key(r) in target:
+                continue
+            target.add(key(r))
+            written += 1
+        return written
+
+    async def execute(self, query, args=None):
+        await super().execute(query, args)
+        if query == main.INSERT_QUERY:
+            self.rowcount = self._write([args])
+        return self.rowcount
+
+    async def executemany(self, query, rows):
+        await super().executemany(query, rows)
+        if query == main.INSERT_QUERY:
+            self.rowcount = self._write(rows)
+
+
+class KeyedConnection(benchmark.FakeConnection):
+    """Les clés écrites dans une transaction ne sont visibles qu'après commit."""
+
+    def __init__(self, pool):
+        super().__init__(pool)
+        self.pending = set()
+
+    def cursor(self, *args):
+        return KeyedCursor(self)
+
+    async def commit(self):
+        await super().commit()
+        self.pool.keys |= self.pending
+        self.pending.clear()
+
+    async def rollback(self):
+        await super().rollback()
+        self.pending.clear()
+
+
+class KeyedPool(benchmark.FakePool):
+    """
+    FakePool sans latence qui garde les clés primaires insérées. `failing` associe
+    une clé à l'erreur levée par la base à chaque insertion de cette ligne.
+    """
+
+    def __init__(self, existing=(), failing=None):
+        super().__init__(maxsize=2, round_trip_ms=0.0, row_cost_us=0.0)
+        self.keys = {key(r) for r in existing}
+        self.failing = failing or {}
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        async with self._slots:
+            yield KeyedConnection(self)
+
+
+class InsertChunkTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.multiple(main, MAINTAIN_LATEST_TABLE=False, MAINTAIN_ROLLUPS=False,
+                                      MAINTAIN_ALERT_EVENTS=False, COMMIT_RETRY_BACKOFF_SECONDS=0.0,
+                                      disk_spool=None, live_feed=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        main.error_reasons.clear()
+        self.addCleanup(main.error_reasons.clear)
+        self.rows = [row(1, 0), row(2, 0), row(3, 0)]
+
+    async def test_new_rows_are_committed_in_one_transaction(self):
+        pool = KeyedPool()
+
+        result = await main.insert_chunk(pool, self.rows)
+
+        self.assertEqual(result, (3, 0, 0))
+        self.assertEqual(pool.keys, {key(r) for r in self.rows})
+        self.assertEqual(pool.commits, 1)
+
+    async def test_fully_duplicate_chunk_is_committed_without_replay(self):
+        pool = KeyedPool(existing=self.rows)
+
+        result = await main.insert_chunk(pool, self.rows)
+
+        self.assertEqual(result, (0, 3, 0))
+        # BEGIN, INSERT multi-lignes, COMMIT : aucune requête ligne à ligne
+        self.assertEqual(pool.statements, 3)
+
+    async def test_partial_duplicate_chunk_is_replayed_row_by_row(self):
+        pool = KeyedPool(existing=self.rows[1:2])
+
+        result = await main.insert_chunk(pool, self.rows)
+
+        self.assertEqual(result, (2, 1, 0))
+        self.assertEqual(pool.keys, {key(r) for r in self.rows})
+
+    async def test_rejected_row_is_counted_by_error_code(self):
+        pool = KeyedPool(failing={key(self.rows[0]): aiomysql.IntegrityError(1452, 'clé étrangère')})
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = await main.insert_chunk(pool, self.rows)
+
+        self.assertEqual(result, (2, 0, 1))
+        self.assertEqual(main.error_reasons, {1452: 1})
+        self.assertEqual(pool.keys, {key(r) for r in self.rows[1:]})
+
+    async def test_exhausted_lock_retries_fail_the_whole_chunk(self):
+        pool = KeyedPool(failing={key(self.rows[2]): aiomysql.OperationalError(1213, 'Deadlock')})
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            result = await main.insert_chunk(pool, self.rows)
+
+        self.assertEqual(result, (0, 0, 3))
+        self.assertEqual(main.error_reasons, {1213: 3})
+        self.assertEqual(pool.keys, set())
+        self.assertIn("abandonné", output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Tests du limiteur d'écritures AdaptiveLimiter (python -m unittest discover -s tests, depuis database/)."""
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiomysql  # noqa: E402
+
+import main  # noqa: E402
+
+
+class AdaptiveLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.limiter = main.AdaptiveLimiter(4, 2, 8)
+
+    def test_initial_limit_is_clamped(self):
+        self.assertEqual(main.AdaptiveLimiter(50, 2, 8).limit, 8)
+        self.assertEqual(main.AdaptiveLimiter(1, 2, 8).limit, 2)
+
+    def test_stable_latency_increases_additively_up_to_max(self):
+        self.limiter.observe(0.010, 100)
+        self.assertAlmostEqual(self.limiter.limit, 4.25)
+
+        for _ in range(200):
+            self.limiter.observe(0.010, 100)
+        self.assertEqual(self.limiter.limit, 8)
+        self.assertEqual(self.limiter.decreases, 0)
+
+    def test_latency_drift_decreases_multiplicatively(self):
+        self.limiter.observe(0.010, 100)
+        limit = self.limiter.limit
+
+        self.limiter.observe(0.100, 100)
+
+        self.assertAlmostEqual(self.limiter.limit, limit * main.LIMITER_BACKOFF_RATIO)
+        self.assertEqual(self.limiter.decreases, 1)
+
+    def test_one_decrease_per_request_duration(self):
+        self.limiter.observe(0.010, 100)
+        self.limiter.observe(10.0, 100)
+        self.limiter.observe(10.0, 100)
+
+        self.assertEqual(self.limiter.decreases, 1)
+
+    def test_baseline_is_per_size_class(self):
+        # Une grosse requête plus lente qu'une petite n'est pas une dérive
+        self.limiter.observe(0.002, 10)
+        self.limiter.observe(0.050, 5000)
+
+        self.assertEqual(self.limiter.decreases, 0)
+
+    def test_overload_error_decreases_down_to_min(self):
+        with mock.patch.object(main.time, 'monotonic', side_effect=range(1, 100)):
+            for _ in range(10):
+                self.limiter.on_error(aiomysql.OperationalError(1040, 'Too many connections'))
+
+        self.assertEqual(self.limiter.limit, 2)
+
+    def test_data_error_keeps_limit(self):
+        self.limiter.on_error(aiomysql.IntegrityError(1452, 'clé étrangère'))
+
+        self.assertEqual(self.limiter.limit, 4)
+
+    def test_concurrency_never_exceeds_limit(self):
+        limiter = main.AdaptiveLimiter(3, 1, 3)
+        peak = 0
+
+        async def write():
+            nonlocal peak
+            async with limiter:
+                peak = max(peak, limiter.inflight)
+                await asyncio.sleep(0.001)
+
+        async def run():
+            await asyncio.gather(*(write() for _ in range(20)))
+
+        asyncio.run(run())
+
+        self.assertEqual(peak, 3)
+        self.assertEqual(limiter.inflight, 0)
+        self.assertEqual(limiter.acquired, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
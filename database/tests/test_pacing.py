@@ -0,0 +1,118 @@
+"""Tests des politiques de rythme PacingController (python -m unittest discover -s tests, depuis database/)."""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark  # noqa: E402
+import main  # noqa: E402
+
+CYCLES = 10
+DELAY = 0.01
+LATE_SLOTS = 5  # Retard initial de la boucle, en créneaux
+
+
+def make_cycles() -> list:
+    return [[main.Measurement(patient, 'P00', 80.0 + i) for patient in (1, 2)] for i in range(CYCLES)]
+
+
+class PacingControllerTest(unittest.TestCase):
+
+    def test_late_slots(self):
+        pacer = main.PacingController('catch_up', 0.5)
+        self.assertEqual(pacer.late_slots(0.4), 0)
+        self.assertEqual(pacer.late_slots(1.2), 2)
+        self.assertEqual(main.PacingController('catch_up', 0).late_slots(3.0), 0)
+
+    def test_degrade_doubles_decimation_then_recovers(self):
+        pacer = main.PacingController('degrade', 1.0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(10):
+                pacer.record(0.1, lag=2.0)
+            self.assertEqual(pacer.decimation, main.PACING_DEGRADE_MAX_FACTOR)
+
+            for _ in range(main.PACING_RECOVERY_CYCLES):
+                pacer.record(0.1, lag=0.0)
+        self.assertEqual(pacer.decimation, main.PACING_DEGRADE_MAX_FACTOR // 2)
+
+    def test_lossless_policies_never_decimate(self):
+        for policy in main.LOSSLESS_PACING_POLICIES:
+            pacer = main.PacingController(policy, 1.0)
+            pacer.record(0.1, lag=5.0)
+            self.assertEqual(pacer.decimation, 1)
+
+    def test_sample_keeps_priority_parameters_and_marks_loss(self):
+        pacer = main.PacingController('degrade', 1.0)
+        pacer.decimation = 2
+        cycle = [main.Measurement(1, 'FC_m', 80.0), main.Measurement(1, 'T', 37.0)]
+
+        self.assertIs(pacer.sample(cycle, 4), cycle)
+        self.assertEqual(pacer.first_lost, None)
+        self.assertEqual([r.parameter_id for r in pacer.sample(cycle, 5)], ['FC_m'])
+        self.assertEqual(pacer.first_lost, 5)
+        self.assertEqual(pacer.complete_cycles(8), 5)
+
+
+class RealtimeLoopPacingTest(unittest.TestCase):
+    """Boucle temps réel démarrée LATE_SLOTS créneaux en retard, sur le faux pool du benchmark."""
+
+    def setUp(self):
+        patcher = mock.patch.multiple(
+            main, VALID_PATIENT_IDS=[], VALID_PARAMETERS=[], VALID_USER_IDS=[], PARAMETER_RANGES={},
+            VALID_PATIENT_SET=frozenset(), VALID_PARAMETER_SET=frozenset(), VALID_USER_SET=frozenset(),
+            MAINTAIN_LATEST_TABLE=False, MAINTAIN_ROLLUPS=False, MAINTAIN_ALERT_EVENTS=False,
+            COMMIT_GROUP_CYCLES=1, disk_spool=None, live_feed=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        benchmark.setup_reference_data(2, 1)
+
+    def run_loop(self, policy: str):
+        pacer = main.PacingController(policy, DELAY)
+
+        async def run():
+            queue = asyncio.Queue()
+            queue.put_nowait(make_cycles())
+            queue.put_nowait([])
+            pool = benchmark.FakePool(4, round_trip_ms=0.0, row_cost_us=0.0)
+            clock_origin = time.time() - (LATE_SLOTS + 0.5) * DELAY
+            return await main.run_realtime_loop(pool, queue, DELAY, clock_origin, lambda *totals: None, pacer=pacer)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            cycles, success, skip, error = asyncio.run(run())
+        self.assertEqual((skip, error), (0, 0))
+        return pacer, cycles, success
+
+    def test_none_inserts_every_cycle_one_by_one(self):
+        pacer, cycles, success = self.run_loop('none')
+
+        self.assertEqual((cycles, success), (CYCLES, 2 * CYCLES))
+        self.assertEqual((pacer.coalesced, pacer.dropped), (0, 0))
+        self.assertGreater(pacer.max_lag, LATE_SLOTS * DELAY)
+
+    def test_catch_up_coalesces_late_cycles_without_loss(self):
+        pacer, cycles, success = self.run_loop('catch_up')
+
+        self.assertEqual((cycles, success), (CYCLES, 2 * CYCLES))
+        self.assertGreaterEqual(pacer.coalesced, LATE_SLOTS)
+        self.assertEqual(pacer.dropped, 0)
+        self.assertEqual(pacer.complete_cycles(cycles), CYCLES)
+
+    def test_drop_oldest_skips_late_cycles(self):
+        pacer, cycles, success = self.run_loop('drop_oldest')
+
+        self.assertEqual(cycles, CYCLES)
+        self.assertGreaterEqual(pacer.dropped, LATE_SLOTS)
+        self.assertEqual(success, 2 * (CYCLES - pacer.dropped))
+        # Point de reprise : rien n'est complet après le premier cycle abandonné
+        self.assertEqual(pacer.first_lost, 0)
+        self.assertEqual(pacer.complete_cycles(cycles), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""Tests des agrégats par tranche RollupAggregator (python -m unittest discover -s tests, depuis database/)."""
+import os
+import sys
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+def row(timestamp: str, value, parameter_id: str = 'FC', archived: int = 0) -> tuple:
+    return (1, parameter_id, value, timestamp, 0, 1, archived)
+
+
+class RollupAggregatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.aggregator = main.RollupAggregator(tiers=(60,))
+
+    def test_rows_of_one_bucket_are_merged(self):
+        self.aggregator.add([
+            row('2025-01-01 10:00:05', 80),
+            row('2025-01-01 10:00:20', 70),
+            row('2025-01-01 10:00:59.500', 95.5),
+        ])
+
+        self.assertEqual(self.aggregator.completed, [])
+        self.assertEqual(self.aggregator.take_completed(include_open=True), [
+            (1, 'FC', 60, datetime(2025, 1, 1, 10, 0), 70.0, 95.5, 245.5, 3, 95.5, '2025-01-01 10:00:59.500'),
+        ])
+        self.assertEqual(self.aggregator.open, {})
+
+    def test_bucket_is_closed_by_next_bucket_of_same_series(self):
+        self.aggregator.add([row('2025-01-01 10:00:30', 80), row('2025-01-01 10:00:40', 82)])
+        self.aggregator.add([row('2025-01-01 10:01:00', 90)])
+
+        closed = self.aggregator.take_completed()
+        self.assertEqual(closed, [
+            (1, 'FC', 60, datetime(2025, 1, 1, 10, 0), 80.0, 82.0, 162.0, 2, 82.0, '2025-01-01 10:00:40'),
+        ])
+        # La tranche de 10:01 reste ouverte jusqu'à l'arrêt
+        self.assertEqual(self.aggregator.take_completed(), [])
+        self.assertEqual(len(self.aggregator.take_completed(include_open=True)), 1)
+
+    def test_late_row_keeps_last_value(self):
+        self.aggregator.add([row('2025-01-01 10:00:40', 82), row('2025-01-01 10:00:10', 60)])
+
+        bucket = self.aggregator.take_completed(include_open=True)[0]
+        self.assertEqual(bucket[4:], (60.0, 82.0, 142.0, 2, 82.0, '2025-01-01 10:00:40'))
+
+    def test_series_and_tiers_are_independent(self):
+        aggregator = main.RollupAggregator(tiers=(60, 3600))
+        aggregator.add([
+            row('2025-01-01 10:00:30', 80),
+            row('2025-01-01 10:00:30', 97, parameter_id='SpO2'),
+            row('2025-01-01 10:01:30', 84),
+        ])
+
+        closed = aggregator.take_completed()
+        self.assertEqual([(b[1], b[2], b[7]) for b in closed], [('FC', 60, 1)])
+        remaining = sorted((b[1], b[2], b[7]) for b in aggregator.take_completed(include_open=True))
+        self.assertEqual(remaining, [('FC', 60, 1), ('FC', 3600, 2), ('SpO2', 60, 1), ('SpO2', 3600, 1)])
+
+    def test_empty_and_archived_rows_are_ignored(self):
+        self.aggregator.add([row('2025-01-01 10:00:30', None), row('2025-01-01 10:00:31', 80, archived=1)])
+
+        self.assertEqual(self.aggregator.take_completed(include_open=True), [])
+
+    def test_datetime_timestamps(self):
+        self.aggregator.add([row(datetime(2025, 1, 1, 10, 0, 30), 80)])
+
+        self.assertEqual(self.aggregator.take_completed(include_open=True)[0][3], datetime(2025, 1, 1, 10, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
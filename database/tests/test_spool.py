@@ -0,0 +1,83 @@
+"""Tests du spool disque (python -m unittest discover -s tests, depuis database/)."""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spool import DiskSpool, SEGMENT_PREFIX, SEGMENT_SUFFIX  # noqa: E402
+
+
+def write_segment(directory: str, seq: int, data: bytes):
+    with open(os.path.join(directory, f"{SEGMENT_PREFIX}{seq:08d}{SEGMENT_SUFFIX}"), 'wb') as f:
+        f.write(data)
+
+
+def drain(spool: DiskSpool, max_rows: int = 10, max_reads: int = 20) -> list:
+    """Relit le spool comme drain_spool : read() puis ack(), jusqu'à ce qu'il soit vide."""
+    rows = []
+    for _ in range(max_reads):
+        batch = spool.read(max_rows)
+        spool.ack()
+        if not batch and not spool.segments:
+            break
+        rows.extend(batch)
+    return rows
+
+
+class DiskSpoolReadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_truncated_segment_followed_by_good_segment(self):
+        # Arrêt brutal : le premier segment se termine par un lot à moitié écrit
+        write_segment(self.directory, 1, b'[[1,85]]\n[[1,86]]\n[[1,8')
+        write_segment(self.directory, 2, b'[[1,85],[2,38]]\n')
+
+        spool = DiskSpool(self.directory)
+        rows = drain(spool, max_rows=2)
+
+        self.assertEqual(rows, [(1, 85), (1, 86), (1, 85), (2, 38)])
+        self.assertEqual(spool.corrupt, 1)
+        self.assertEqual(len(spool), 0)
+        self.assertEqual(spool.segments, {})
+
+    def test_segment_of_unreadable_lines_is_skipped(self):
+        write_segment(self.directory, 1, b'{pas du json\n[[1,\n')
+        write_segment(self.directory, 2, b'')
+        write_segment(self.directory, 3, b'[[3,12]]\n')
+
+        spool = DiskSpool(self.directory)
+        self.assertEqual(spool.read(10), [(3, 12)])
+        spool.ack()
+
+        self.assertEqual(spool.corrupt, 2)
+        self.assertEqual(spool.read(10), [])
+        self.assertEqual(spool.segments, {})
+
+    def test_corrupt_count_does_not_grow_on_idle_polls(self):
+        write_segment(self.directory, 1, b'[[1,85]]\n[[1,8')
+        spool = DiskSpool(self.directory)
+        drain(spool)
+        for _ in range(3):
+            self.assertEqual(spool.read(10), [])
+            spool.ack()
+        self.assertEqual(spool.corrupt, 1)
+
+    def test_append_then_drain(self):
+        spool = DiskSpool(self.directory, segment_max_bytes=32)
+        for i in range(5):
+            self.assertTrue(spool.append([(i, 80.0)]))
+        self.assertEqual(drain(spool, max_rows=2), [(i, 80.0) for i in range(5)])
+        self.assertEqual(len(spool), 0)
+        spool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
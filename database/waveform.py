@@ -0,0 +1,110 @@
+"""
+Courbes haute fréquence (ECG, pléthysmographie, respiration) : génération synthétique
+vectorisée et stockage en blocs binaires de durée fixe (une ligne par bloc et par signal).
+
+Encodages d'un bloc :
+  'float32'     : échantillons float32 little-endian bruts
+  'int16'       : échantillons quantifiés (valeur = brut * scale), int16 little-endian
+  'int16_delta' : int16 quantifiés, différences successives puis compression zlib
+
+Le décodage des encodages bruts est sans copie (numpy.frombuffer sur le payload).
+"""
+import zlib
+
+import numpy as np
+
+ENCODINGS = ('float32', 'int16', 'int16_delta')
+
+# Signaux disponibles : (unité, pas de quantification int16, générateur)
+# Le pas borne l'amplitude représentable à ±16383 pas, pour que les différences tiennent en int16.
+SIGNAL_SCALES = {
+    'ECG_II': 0.001,  # mV
+    'PLETH': 0.001,   # unités normalisées
+    'RESP': 0.001,    # unités normalisées
+}
+
+# Ondes de l'ECG (P, Q, R, S, T) : (amplitude mV, position dans le battement, largeur)
+_ECG_WAVES = np.array([
+    (0.15, 0.20, 0.025),
+    (-0.10, 0.34, 0.010),
+    (1.20, 0.37, 0.012),
+    (-0.25, 0.40, 0.010),
+    (0.30, 0.62, 0.040),
+])
+
+
+class WaveformGenerator:
+    """
+    Génère des blocs consécutifs d'un signal pour plusieurs patients à la fois.
+    La phase de chaque patient est conservée d'un bloc à l'autre (signal continu).
+    """
+
+    def __init__(self, signal_id: str, sample_rate: int, n_patients: int, rates_per_min=None, seed=None):
+        if signal_id not in SIGNAL_SCALES:
+            raise ValueError(f"Signal inconnu: {signal_id}")
+        self.signal_id = signal_id
+        self.sample_rate = sample_rate
+        self.rng = np.random.default_rng(seed)
+        default_rate = 15.0 if signal_id == 'RESP' else 75.0
+        if rates_per_min is None:
+            rates_per_min = self.rng.normal(default_rate, default_rate * 0.1, n_patients)
+        self.rates_per_min = np.asarray(rates_per_min, dtype=np.float64)
+        self.phase = self.rng.random(n_patients)
+
+    def set_rates(self, rates_per_min):
+        """Met à jour la fréquence (cardiaque ou respiratoire) de chaque patient pour les blocs suivants."""
+        self.rates_per_min = np.asarray(rates_per_min, dtype=np.float64)
+
+    def next_chunk(self, seconds: float) -> np.ndarray:
+        """Tableau float32 (patients x échantillons) couvrant les `seconds` secondes suivantes."""
+        n = int(round(seconds * self.sample_rate))
+        t = np.arange(n) / self.sample_rate
+        # Phase en battements (ou cycles respiratoires) depuis le début du signal
+        beats = self.phase[:, None] + t[None, :] * (self.rates_per_min[:, None] / 60.0)
+        self.phase = (self.phase + seconds * self.rates_per_min / 60.0) % 1.0
+        frac = beats % 1.0
+
+        if self.signal_id == 'ECG_II':
+            amp, mu, sigma = _ECG_WAVES[:, 0], _ECG_WAVES[:, 1], _ECG_WAVES[:, 2]
+            wave = (amp * np.exp(-0.5 * ((frac[..., None] - mu) / sigma) ** 2)).sum(axis=-1)
+            noise = 0.02
+        elif self.signal_id == 'PLETH':
+            # Montée systolique rapide, encoche dicrote, décroissance diastolique
+            wave = (np.exp(-0.5 * ((frac - 0.25) / 0.08) ** 2)
+                    + 0.35 * np.exp(-0.5 * ((frac - 0.55) / 0.10) ** 2))
+            noise = 0.01
+        else:
+            wave = np.sin(2 * np.pi * frac)
+            noise = 0.02
+
+        wave += self.rng.normal(0.0, noise, wave.shape)
+        return wave.astype(np.float32)
+
+
+def encode_chunk(samples: np.ndarray, encoding: str, scale: float) -> bytes:
+    """Encode un bloc 1D d'échantillons selon `encoding` (voir ENCODINGS)."""
+    if encoding == 'float32':
+        return samples.astype('<f4', copy=False).tobytes()
+
+    quantized = np.clip(np.rint(samples / scale), -16383, 16383).astype('<i2')
+    if encoding == 'int16':
+        return quantized.tobytes()
+    if encoding == 'int16_delta':
+        deltas = np.diff(quantized, prepend=np.int16(0)).astype('<i2')
+        return zlib.compress(deltas.tobytes(), 1)
+    raise ValueError(f"Encodage inconnu: {encoding}")
+
+
+def decode_chunk(payload, encoding: str, scale: float) -> np.ndarray:
+    """
+    Décode un payload en tableau 1D. 'float32' est une vue sans copie sur le payload ;
+    'int16' lit le payload sans copie puis le met à l'échelle en float32.
+    """
+    if encoding == 'float32':
+        return np.frombuffer(memoryview(payload), dtype='<f4')
+    if encoding == 'int16':
+        return np.frombuffer(memoryview(payload), dtype='<i2') * np.float32(scale)
+    if encoding == 'int16_delta':
+        deltas = np.frombuffer(zlib.decompress(payload), dtype='<i2')
+        return np.cumsum(deltas, dtype=np.int32).astype(np.float32) * np.float32(scale)
+    raise ValueError(f"Encodage inconnu: {encoding}")